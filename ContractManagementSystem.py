@@ -1,13 +1,25 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
 import pandas as pd
 import os
 from datetime import datetime
 import openpyxl
 from data_manager import DataManager
+from loader import BackgroundLoader
+from performance import PERFORMANCE_COLUMNS
+from screens import ScreenManager
+from schema import (TABLE_SPECS, CONTRACT_STATUSES, PAYMENT_TERMS, RECEIPT_METHODS, display_value, display_values,
+                    empty_frame)
+from storage import write_excel
+from widgets import SearchSource, TableSource, VirtualTreeview
 
 # 设置中文字体支持
 class ContractManagementSystem:
+    # 选择客户/业务员时，停止输入多久后开始搜索(毫秒)
+    SEARCH_DELAY_MS = 150
+    # 选择客户/业务员时最多显示的条数
+    PICKER_LIMIT = 100
+
     def __init__(self, root):
         self.root = root
         self.root.title("出口销售合同管理系统")
@@ -21,7 +33,12 @@ class ContractManagementSystem:
 
         # 初始化数据管理器
         from data_manager import DataManager
-        self.data_manager = DataManager(self.data_dir)
+        # 使用带追加日志的 Excel 后端，录入数据时不再整表重写工作簿
+        self.data_manager = DataManager(self.data_dir, backend='journal')
+        # 耗时的数据读取在后台线程执行，界面不会停止响应
+        self.loader = BackgroundLoader(self.root)
+        # 各功能界面只创建一次，切换时隐藏和重新显示
+        self.screens = ScreenManager(self.data_manager, self.loader)
 
         # 初始化数据文件
         self.init_data_files()
@@ -32,63 +49,19 @@ class ContractManagementSystem:
         # 创建主界面
         self.create_main_frame()
 
+        # 关闭窗口时先把数据写回 Excel
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
     def init_data_files(self):
-        """初始化Excel数据文件"""
-        # 合同表
-        self.contract_file = os.path.join(self.data_dir, "contracts.xlsx")
-        if not os.path.exists(self.contract_file):
-            df = pd.DataFrame({
-                '合同编号': [],
-                '客户名称': [],
-                '业务员': [],
-                '签订日期': [],
-                '合同金额': [],
-                '付款方式': [],
-                '交货日期': [],
-                '状态': [],
-                '备注': []
-            })
-            df.to_excel(self.contract_file, index=False, engine='openpyxl')
-
-        # 收款表
-        self.payment_file = os.path.join(self.data_dir, "payments.xlsx")
-        if not os.path.exists(self.payment_file):
-            df = pd.DataFrame({
-                '收款ID': [],
-                '合同编号': [],
-                '收款日期': [],
-                '收款金额': [],
-                '收款方式': [],
-                '备注': []
-            })
-            df.to_excel(self.payment_file, index=False, engine='openpyxl')
-
-        # 客户表
-        self.customer_file = os.path.join(self.data_dir, "customers.xlsx")
-        if not os.path.exists(self.customer_file):
-            df = pd.DataFrame({
-                '客户ID': [],
-                '客户名称': [],
-                '联系人': [],
-                '联系电话': [],
-                '地址': [],
-                '邮箱': [],
-                '备注': []
-            })
-            df.to_excel(self.customer_file, index=False, engine='openpyxl')
-
-        # 业务员表
-        self.salesman_file = os.path.join(self.data_dir, "salesmen.xlsx")
-        if not os.path.exists(self.salesman_file):
-            df = pd.DataFrame({
-                '业务员ID': [],
-                '姓名': [],
-                '联系电话': [],
-                '邮箱': [],
-                '所属部门': [],
-                '备注': []
-            })
-            df.to_excel(self.salesman_file, index=False, engine='openpyxl')
+        """初始化Excel数据文件，表结构取自 schema.TABLE_SPECS，与 DataManager 一致"""
+        self.contract_file = os.path.join(self.data_dir, TABLE_SPECS['contracts']['file'])
+        self.payment_file = os.path.join(self.data_dir, TABLE_SPECS['payments']['file'])
+        self.customer_file = os.path.join(self.data_dir, TABLE_SPECS['customers']['file'])
+        self.salesman_file = os.path.join(self.data_dir, TABLE_SPECS['salesmen']['file'])
+        for table, spec in TABLE_SPECS.items():
+            path = os.path.join(self.data_dir, spec['file'])
+            if not os.path.exists(path):
+                write_excel(empty_frame(table), path)
 
     def create_main_menu(self):
         """创建主菜单"""
@@ -97,7 +70,13 @@ class ContractManagementSystem:
         # 文件菜单
         file_menu = tk.Menu(menubar, tearoff=0)
         file_menu.add_command(label="打开数据库文件夹", command=self.open_data_folder)
-        file_menu.add_command(label="退出", command=self.root.quit)
+        import_menu = tk.Menu(file_menu, tearoff=0)
+        import_menu.add_command(label="导入合同", command=lambda: self.import_data('contracts'))
+        import_menu.add_command(label="导入收款", command=lambda: self.import_data('payments'))
+        import_menu.add_command(label="导入客户", command=lambda: self.import_data('customers'))
+        import_menu.add_command(label="导入业务员", command=lambda: self.import_data('salesmen'))
+        file_menu.add_cascade(label="导入数据", menu=import_menu)
+        file_menu.add_command(label="退出", command=self.on_close)
         menubar.add_cascade(label="文件", menu=file_menu)
 
         # 合同管理菜单
@@ -105,6 +84,8 @@ class ContractManagementSystem:
         contract_menu.add_command(label="合同管理", command=self.open_contract_management)
         contract_menu.add_command(label="合同进度查询", command=self.open_contract_progress)
         contract_menu.add_command(label="合同应收报表", command=self.open_contract_receivable_report)
+        contract_menu.add_command(label="应收账龄分析", command=self.open_receivable_aging_report)
+        contract_menu.add_command(label="月度签约收款", command=self.open_monthly_summary)
         menubar.add_cascade(label="合同管理", menu=contract_menu)
 
         # 收款管理菜单
@@ -120,6 +101,7 @@ class ContractManagementSystem:
         # 业务员管理菜单
         salesman_menu = tk.Menu(menubar, tearoff=0)
         salesman_menu.add_command(label="业务员管理", command=self.open_salesman_management)
+        salesman_menu.add_command(label="业务员业绩", command=self.open_salesman_performance)
         menubar.add_cascade(label="业务员管理", menu=salesman_menu)
 
         # 日志菜单
@@ -143,10 +125,9 @@ class ContractManagementSystem:
 
     def create_main_frame(self):
         """创建主界面"""
-        # 清空当前界面
-        for widget in self.root.winfo_children():
-            if isinstance(widget, tk.Frame) and widget != self.root.nametowidget('.!menu'):
-                widget.destroy()
+        # 界面已创建时直接显示
+        if self.screens.show('main'):
+            return
 
         # 创建主框架
         main_frame = tk.Frame(self.root, bg='white')
@@ -204,12 +185,13 @@ class ContractManagementSystem:
         buttons_frame.grid_rowconfigure(0, weight=1)
         buttons_frame.grid_rowconfigure(1, weight=1)
 
+        self.screens.add('main', main_frame)
+
     def open_contract_progress(self):
         """打开合同进度查询界面"""
-        # 清空当前界面
-        for widget in self.root.winfo_children():
-            if isinstance(widget, tk.Frame) and widget != self.root.nametowidget('.!menu'):
-                widget.destroy()
+        # 界面已创建时直接显示
+        if self.screens.show('contract_progress'):
+            return
 
         # 创建合同进度查询框架
         progress_frame = tk.Frame(self.root)
@@ -230,15 +212,21 @@ class ContractManagementSystem:
         contract_combobox = ttk.Combobox(select_frame, textvariable=contract_var, width=30)
         contract_combobox.pack(side=tk.LEFT, padx=5)
 
-        # 加载合同数据到下拉框
-        try:
-            df = self.data_manager.get_all_contracts()
-            contract_list = [f"{row['合同编号']} - {row['客户名称']}" for _, row in df.iterrows()]
+        # 在后台加载合同数据到下拉框
+        def load_contracts():
+            df = self.data_manager.query('contracts', columns=['合同编号', '客户名称'])
+            return [f"{contract_id} - {customer}" for contract_id, customer in zip(df['合同编号'], df['客户名称'])]
+
+        def show_contracts(contract_list):
             contract_combobox['values'] = contract_list
             if contract_list:
                 contract_combobox.current(0)
-        except Exception as e:
-            messagebox.showerror("错误", f"加载合同数据失败: {str(e)}")
+
+        def reload_contracts():
+            self.loader.submit(load_contracts, show_contracts,
+                               on_error=lambda e: messagebox.showerror("错误", f"加载合同数据失败: {str(e)}"))
+
+        reload_contracts()
 
         # 查询按钮
         def query_progress():
@@ -262,10 +250,10 @@ class ContractManagementSystem:
 
             # 获取合同详情
             try:
-                df_contract = self.data_manager.get_all_contracts()
-                # 确保合同编号列是字符串类型
-                df_contract['合同编号'] = df_contract['合同编号'].astype(str)
-                contract_data = df_contract[df_contract['合同编号'] == contract_id].iloc[0].to_dict()
+                contract_data = self.data_manager.get_contract(contract_id)
+                if contract_data is None:
+                    messagebox.showerror("错误", f"未找到合同编号为 {contract_id} 的合同数据")
+                    return
 
                 # 显示合同基本信息和进度
                 tk.Label(info_frame, text="合同基本信息", font=('SimHei', 12, 'bold')).grid(row=0, column=0, columnspan=2, pady=5)
@@ -277,29 +265,17 @@ class ContractManagementSystem:
                 tk.Label(info_frame, text=contract_data['客户名称'], font=('SimHei', 10)).grid(row=2, column=1, sticky=tk.W, pady=2)
 
                 tk.Label(info_frame, text="合同金额:", font=('SimHei', 10)).grid(row=3, column=0, sticky=tk.W, pady=2)
-                tk.Label(info_frame, text=contract_data['合同金额'], font=('SimHei', 10)).grid(row=3, column=1, sticky=tk.W, pady=2)
+                tk.Label(info_frame, text=display_value(contract_data['合同金额']), font=('SimHei', 10)).grid(row=3, column=1, sticky=tk.W, pady=2)
 
                 # 获取收款信息
-                df_payment = self.data_manager.get_all_payments()
-                # 确保合同编号列是字符串类型
-                df_payment['合同编号'] = df_payment['合同编号'].astype(str)
-                payment_data = df_payment[df_payment['合同编号'] == contract_id]
-
-                # 计算已收款金额
-                try:
-                    received_amount = payment_data['收款金额'].sum() if not payment_data.empty else 0
-                except Exception as e:
-                    received_amount = 0
-                    print(f"计算已收款金额出错: {str(e)}")
+                payment_data = self.data_manager.get_payments_for_contract(contract_id)
 
-                # 计算应收款金额
-                try:
-                    contract_amount = float(contract_data['合同金额']) if contract_data['合同金额'] and str(contract_data['合同金额']).strip() else 0
-                    receivable_amount = contract_amount - received_amount
-                except ValueError:
-                    contract_amount = 0
-                    receivable_amount = 0
-                    print(f"合同金额格式错误: {contract_data['合同金额']}")
+                # 计算已收款金额、应收款金额和是否超期
+                receivable = self.data_manager.get_receivables(where={'合同编号': contract_id})
+                if receivable.empty:
+                    received_amount, receivable_amount, overdue = 0, 0, False
+                else:
+                    received_amount, receivable_amount, overdue = receivable.iloc[0][['已收款金额', '未收款金额', '是否超期']]
 
                 tk.Label(info_frame, text="已收款金额:", font=('SimHei', 10)).grid(row=4, column=0, sticky=tk.W, pady=2)
                 tk.Label(info_frame, text=f"{received_amount:.2f}", font=('SimHei', 10)).grid(row=4, column=1, sticky=tk.W, pady=2)
@@ -308,25 +284,10 @@ class ContractManagementSystem:
                 tk.Label(info_frame, text=f"{receivable_amount:.2f}", font=('SimHei', 10)).grid(row=5, column=1, sticky=tk.W, pady=2)
 
                 tk.Label(info_frame, text="到期时间:", font=('SimHei', 10)).grid(row=6, column=0, sticky=tk.W, pady=2)
-                tk.Label(info_frame, text=contract_data['交货日期'], font=('SimHei', 10)).grid(row=6, column=1, sticky=tk.W, pady=2)
+                tk.Label(info_frame, text=display_value(contract_data['交货日期']), font=('SimHei', 10)).grid(row=6, column=1, sticky=tk.W, pady=2)
 
                 # 检查是否超期
-                today = datetime.now().date()
-                delivery_date = None
-                try:
-                    if contract_data['交货日期'] and str(contract_data['交货日期']).strip():
-                        # 尝试多种日期格式
-                        date_formats = ['%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%d/%m/%Y']
-                        for fmt in date_formats:
-                            try:
-                                delivery_date = datetime.strptime(str(contract_data['交货日期']), fmt).date()
-                                break
-                            except ValueError:
-                                continue
-                except Exception as e:
-                    print(f"解析交货日期出错: {str(e)}")
-
-                if delivery_date and today > delivery_date:
+                if overdue:
                     status = "已超期"
                     status_color = "red"
                 else:
@@ -358,7 +319,7 @@ class ContractManagementSystem:
 
                 # 加载收款数据
                 for index, row in payment_data.iterrows():
-                    payment_tree.insert('', tk.END, values=(
+                    payment_tree.insert('', tk.END, values=display_values(
                         row['收款ID'],
                         row['收款日期'],
                         row['收款金额'],
@@ -385,12 +346,13 @@ class ContractManagementSystem:
         payment_frame = tk.Frame(progress_frame, bd=1, relief=tk.SUNKEN)
         payment_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
+        self.screens.add('contract_progress', progress_frame, refresh=reload_contracts, tables=['contracts'])
+
     def open_contract_receivable_report(self):
         """打开合同应收报表界面"""
-        # 清空当前界面
-        for widget in self.root.winfo_children():
-            if isinstance(widget, tk.Frame) and widget != self.root.nametowidget('.!menu'):
-                widget.destroy()
+        # 界面已创建时直接显示
+        if self.screens.show('receivable_report'):
+            return
 
         # 创建报表框架
         report_frame = tk.Frame(self.root)
@@ -412,49 +374,36 @@ class ContractManagementSystem:
 
         # 刷新按钮
         def refresh_report():
-            """刷新报表"""
-            # 清空表格
-            for item in report_tree.get_children():
-                report_tree.delete(item)
-
-            try:
-                # 获取所有合同数据
-                df_contract = self.data_manager.get_all_contracts()
-                df_payment = self.data_manager.get_all_payments()
+            """在后台重新计算报表，完成后刷新表格"""
+            today = datetime.now().date()
+            status_filter = status_var.get()
 
-                # 计算每个合同的已收款金额
-                payment_summary = df_payment.groupby('合同编号')['收款金额'].sum().reset_index()
-                payment_summary.columns = ['合同编号', '已收款金额']
-
-                # 合并合同数据和收款数据
-                merged_df = pd.merge(df_contract, payment_summary, on='合同编号', how='left')
-                merged_df['已收款金额'] = merged_df['已收款金额'].fillna(0)
-
-                # 计算未收款金额
-                merged_df['未收款金额'] = merged_df['合同金额'].astype(float) - merged_df['已收款金额']
-
-                # 获取今天的日期
-                today = datetime.now().date()
-
-                # 检查是否超期
-                merged_df['是否超期'] = merged_df['交货日期'].apply(lambda x: True if x and datetime.strptime(x, '%Y-%m-%d').date() < today else False)
+            def load():
+                # 已超期过滤在计算前执行，只计算需要显示的合同
+                where = {'交货日期': {'<': today}} if status_filter == "已超期" else None
+                merged_df = self.data_manager.get_receivables(where=where, today=today,
+                                                              columns=['客户名称', '业务员', '签订日期'])
 
                 # 状态过滤
-                status_filter = status_var.get()
                 if status_filter == "正常":
                     merged_df = merged_df[merged_df['是否超期'] == False]
                 elif status_filter == "已超期":
                     merged_df = merged_df[merged_df['是否超期'] == True]
 
                 # 按超期状态和到期日期排序
-                merged_df = merged_df.sort_values(by=['是否超期', '交货日期'], ascending=[False, True])
+                return merged_df.sort_values(by=['是否超期', '交货日期'], ascending=[False, True])
+
+            def show(merged_df):
+                # 清空表格
+                for item in report_tree.get_children():
+                    report_tree.delete(item)
 
                 # 显示数据
                 for index, row in merged_df.iterrows():
                     # 设置超期行的字体颜色为红色
                     tags = ('overdue',) if row['是否超期'] else ()
 
-                    report_tree.insert('', tk.END, values=(
+                    report_tree.insert('', tk.END, values=display_values(
                         row['合同编号'],
                         row['客户名称'],
                         row['业务员'],
@@ -466,8 +415,7 @@ class ContractManagementSystem:
                         "已超期" if row['是否超期'] else "正常"
                     ), tags=tags)
 
-            except Exception as e:
-                messagebox.showerror("错误", f"加载报表数据出错: {str(e)}")
+            self.loader.submit(load, show, on_error=lambda e: messagebox.showerror("错误", f"加载报表数据出错: {str(e)}"))
 
         tk.Button(filter_frame, text="刷新", command=refresh_report).pack(side=tk.LEFT, padx=5)
         tk.Button(filter_frame, text="返回主界面", command=self.create_main_frame).pack(side=tk.RIGHT, padx=5)
@@ -501,16 +449,196 @@ class ContractManagementSystem:
         # 设置超期行的样式
         report_tree.tag_configure('overdue', foreground='red')
 
+        self.screens.add('receivable_report', report_frame, refresh=refresh_report, tables=['contracts', 'payments'])
+
         # 初始加载数据
         refresh_report()
 
+    def open_receivable_aging_report(self):
+        """打开应收账龄分析界面"""
+        # 界面已创建时直接显示
+        if self.screens.show('aging_report'):
+            return
+
+        # 创建报表框架
+        report_frame = tk.Frame(self.root)
+        report_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        # 创建标题
+        title_label = tk.Label(report_frame, text="应收账龄分析", font=('SimHei', 16, 'bold'))
+        title_label.pack(pady=10)
+
+        # 创建汇总方式选择区域
+        filter_frame = tk.Frame(report_frame)
+        filter_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        tk.Label(filter_frame, text="汇总方式:", font=('SimHei', 10)).pack(side=tk.LEFT, padx=5)
+        group_var = tk.StringVar(value="按合同")
+        group_combo = ttk.Combobox(filter_frame, textvariable=group_var, width=10, state='readonly',
+                                   values=["按合同", "按客户", "按业务员"])
+        group_combo.pack(side=tk.LEFT, padx=5)
+
+        # 汇总方式 -> 汇总列
+        group_columns = {"按合同": None, "按客户": "客户名称", "按业务员": "业务员"}
+        contract_columns = ["合同编号", "客户名称", "业务员", "交货日期", "未收款金额", "逾期天数", "账龄"]
+        amount_columns = {"未收款金额", "未到期", "1-30天", "31-60天", "61-90天", "90天以上", "合计"}
+
+        def refresh_report():
+            """在后台重新计算账龄，完成后刷新表格"""
+            group_by = group_columns[group_var.get()]
+
+            def show(df):
+                for item in report_tree.get_children():
+                    report_tree.delete(item)
+
+                columns = contract_columns if group_by is None else list(df.columns)
+
+                # 按汇总方式重新设置表格列
+                report_tree['columns'] = columns
+                for col in columns:
+                    report_tree.heading(col, text=col)
+                    report_tree.column(col, width=150 if col in ("客户名称", "合同编号") else 100, anchor=tk.CENTER)
+
+                for values in df.reindex(columns=columns).itertuples(index=False, name=None):
+                    row = [f"{value:.2f}" if col in amount_columns and pd.notna(value) else display_value(value)
+                           for col, value in zip(columns, values)]
+                    # 逾期 90 天以上的合同标红
+                    tags = ('overdue',) if group_by is None and values[-1] == "90天以上" else ()
+                    report_tree.insert('', tk.END, values=row, tags=tags)
+
+            self.loader.submit(lambda: self.data_manager.get_aging_report(group_by), show,
+                               on_error=lambda e: messagebox.showerror("错误", f"加载账龄数据出错: {str(e)}"))
+
+        group_combo.bind("<<ComboboxSelected>>", lambda event: refresh_report())
+        tk.Button(filter_frame, text="刷新", command=refresh_report).pack(side=tk.LEFT, padx=5)
+        tk.Button(filter_frame, text="返回主界面", command=self.create_main_frame).pack(side=tk.RIGHT, padx=5)
+
+        # 创建报表表格
+        report_tree = ttk.Treeview(report_frame, columns=contract_columns, show="headings")
+
+        # 添加滚动条
+        scrollbar_y = ttk.Scrollbar(report_frame, orient=tk.VERTICAL, command=report_tree.yview)
+        scrollbar_x = ttk.Scrollbar(report_frame, orient=tk.HORIZONTAL, command=report_tree.xview)
+        report_tree.configure(yscroll=scrollbar_y.set, xscroll=scrollbar_x.set)
+
+        scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
+        report_tree.pack(fill=tk.BOTH, expand=True)
+
+        report_tree.tag_configure('overdue', foreground='red')
+
+        self.screens.add('aging_report', report_frame, refresh=refresh_report, tables=['contracts', 'payments'])
+
+        # 初始加载数据
+        refresh_report()
+
+    def open_monthly_summary(self):
+        """打开月度签约收款界面"""
+        # 界面已创建时直接显示
+        if self.screens.show('monthly_summary'):
+            return
+
+        # 创建报表框架
+        summary_frame = tk.Frame(self.root)
+        summary_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        # 创建标题
+        title_label = tk.Label(summary_frame, text="月度签约收款", font=('SimHei', 16, 'bold'))
+        title_label.pack(pady=10)
+
+        # 创建筛选区域
+        filter_frame = tk.Frame(summary_frame)
+        filter_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        tk.Label(filter_frame, text="汇总方式:", font=('SimHei', 10)).pack(side=tk.LEFT, padx=5)
+        group_var = tk.StringVar(value="按月份")
+        group_combo = ttk.Combobox(filter_frame, textvariable=group_var, width=10, state='readonly',
+                                   values=["按月份", "按客户", "按业务员", "按付款方式"])
+        group_combo.pack(side=tk.LEFT, padx=5)
+
+        tk.Label(filter_frame, text="客户:", font=('SimHei', 10)).pack(side=tk.LEFT, padx=5)
+        customer_var = tk.StringVar()
+        tk.Entry(filter_frame, textvariable=customer_var, width=12).pack(side=tk.LEFT, padx=5)
+
+        tk.Label(filter_frame, text="业务员:", font=('SimHei', 10)).pack(side=tk.LEFT, padx=5)
+        salesman_var = tk.StringVar()
+        tk.Entry(filter_frame, textvariable=salesman_var, width=10).pack(side=tk.LEFT, padx=5)
+
+        tk.Label(filter_frame, text="月份(YYYY-MM):", font=('SimHei', 10)).pack(side=tk.LEFT, padx=5)
+        start_var = tk.StringVar()
+        tk.Entry(filter_frame, textvariable=start_var, width=8).pack(side=tk.LEFT)
+        tk.Label(filter_frame, text="至").pack(side=tk.LEFT, padx=2)
+        end_var = tk.StringVar()
+        tk.Entry(filter_frame, textvariable=end_var, width=8).pack(side=tk.LEFT)
+
+        # 汇总方式 -> 汇总维度
+        group_columns = {"按月份": ["月份"], "按客户": ["客户名称", "月份"],
+                         "按业务员": ["业务员", "月份"], "按付款方式": ["付款方式", "月份"]}
+        measure_columns = ["签约金额", "合同数", "收款金额"]
+
+        def refresh_summary():
+            """在后台按筛选条件切片月度汇总，完成后刷新表格"""
+            where = {}
+            if customer_var.get().strip():
+                where['客户名称'] = customer_var.get().strip()
+            if salesman_var.get().strip():
+                where['业务员'] = salesman_var.get().strip()
+            start = start_var.get().strip() or None
+            end = end_var.get().strip() or None
+            try:
+                for month in (start, end):
+                    if month:
+                        datetime.strptime(month, '%Y-%m')
+            except ValueError:
+                messagebox.showerror("错误", "月份格式应为 YYYY-MM!")
+                return
+
+            by = group_columns[group_var.get()]
+            columns = by + measure_columns
+
+            def show(df):
+                for item in summary_tree.get_children():
+                    summary_tree.delete(item)
+
+                # 按汇总方式重新设置表格列
+                summary_tree['columns'] = columns
+                for col in columns:
+                    summary_tree.heading(col, text=col)
+                    summary_tree.column(col, width=150 if col == "客户名称" else 100, anchor=tk.CENTER)
+
+                for values in df.reindex(columns=columns).itertuples(index=False, name=None):
+                    summary_tree.insert('', tk.END, values=[
+                        f"{value:.2f}" if col in ("签约金额", "收款金额") else display_value(value)
+                        for col, value in zip(columns, values)
+                    ])
+
+            self.loader.submit(lambda: self.data_manager.get_monthly_summary(by, where, start, end), show,
+                               on_error=lambda e: messagebox.showerror("错误", f"加载月度汇总出错: {str(e)}"))
+
+        group_combo.bind("<<ComboboxSelected>>", lambda event: refresh_summary())
+        tk.Button(filter_frame, text="查询", command=refresh_summary).pack(side=tk.LEFT, padx=5)
+        tk.Button(filter_frame, text="返回主界面", command=self.create_main_frame).pack(side=tk.RIGHT, padx=5)
+
+        # 创建汇总表格
+        summary_tree = ttk.Treeview(summary_frame, columns=["月份"] + measure_columns, show="headings")
+
+        # 添加滚动条
+        scrollbar_y = ttk.Scrollbar(summary_frame, orient=tk.VERTICAL, command=summary_tree.yview)
+        summary_tree.configure(yscroll=scrollbar_y.set)
+        scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        summary_tree.pack(fill=tk.BOTH, expand=True)
+
+        self.screens.add('monthly_summary', summary_frame, refresh=refresh_summary, tables=['contracts', 'payments'])
+
+        # 初始加载数据
+        refresh_summary()
+
     def open_contract_management(self):
         """打开合同管理界面"""
         self.log_operation('打开合同管理界面')
-        # 清空当前界面
-        for widget in self.root.winfo_children():
-            if isinstance(widget, tk.Frame) and widget != self.root.nametowidget('.!menu'):
-                widget.destroy()
+        # 界面已创建时直接显示
+        if self.screens.show('contract_management'):
+            return
 
         # 创建合同管理框架
         contract_frame = tk.Frame(self.root)
@@ -540,35 +668,26 @@ class ContractManagementSystem:
                 messagebox.showwarning("警告", "请输入搜索内容!")
                 return
 
-            try:
-                # 调用数据管理器进行搜索
-                search_results = self.data_manager.search_contracts(search_term, search_type_val)
-
-                # 清空表格
-                for item in tree.get_children():
-                    tree.delete(item)
-
-                # 加载搜索结果
-                if not search_results.empty:
-                    for index, row in search_results.iterrows():
-                        tree.insert('', tk.END, values=(
-                            row['合同编号'],
-                            row['客户名称'],
-                            row['业务员'],
-                            row['签订日期'],
-                            row['合同金额'],
-                            row['付款方式'],
-                            row['交货日期'],
-                            row['状态']
-                        ))
-                    messagebox.showinfo("成功", f"找到 {len(search_results)} 条匹配记录")
+            def report():
+                if tree.total:
+                    messagebox.showinfo("成功", f"找到 {tree.total} 条匹配记录")
                 else:
                     messagebox.showinfo("提示", "没有找到匹配的合同记录")
-            except Exception as e:
-                messagebox.showerror("错误", f"搜索合同出错: {str(e)}")
+
+            # 在后台搜索，完成后加载搜索结果
+            tree.set_source(SearchSource(lambda: self.data_manager.search_contracts(search_term, search_type_val),
+                                         columns),
+                            loader=self.loader, on_done=report,
+                            on_error=lambda e: messagebox.showerror("错误", f"搜索合同出错: {str(e)}"))
 
         tk.Button(search_frame, text="搜索", command=search_contract).pack(side=tk.LEFT, padx=5)
-        tk.Button(search_frame, text="刷新", command=self.open_contract_management).pack(side=tk.LEFT, padx=5)
+
+        def refresh_list():
+            """清空搜索条件，重新加载全部合同"""
+            search_var.set('')
+            load_contracts()
+
+        tk.Button(search_frame, text="刷新", command=refresh_list).pack(side=tk.LEFT, padx=5)
 
         # 创建按钮组
         btn_frame = tk.Frame(contract_frame)
@@ -641,7 +760,7 @@ class ContractManagementSystem:
             # 付款方式
             tk.Label(form_frame, text="付款方式*:", font=font).grid(row=6, column=0, sticky=tk.W, pady=5)
             payment_var = tk.StringVar(value="电汇")
-            ttk.Combobox(form_frame, textvariable=payment_var, width=28, values=["电汇", "支票", "现金", "其他"]).grid(row=6, column=1, pady=5)
+            ttk.Combobox(form_frame, textvariable=payment_var, width=28, values=PAYMENT_TERMS).grid(row=6, column=1, pady=5)
 
             # 交货日期
             tk.Label(form_frame, text="交货日期*:", font=font).grid(row=7, column=0, sticky=tk.W, pady=5)
@@ -651,7 +770,7 @@ class ContractManagementSystem:
             # 状态
             tk.Label(form_frame, text="状态*:", font=font).grid(row=8, column=0, sticky=tk.W, pady=5)
             status_var = tk.StringVar(value="待执行")
-            ttk.Combobox(form_frame, textvariable=status_var, width=28, values=["待执行", "执行中", "已完成", "已取消"]).grid(row=8, column=1, pady=5)
+            ttk.Combobox(form_frame, textvariable=status_var, width=28, values=CONTRACT_STATUSES).grid(row=8, column=1, pady=5)
 
             def save_contract():
                 # 数据验证
@@ -684,13 +803,22 @@ class ContractManagementSystem:
                     "状态": status_var.get()
                 }
 
+                # 检查信用额度
+                try:
+                    amount = float(amount_var.get())
+                except ValueError:
+                    amount = 0
+                if not self.confirm_credit(contract_data["客户名称"], amount, status=contract_data["状态"]):
+                    return
+
                 # 保存数据
                 try:
-                    if self.data_manager.add_contract(contract_data):
+                    record = self.data_manager.add_contract(contract_data)
+                    if record:
                         self.log_operation('添加新合同成功')
                         messagebox.showinfo("成功", "合同添加成功!")
                         add_window.destroy()
-                        self.open_contract_management()  # 刷新合同列表
+                        tree.insert_record(record)  # 表格中加入新合同，不重新读取
                     else:
                         messagebox.showerror("错误", "合同添加失败!")
                 except Exception as e:
@@ -705,7 +833,7 @@ class ContractManagementSystem:
 
         # 创建合同表格
         columns = ("合同编号", "客户名称", "业务员", "签订日期", "合同金额", "付款方式", "交货日期", "状态")
-        tree = ttk.Treeview(contract_frame, columns=columns, show="headings")
+        tree = VirtualTreeview(contract_frame, columns=columns)
 
         def edit_contract():
             """编辑合同"""
@@ -722,19 +850,11 @@ class ContractManagementSystem:
 
             # 获取合同详情
             try:
-                df = self.data_manager.get_all_contracts()
-                # 确保合同编号是相同类型
                 contract_id = str(contract_id)
-                df['合同编号'] = df['合同编号'].astype(str)
-                
-                # 查找匹配的合同
-                matching_contracts = df[df['合同编号'] == contract_id]
-                
-                if matching_contracts.empty:
+                contract_data = self.data_manager.get_contract(contract_id)
+                if contract_data is None:
                     messagebox.showerror("错误", f"未找到合同编号为 {contract_id} 的合同!")
                     return
-                
-                contract_data = matching_contracts.iloc[0].to_dict()
             except Exception as e:
                 messagebox.showerror("错误", f"获取合同信息失败: {str(e)}")
                 return
@@ -770,28 +890,28 @@ class ContractManagementSystem:
 
             # 签订日期
             tk.Label(form_frame, text="签订日期*:", font=font).grid(row=3, column=0, sticky=tk.W, pady=5)
-            date_var = tk.StringVar(value=contract_data['签订日期'])
+            date_var = tk.StringVar(value=display_value(contract_data['签订日期']))
             tk.Entry(form_frame, textvariable=date_var, width=30).grid(row=3, column=1, pady=5)
 
             # 合同金额
             tk.Label(form_frame, text="合同金额*:", font=font).grid(row=4, column=0, sticky=tk.W, pady=5)
-            amount_var = tk.StringVar(value=contract_data['合同金额'])
+            amount_var = tk.StringVar(value=display_value(contract_data['合同金额']))
             tk.Entry(form_frame, textvariable=amount_var, width=30).grid(row=4, column=1, pady=5)
 
             # 付款方式
             tk.Label(form_frame, text="付款方式*:", font=font).grid(row=5, column=0, sticky=tk.W, pady=5)
             payment_var = tk.StringVar(value=contract_data['付款方式'])
-            ttk.Combobox(form_frame, textvariable=payment_var, width=28, values=["电汇", "支票", "现金", "其他"]).grid(row=5, column=1, pady=5)
+            ttk.Combobox(form_frame, textvariable=payment_var, width=28, values=PAYMENT_TERMS).grid(row=5, column=1, pady=5)
 
             # 交货日期
             tk.Label(form_frame, text="交货日期*:", font=font).grid(row=6, column=0, sticky=tk.W, pady=5)
-            delivery_var = tk.StringVar(value=contract_data['交货日期'])
+            delivery_var = tk.StringVar(value=display_value(contract_data['交货日期']))
             tk.Entry(form_frame, textvariable=delivery_var, width=30).grid(row=6, column=1, pady=5)
 
             # 状态
             tk.Label(form_frame, text="状态*:", font=font).grid(row=7, column=0, sticky=tk.W, pady=5)
             status_var = tk.StringVar(value=contract_data['状态'])
-            ttk.Combobox(form_frame, textvariable=status_var, width=28, values=["待执行", "执行中", "已完成", "已取消"]).grid(row=7, column=1, pady=5)
+            ttk.Combobox(form_frame, textvariable=status_var, width=28, values=CONTRACT_STATUSES).grid(row=7, column=1, pady=5)
 
             def save_changes():
                 # 数据验证
@@ -822,13 +942,22 @@ class ContractManagementSystem:
                     "状态": status_var.get()
                 }
 
+                # 检查信用额度
+                try:
+                    amount = float(amount_var.get())
+                except ValueError:
+                    amount = 0
+                if not self.confirm_credit(update_data["客户名称"], amount, contract_id, update_data["状态"]):
+                    return
+
                 # 更新数据
                 try:
-                    if self.data_manager.update_contract(contract_id, update_data):
+                    record = self.data_manager.update_contract(contract_id, update_data)
+                    if record:
                         self.log_operation(f'更新合同 {contract_id} 成功')
                         messagebox.showinfo("成功", "合同更新成功!")
                         edit_window.destroy()
-                        self.open_contract_management()  # 刷新合同列表
+                        tree.update_record(contract_id, record)  # 只改写这一行
                     else:
                         messagebox.showerror("错误", "合同更新失败!")
                 except Exception as e:
@@ -862,9 +991,10 @@ class ContractManagementSystem:
             # 确认删除
             if messagebox.askyesno("确认", f"确定要删除合同编号为 {contract_id} 的 {contract_name} 合同吗?"):
                 try:
-                    if self.data_manager.delete_contract(contract_id):
+                    record = self.data_manager.delete_contract(contract_id)
+                    if record:
                         messagebox.showinfo("成功", "合同删除成功!")
-                        self.open_contract_management()  # 刷新合同列表
+                        tree.delete_record(contract_id)
                     else:
                         messagebox.showerror("错误", "合同删除失败!")
                 except Exception as e:
@@ -887,36 +1017,23 @@ class ContractManagementSystem:
         tree.column("合同金额", width=100)
         tree.column("状态", width=80)
 
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(contract_frame, orient=tk.VERTICAL, command=tree.yview)
-        tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # 表格只显示可见的行，滚动时按页读取数据
         tree.pack(fill=tk.BOTH, expand=True)
 
-        # 加载合同数据
-        try:
-            df = pd.read_excel(self.contract_file, engine='openpyxl')
-            for index, row in df.iterrows():
-                tree.insert('', tk.END, values=(
-                    row['合同编号'],
-                    row['客户名称'],
-                    row['业务员'],
-                    row['签订日期'],
-                    row['合同金额'],
-                    row['付款方式'],
-                    row['交货日期'],
-                    row['状态']
-                ))
-        except Exception as e:
-            messagebox.showerror("错误", f"加载合同数据失败: {str(e)}")
+        # 在后台加载合同数据，界面重新显示时合同数据有变化也重新加载
+        def load_contracts():
+            tree.set_source(TableSource(self.data_manager, 'contracts', columns), loader=self.loader,
+                            on_error=lambda e: messagebox.showerror("错误", f"加载合同数据失败: {str(e)}"))
+
+        self.screens.add('contract_management', contract_frame, refresh=load_contracts, tables=['contracts'])
+        load_contracts()
 
     def open_payment_management(self):
         """打开收款管理界面"""
         self.log_operation('打开收款管理界面')
-        # 清空当前界面
-        for widget in self.root.winfo_children():
-            if isinstance(widget, tk.Frame) and widget != self.root.nametowidget('.!menu'):
-                widget.destroy()
+        # 界面已创建时直接显示
+        if self.screens.show('payment_management'):
+            return
 
         # 创建收款管理框架
         payment_frame = tk.Frame(self.root)
@@ -946,28 +1063,20 @@ class ContractManagementSystem:
                 messagebox.showwarning("警告", "请输入搜索内容")
                 return
 
-            # 执行搜索
-            try:
-                df = self.data_manager.search_payments(search_term, search_type_val)
+            # 在后台搜索，完成后加载搜索结果
+            tree.set_source(SearchSource(lambda: self.data_manager.search_payments(search_term, search_type_val),
+                                         columns),
+                            loader=self.loader,
+                            on_error=lambda e: messagebox.showerror("错误", f"搜索失败: {str(e)}"))
 
-                # 清空表格
-                for item in tree.get_children():
-                    tree.delete(item)
+        tk.Button(search_frame, text="搜索", command=search_payment).pack(side=tk.LEFT, padx=5)
 
-                # 加载搜索结果
-                for index, row in df.iterrows():
-                    tree.insert('', tk.END, values=(
-                        row['收款ID'],
-                        row['合同编号'],
-                        row['收款日期'],
-                        row['收款金额'],
-                        row['收款方式']
-                    ))
-            except Exception as e:
-                messagebox.showerror("错误", f"搜索失败: {str(e)}")
+        def refresh_list():
+            """清空搜索条件，重新加载全部收款"""
+            search_var.set('')
+            load_payments()
 
-        tk.Button(search_frame, text="搜索", command=search_payment).pack(side=tk.LEFT, padx=5)
-        tk.Button(search_frame, text="刷新", command=self.open_payment_management).pack(side=tk.LEFT, padx=5)
+        tk.Button(search_frame, text="刷新", command=refresh_list).pack(side=tk.LEFT, padx=5)
 
         # 创建按钮组
         btn_frame = tk.Frame(payment_frame)
@@ -985,7 +1094,7 @@ class ContractManagementSystem:
             # 获取所有合同编号用于下拉选择
             contract_ids = []
             try:
-                df_contracts = pd.read_excel(self.contract_file, engine='openpyxl')
+                df_contracts = self.data_manager.get_all_contracts()
                 contract_ids = df_contracts['合同编号'].tolist()
             except Exception as e:
                 messagebox.showerror("错误", f"读取合同数据失败: {str(e)}")
@@ -1014,7 +1123,7 @@ class ContractManagementSystem:
             tk.Label(form_frame, text="收款方式:", font=('SimHei', 10)).grid(row=3, column=0, sticky=tk.W, pady=5)
             payment_method_var = tk.StringVar()
             payment_method_combo = ttk.Combobox(form_frame, textvariable=payment_method_var, width=30, 
-                                               values=["银行转账", "信用证", "现金", "其他"])
+                                               values=RECEIPT_METHODS)
             payment_method_combo.grid(row=3, column=1, pady=5)
 
             # 备注
@@ -1045,11 +1154,12 @@ class ContractManagementSystem:
                     return
 
                 # 保存数据
-                if self.data_manager.add_payment(payment_data):
+                record = self.data_manager.add_payment(payment_data)
+                if record:
                     self.log_operation(f'为合同 {payment_data["合同编号"]} 添加收款 {payment_data["收款金额"]} 元')
                     messagebox.showinfo("成功", "收款添加成功")
                     add_window.destroy()
-                    self.open_payment_management()
+                    tree.insert_record(record)
                 else:
                     messagebox.showerror("错误", "收款添加失败")
 
@@ -1072,8 +1182,9 @@ class ContractManagementSystem:
 
             # 获取该收款的详细信息
             try:
-                df = pd.read_excel(self.payment_file, engine='openpyxl')
-                payment_data = df[df['收款ID'] == payment_id].iloc[0].to_dict()
+                payment_data = self.data_manager.get_payment(payment_id)
+                if payment_data is None:
+                    raise KeyError(f"未找到收款ID {payment_id}")
             except Exception as e:
                 messagebox.showerror("错误", f"读取收款数据失败: {str(e)}")
                 return
@@ -1089,7 +1200,7 @@ class ContractManagementSystem:
             # 获取所有合同编号用于下拉选择
             contract_ids = []
             try:
-                df_contracts = pd.read_excel(self.contract_file, engine='openpyxl')
+                df_contracts = self.data_manager.get_all_contracts()
                 contract_ids = df_contracts['合同编号'].tolist()
             except Exception as e:
                 messagebox.showerror("错误", f"读取合同数据失败: {str(e)}")
@@ -1110,19 +1221,19 @@ class ContractManagementSystem:
 
             # 收款日期
             tk.Label(form_frame, text="收款日期:", font=('SimHei', 10)).grid(row=2, column=0, sticky=tk.W, pady=5)
-            payment_date_var = tk.StringVar(value=str(payment_data['收款日期']))
+            payment_date_var = tk.StringVar(value=display_value(payment_data['收款日期']))
             tk.Entry(form_frame, textvariable=payment_date_var, width=32).grid(row=2, column=1, pady=5)
 
             # 收款金额
             tk.Label(form_frame, text="收款金额:", font=('SimHei', 10)).grid(row=3, column=0, sticky=tk.W, pady=5)
-            amount_var = tk.StringVar(value=str(payment_data['收款金额']))
+            amount_var = tk.StringVar(value=display_value(payment_data['收款金额']))
             tk.Entry(form_frame, textvariable=amount_var, width=32).grid(row=3, column=1, pady=5)
 
             # 收款方式
             tk.Label(form_frame, text="收款方式:", font=('SimHei', 10)).grid(row=4, column=0, sticky=tk.W, pady=5)
             payment_method_var = tk.StringVar(value=payment_data['收款方式'])
             payment_method_combo = ttk.Combobox(form_frame, textvariable=payment_method_var, width=30, 
-                                               values=["银行转账", "信用证", "现金", "其他"])
+                                               values=RECEIPT_METHODS)
             payment_method_combo.grid(row=4, column=1, pady=5)
 
             # 备注
@@ -1155,11 +1266,12 @@ class ContractManagementSystem:
                     return
 
                 # 更新数据
-                if self.data_manager.update_payment(payment_id, update_data):
+                record = self.data_manager.update_payment(payment_id, update_data)
+                if record:
                     self.log_operation(f'更新收款记录，收款ID: {payment_id}，合同编号: {update_data["合同编号"]}，金额: {update_data["收款金额"]} 元')
                     messagebox.showinfo("成功", "收款更新成功")
                     edit_window.destroy()
-                    self.open_payment_management()
+                    tree.update_record(payment_id, record)
                 else:
                     messagebox.showerror("错误", "收款更新失败")
 
@@ -1183,10 +1295,11 @@ class ContractManagementSystem:
             # 确认删除
             if messagebox.askyesno("确认", f"确定要删除收款ID为 {payment_id} 的记录吗?"):
                 # 删除数据
-                if self.data_manager.delete_payment(payment_id):
+                record = self.data_manager.delete_payment(payment_id)
+                if record:
                     self.log_operation(f'删除收款记录，收款ID: {payment_id}')
                     messagebox.showinfo("成功", "收款删除成功")
-                    self.open_payment_management()
+                    tree.delete_record(payment_id)
                 else:
                     messagebox.showerror("错误", "收款删除失败")
 
@@ -1197,7 +1310,7 @@ class ContractManagementSystem:
 
         # 创建收款表格
         columns = ("收款ID", "合同编号", "收款日期", "收款金额", "收款方式")
-        tree = ttk.Treeview(payment_frame, columns=columns, show="headings")
+        tree = VirtualTreeview(payment_frame, columns=columns)
 
         # 设置列宽和标题
         for col in columns:
@@ -1209,33 +1322,23 @@ class ContractManagementSystem:
         tree.column("合同编号", width=120)
         tree.column("收款金额", width=100)
 
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(payment_frame, orient=tk.VERTICAL, command=tree.yview)
-        tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # 表格只显示可见的行，滚动时按页读取数据
         tree.pack(fill=tk.BOTH, expand=True)
 
-        # 加载收款数据
-        try:
-            df = pd.read_excel(self.payment_file, engine='openpyxl')
-            for index, row in df.iterrows():
-                tree.insert('', tk.END, values=(
-                    row['收款ID'],
-                    row['合同编号'],
-                    row['收款日期'],
-                    row['收款金额'],
-                    row['收款方式']
-                ))
-        except Exception as e:
-            messagebox.showerror("错误", f"加载收款数据失败: {str(e)}")
+        # 在后台加载收款数据，界面重新显示时收款数据有变化也重新加载
+        def load_payments():
+            tree.set_source(TableSource(self.data_manager, 'payments', columns), loader=self.loader,
+                            on_error=lambda e: messagebox.showerror("错误", f"加载收款数据失败: {str(e)}"))
+
+        self.screens.add('payment_management', payment_frame, refresh=load_payments, tables=['payments'])
+        load_payments()
 
     def open_customer_management(self):
         """打开客户管理界面"""
         self.log_operation('打开客户管理界面')
-        # 清空当前界面
-        for widget in self.root.winfo_children():
-            if isinstance(widget, tk.Frame) and widget != self.root.nametowidget('.!menu'):
-                widget.destroy()
+        # 界面已创建时直接显示
+        if self.screens.show('customer_management'):
+            return
 
         # 创建客户管理框架
         customer_frame = tk.Frame(self.root)
@@ -1270,32 +1373,25 @@ class ContractManagementSystem:
                 tk.messagebox.showwarning("警告", "请输入搜索内容！")
                 return
 
-            try:
-                # 执行搜索
-                df = self.data_manager.search_customers(search_term, search_type_val)
-
-                # 清空表格
-                for item in tree.get_children():
-                    tree.delete(item)
-
-                # 显示搜索结果
-                if df.empty:
+            def report():
+                if not tree.total:
                     tk.messagebox.showinfo("提示", "未找到匹配的客户记录！")
-                else:
-                    for index, row in df.iterrows():
-                        tree.insert('', tk.END, values=(
-                            row['客户ID'],
-                            row['客户名称'],
-                            row['联系人'],
-                            row['联系电话'],
-                            row['地址'] if pd.notna(row['地址']) else '',
-                            row['邮箱'] if pd.notna(row['邮箱']) else ''
-                        ))
-            except Exception as e:
-                tk.messagebox.showerror("错误", f"搜索失败: {str(e)}")
+
+            # 在后台搜索，完成后显示搜索结果
+            tree.set_source(SearchSource(lambda: self.data_manager.search_customers(search_term, search_type_val),
+                                         columns),
+                            loader=self.loader, on_done=report,
+                            on_error=lambda e: tk.messagebox.showerror("错误", f"搜索失败: {str(e)}"))
 
         tk.Button(search_frame, text="搜索", command=search_customer).pack(side=tk.LEFT, padx=5)
-        tk.Button(search_frame, text="刷新", command=self.open_customer_management).pack(side=tk.LEFT, padx=5)
+
+        def refresh_list():
+            """清空搜索条件，重新加载全部客户"""
+            search_var.set('')
+            search_entry.delete(0, tk.END)
+            load_customers()
+
+        tk.Button(search_frame, text="刷新", command=refresh_list).pack(side=tk.LEFT, padx=5)
 
         # 创建按钮组
         btn_frame = tk.Frame(customer_frame)
@@ -1305,7 +1401,7 @@ class ContractManagementSystem:
             # 创建添加客户对话框
             add_window = tk.Toplevel(self.root)
             add_window.title("添加客户")
-            add_window.geometry("500x350")
+            add_window.geometry("500x390")
             add_window.resizable(False, False)
             add_window.transient(self.root)
             add_window.grab_set()
@@ -1339,6 +1435,11 @@ class ContractManagementSystem:
             email_var = tk.StringVar()
             tk.Entry(form_frame, textvariable=email_var, width=30).grid(row=4, column=1, pady=5)
 
+            # 信用额度
+            tk.Label(form_frame, text="信用额度:", font=('SimHei', 10)).grid(row=5, column=0, sticky=tk.W, pady=5)
+            credit_var = tk.StringVar()
+            tk.Entry(form_frame, textvariable=credit_var, width=30).grid(row=5, column=1, pady=5)
+
             # 保存按钮
             def save_customer():
                 name = name_var.get().strip()
@@ -1346,11 +1447,17 @@ class ContractManagementSystem:
                 phone = phone_var.get().strip()
                 address = address_var.get().strip()
                 email = email_var.get().strip()
+                credit = credit_var.get().strip()
 
                 # 验证必填字段
                 if not name or not contact or not phone:
                     tk.messagebox.showerror("错误", "客户名称、联系人和联系电话为必填项！")
                     return
+                try:
+                    float(credit or 0)
+                except ValueError:
+                    tk.messagebox.showerror("错误", "信用额度必须是数字！")
+                    return
 
                 # 准备客户数据
                 customer_data = {
@@ -1358,15 +1465,17 @@ class ContractManagementSystem:
                     '联系人': contact,
                     '联系电话': phone,
                     '地址': address,
-                    '邮箱': email
+                    '邮箱': email,
+                    '信用额度': credit
                 }
 
                 # 保存数据
-                if self.data_manager.add_customer(customer_data):
+                record = self.data_manager.add_customer(customer_data)
+                if record:
                     self.log_operation(f'添加新客户: {customer_data["客户名称"]}')
                     tk.messagebox.showinfo("成功", "客户添加成功！")
                     add_window.destroy()
-                    self.open_customer_management()
+                    tree.insert_record(record)
                 else:
                     tk.messagebox.showerror("错误", "客户添加失败！")
 
@@ -1389,13 +1498,15 @@ class ContractManagementSystem:
             customer_id = item['values'][0]
 
             # 获取客户详情
-            df = self.data_manager.get_all_customers()
-            customer = df[df['客户ID'] == customer_id].iloc[0].to_dict()
+            customer = self.data_manager.get_customer(customer_id)
+            if customer is None:
+                tk.messagebox.showerror("错误", f"未找到客户ID为 {customer_id} 的客户！")
+                return
 
             # 创建编辑客户对话框
             edit_window = tk.Toplevel(self.root)
             edit_window.title("编辑客户")
-            edit_window.geometry("500x350")
+            edit_window.geometry("500x420")
             edit_window.resizable(False, False)
             edit_window.transient(self.root)
             edit_window.grab_set()
@@ -1433,6 +1544,11 @@ class ContractManagementSystem:
             email_var = tk.StringVar(value=customer['邮箱'] if pd.notna(customer['邮箱']) else '')
             tk.Entry(form_frame, textvariable=email_var, width=30).grid(row=5, column=1, pady=5)
 
+            # 信用额度
+            tk.Label(form_frame, text="信用额度:", font=('SimHei', 10)).grid(row=6, column=0, sticky=tk.W, pady=5)
+            credit_var = tk.StringVar(value=display_value(customer.get('信用额度')))
+            tk.Entry(form_frame, textvariable=credit_var, width=30).grid(row=6, column=1, pady=5)
+
             # 保存按钮
             def update_customer():
                 name = name_var.get().strip()
@@ -1440,11 +1556,17 @@ class ContractManagementSystem:
                 phone = phone_var.get().strip()
                 address = address_var.get().strip()
                 email = email_var.get().strip()
+                credit = credit_var.get().strip()
 
                 # 验证必填字段
                 if not name or not contact or not phone:
                     tk.messagebox.showerror("错误", "客户名称、联系人和联系电话为必填项！")
                     return
+                try:
+                    float(credit or 0)
+                except ValueError:
+                    tk.messagebox.showerror("错误", "信用额度必须是数字！")
+                    return
 
                 # 准备更新数据
                 update_data = {
@@ -1452,15 +1574,17 @@ class ContractManagementSystem:
                     '联系人': contact,
                     '联系电话': phone,
                     '地址': address,
-                    '邮箱': email
+                    '邮箱': email,
+                    '信用额度': credit
                 }
 
                 # 更新数据
-                if self.data_manager.update_customer(customer_id, update_data):
+                record = self.data_manager.update_customer(customer_id, update_data)
+                if record:
                     self.log_operation(f'更新客户信息，客户ID: {customer_id}，客户名称: {update_data["客户名称"]}')
                     tk.messagebox.showinfo("成功", "客户更新成功！")
                     edit_window.destroy()
-                    self.open_customer_management()
+                    tree.update_record(customer_id, record)
                 else:
                     tk.messagebox.showerror("错误", "客户更新失败！")
 
@@ -1487,10 +1611,11 @@ class ContractManagementSystem:
             customer_id = item['values'][0]
 
             # 删除客户
-            if self.data_manager.delete_customer(customer_id):
+            record = self.data_manager.delete_customer(customer_id)
+            if record:
                 self.log_operation(f'删除客户，客户ID: {customer_id}')
                 tk.messagebox.showinfo("成功", "客户删除成功！")
-                self.open_customer_management()
+                tree.delete_record(customer_id)
             else:
                 tk.messagebox.showerror("错误", "客户删除失败！")
 
@@ -1501,7 +1626,7 @@ class ContractManagementSystem:
 
         # 创建客户表格
         columns = ("客户ID", "客户名称", "联系人", "联系电话", "地址", "邮箱")
-        tree = ttk.Treeview(customer_frame, columns=columns, show="headings")
+        tree = VirtualTreeview(customer_frame, columns=columns)
 
         # 设置列宽和标题
         for col in columns:
@@ -1516,34 +1641,23 @@ class ContractManagementSystem:
         tree.column("地址", width=200)
         tree.column("邮箱", width=150)
 
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(customer_frame, orient=tk.VERTICAL, command=tree.yview)
-        tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # 表格只显示可见的行，滚动时按页读取数据
         tree.pack(fill=tk.BOTH, expand=True)
 
-        # 加载客户数据
-        try:
-            df = pd.read_excel(self.customer_file, engine='openpyxl')
-            for index, row in df.iterrows():
-                tree.insert('', tk.END, values=(
-                    row['客户ID'],
-                    row['客户名称'],
-                    row['联系人'],
-                    row['联系电话'],
-                    row['地址'],
-                    row['邮箱']
-                ))
-        except Exception as e:
-            messagebox.showerror("错误", f"加载客户数据失败: {str(e)}")
+        # 在后台加载客户数据，界面重新显示时客户数据有变化也重新加载
+        def load_customers():
+            tree.set_source(TableSource(self.data_manager, 'customers', columns), loader=self.loader,
+                            on_error=lambda e: messagebox.showerror("错误", f"加载客户数据失败: {str(e)}"))
+
+        self.screens.add('customer_management', customer_frame, refresh=load_customers, tables=['customers'])
+        load_customers()
 
     def open_salesman_management(self):
         """打开业务员管理界面"""
         self.log_operation('打开业务员管理界面')
-        # 清空当前界面
-        for widget in self.root.winfo_children():
-            if isinstance(widget, tk.Frame) and widget != self.root.nametowidget('.!menu'):
-                widget.destroy()
+        # 界面已创建时直接显示
+        if self.screens.show('salesman_management'):
+            return
 
         # 创建业务员管理框架
         salesman_frame = tk.Frame(self.root)
@@ -1574,31 +1688,24 @@ class ContractManagementSystem:
                 tk.messagebox.showwarning("警告", "请输入搜索内容！")
                 return
 
-            try:
-                # 执行搜索
-                df = self.data_manager.search_salesmen(search_term, search_type_val)
-
-                # 清空表格
-                for item in tree.get_children():
-                    tree.delete(item)
-
-                # 显示搜索结果
-                if df.empty:
+            def report():
+                if not tree.total:
                     tk.messagebox.showinfo("提示", "未找到匹配的业务员记录！")
-                else:
-                    for index, row in df.iterrows():
-                        tree.insert('', tk.END, values=(
-                            row['业务员ID'],
-                            row['姓名'],
-                            row['联系电话'],
-                            row['邮箱'] if pd.notna(row['邮箱']) else '',
-                            row['所属部门']
-                        ))
-            except Exception as e:
-                tk.messagebox.showerror("错误", f"搜索失败: {str(e)}")
+
+            # 在后台搜索，完成后显示搜索结果
+            tree.set_source(SearchSource(lambda: self.data_manager.search_salesmen(search_term, search_type_val),
+                                         columns),
+                            loader=self.loader, on_done=report,
+                            on_error=lambda e: tk.messagebox.showerror("错误", f"搜索失败: {str(e)}"))
 
         tk.Button(search_frame, text="搜索", command=search_salesman).pack(side=tk.LEFT, padx=5)
-        tk.Button(search_frame, text="刷新", command=self.open_salesman_management).pack(side=tk.LEFT, padx=5)
+
+        def refresh_list():
+            """清空搜索条件，重新加载全部业务员"""
+            search_var.set('')
+            load_salesmen()
+
+        tk.Button(search_frame, text="刷新", command=refresh_list).pack(side=tk.LEFT, padx=5)
 
         # 创建按钮组
         btn_frame = tk.Frame(salesman_frame)
@@ -1658,11 +1765,12 @@ class ContractManagementSystem:
                 }
 
                 # 保存数据
-                if self.data_manager.add_salesman(salesman_data):
+                record = self.data_manager.add_salesman(salesman_data)
+                if record:
                     self.log_operation(f'添加新业务员: {salesman_data["姓名"]}')
                     tk.messagebox.showinfo("成功", "业务员添加成功！")
                     add_window.destroy()
-                    self.open_salesman_management()
+                    tree.insert_record(record)
                 else:
                     tk.messagebox.showerror("错误", "业务员添加失败！")
 
@@ -1685,8 +1793,10 @@ class ContractManagementSystem:
             salesman_id = item['values'][0]
 
             # 获取业务员详情
-            df = self.data_manager.get_all_salesmen()
-            salesman = df[df['业务员ID'] == salesman_id].iloc[0].to_dict()
+            salesman = self.data_manager.get_salesman(salesman_id)
+            if salesman is None:
+                tk.messagebox.showerror("错误", f"未找到业务员ID为 {salesman_id} 的业务员！")
+                return
 
             # 创建编辑业务员对话框
             edit_window = tk.Toplevel(self.root)
@@ -1745,11 +1855,12 @@ class ContractManagementSystem:
                 }
 
                 # 更新数据
-                if self.data_manager.update_salesman(salesman_id, update_data):
+                record = self.data_manager.update_salesman(salesman_id, update_data)
+                if record:
                     self.log_operation(f'更新业务员信息，业务员ID: {salesman_id}，姓名: {update_data["姓名"]}')
                     tk.messagebox.showinfo("成功", "业务员更新成功！")
                     edit_window.destroy()
-                    self.open_salesman_management()
+                    tree.update_record(salesman_id, record)
                 else:
                     tk.messagebox.showerror("错误", "业务员更新失败！")
 
@@ -1776,10 +1887,11 @@ class ContractManagementSystem:
             salesman_id = item['values'][0]
 
             # 删除业务员
-            if self.data_manager.delete_salesman(salesman_id):
+            record = self.data_manager.delete_salesman(salesman_id)
+            if record:
                 self.log_operation(f'删除业务员，业务员ID: {salesman_id}')
                 tk.messagebox.showinfo("成功", "业务员删除成功！")
-                self.open_salesman_management()
+                tree.delete_record(salesman_id)
             else:
                 tk.messagebox.showerror("错误", "业务员删除失败！")
 
@@ -1790,7 +1902,7 @@ class ContractManagementSystem:
 
         # 创建业务员表格
         columns = ("业务员ID", "姓名", "联系电话", "邮箱", "所属部门")
-        tree = ttk.Treeview(salesman_frame, columns=columns, show="headings")
+        tree = VirtualTreeview(salesman_frame, columns=columns)
 
         # 设置列宽和标题
         for col in columns:
@@ -1804,25 +1916,95 @@ class ContractManagementSystem:
         tree.column("邮箱", width=150)
         tree.column("所属部门", width=100)
 
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(salesman_frame, orient=tk.VERTICAL, command=tree.yview)
-        tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # 表格只显示可见的行，滚动时按页读取数据
         tree.pack(fill=tk.BOTH, expand=True)
 
-        # 加载业务员数据
-        try:
-            df = pd.read_excel(self.salesman_file, engine='openpyxl')
-            for index, row in df.iterrows():
-                tree.insert('', tk.END, values=(
-                    row['业务员ID'],
-                    row['姓名'],
-                    row['联系电话'],
-                    row['邮箱'],
-                    row['所属部门']
-                ))
-        except Exception as e:
-            messagebox.showerror("错误", f"加载业务员数据失败: {str(e)}")
+        # 在后台加载业务员数据，界面重新显示时业务员数据有变化也重新加载
+        def load_salesmen():
+            tree.set_source(TableSource(self.data_manager, 'salesmen', columns), loader=self.loader,
+                            on_error=lambda e: messagebox.showerror("错误", f"加载业务员数据失败: {str(e)}"))
+
+        self.screens.add('salesman_management', salesman_frame, refresh=load_salesmen, tables=['salesmen'])
+        load_salesmen()
+
+    def open_salesman_performance(self):
+        """打开业务员业绩界面"""
+        # 界面已创建时直接显示
+        if self.screens.show('salesman_performance'):
+            return
+
+        # 创建业绩框架
+        performance_frame = tk.Frame(self.root)
+        performance_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        # 创建标题
+        title_label = tk.Label(performance_frame, text="业务员业绩", font=('SimHei', 16, 'bold'))
+        title_label.pack(pady=10)
+
+        # 创建业务员选择区域
+        filter_frame = tk.Frame(performance_frame)
+        filter_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        tk.Label(filter_frame, text="业务员:", font=('SimHei', 10)).pack(side=tk.LEFT, padx=5)
+        salesman_var = tk.StringVar(value="全部")
+        salesman_combo = ttk.Combobox(filter_frame, textvariable=salesman_var, width=15, state='readonly')
+        salesman_combo.pack(side=tk.LEFT, padx=5)
+
+        columns = ["业务员", "月份"] + PERFORMANCE_COLUMNS
+        amount_columns = set(PERFORMANCE_COLUMNS) - {"合同数"}
+
+        def refresh_performance():
+            """在后台读取业绩数据后刷新表格，数据未修改时直接使用缓存的汇总结果"""
+            selected = salesman_var.get()
+
+            def show(df):
+                for item in performance_tree.get_children():
+                    performance_tree.delete(item)
+
+                salesman_combo['values'] = ["全部"] + sorted(df['业务员'].unique().tolist()) if not df.empty else ["全部"]
+                if selected != "全部":
+                    df = df[df['业务员'] == selected]
+
+                for values in df.reindex(columns=columns).itertuples(index=False, name=None):
+                    performance_tree.insert('', tk.END, values=[
+                        f"{value:.2f}" if col in amount_columns else display_value(value)
+                        for col, value in zip(columns, values)
+                    ])
+
+            self.loader.submit(self.data_manager.get_salesman_performance, show,
+                               on_error=lambda e: messagebox.showerror("错误", f"加载业绩数据出错: {str(e)}"))
+
+        salesman_combo.bind("<<ComboboxSelected>>", lambda event: refresh_performance())
+        tk.Button(filter_frame, text="刷新", command=refresh_performance).pack(side=tk.LEFT, padx=5)
+        tk.Button(filter_frame, text="返回主界面", command=self.create_main_frame).pack(side=tk.RIGHT, padx=5)
+
+        # 创建业绩表格
+        performance_tree = ttk.Treeview(performance_frame, columns=columns, show="headings")
+        for col in columns:
+            performance_tree.heading(col, text=col)
+            performance_tree.column(col, width=100, anchor=tk.CENTER)
+
+        # 添加滚动条
+        scrollbar_y = ttk.Scrollbar(performance_frame, orient=tk.VERTICAL, command=performance_tree.yview)
+        performance_tree.configure(yscroll=scrollbar_y.set)
+        scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        performance_tree.pack(fill=tk.BOTH, expand=True)
+
+        self.screens.add('salesman_performance', performance_frame, refresh=refresh_performance,
+                         tables=['contracts', 'payments'])
+
+        # 初始加载数据
+        refresh_performance()
+
+    def confirm_credit(self, customer_name, amount, contract_id=None, status=None):
+        """保存合同前检查客户信用额度，超过额度时询问是否继续，返回是否继续保存"""
+        result = self.data_manager.check_credit(customer_name, amount, contract_id, status)
+        if result is None or not result['exceeded']:
+            return True
+        return messagebox.askyesno(
+            "超过信用额度",
+            f"客户 {customer_name} 的信用额度为 {result['limit']:.2f}，当前未收款 {result['exposure']:.2f}，"
+            f"保存后将达到 {result['new_exposure']:.2f}，超过信用额度。\n是否继续保存?")
 
     def log_operation(self, operation):
         """记录用户操作到日志文件"""
@@ -1862,6 +2044,21 @@ class ContractManagementSystem:
         """显示关于信息"""
         messagebox.showinfo("关于", "出口销售合同管理系统\n版本: 1.0\n开发: Python Tkinter")
 
+    def bind_live_search(self, window, search_var, search):
+        """输入内容变化后 SEARCH_DELAY_MS 毫秒内没有继续输入时调用 search()"""
+        pending = [None]
+
+        def run():
+            pending[0] = None
+            search()
+
+        def schedule(*args):
+            if pending[0] is not None:
+                window.after_cancel(pending[0])
+            pending[0] = window.after(self.SEARCH_DELAY_MS, run)
+
+        search_var.trace_add('write', schedule)
+
     def select_customer(self, var, add_window=None):
         """选择客户"""
         # 创建选择客户对话框
@@ -1880,23 +2077,42 @@ class ContractManagementSystem:
         search_entry = tk.Entry(search_frame, textvariable=search_var, width=30)
         search_entry.pack(side=tk.LEFT, padx=5)
 
+        # 名称索引在首次加载时建立，之后每次输入只在索引中查找最匹配的 PICKER_LIMIT 条
+        def show(df):
+            if not tree.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for values in df.reindex(columns=columns).head(self.PICKER_LIMIT).itertuples(index=False, name=None):
+                tree.insert('', tk.END, values=display_values(*values))
+            more = len(df) > self.PICKER_LIMIT
+            count_label.config(text=f"仅显示最匹配的前 {self.PICKER_LIMIT} 条，请输入更多文字" if more else "")
+
+        loaded = [False]
+        # 最近一次搜索的序号，较早的搜索结果晚到时丢弃
+        latest = [0]
+
         def search():
-            # 清空表格
-            for item in tree.get_children():
-                tree.delete(item)
-            
-            # 搜索客户
+            # 首次加载完成前的输入在加载完成后一并搜索
+            if not loaded[0] or not tree.winfo_exists():
+                return
+            latest[0] += 1
+            request = latest[0]
             search_term = search_var.get().strip()
-            if search_term:
-                df = self.data_manager.search_customers(search_term, "客户名称")
-            else:
-                df = self.data_manager.get_all_customers()
-            
-            # 填充表格
-            for index, row in df.iterrows():
-                tree.insert('', tk.END, values=(row['客户ID'], row['客户名称'], row['联系人'], row['联系电话']))
+
+            def show_latest(df):
+                if request == latest[0]:
+                    show(df)
+
+            # 在后台搜索，结果交回界面线程显示
+            self.loader.submit(lambda: self.data_manager.suggest_customers(search_term, self.PICKER_LIMIT + 1), show_latest,
+                               on_error=lambda e: messagebox.showerror("错误", f"搜索客户失败: {str(e)}"))
 
         tk.Button(search_frame, text="搜索", command=search).pack(side=tk.LEFT, padx=5)
+        count_label = tk.Label(search_frame, font=('SimHei', 9), fg='gray')
+        count_label.pack(side=tk.LEFT, padx=5)
+        self.bind_live_search(select_window, search_var, search)
+        search_entry.bind('<Return>', lambda event: search())
+        search_entry.focus_set()
 
         # 创建客户表格
         columns = ("客户ID", "客户名称", "联系人", "联系电话")
@@ -1918,10 +2134,16 @@ class ContractManagementSystem:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        # 加载客户数据
-        df = self.data_manager.get_all_customers()
-        for index, row in df.iterrows():
-            tree.insert('', tk.END, values=(row['客户ID'], row['客户名称'], row['联系人'], row['联系电话']))
+        # 在后台建立名称索引并显示第一页，完成后按当前输入重新搜索
+        def on_loaded(df):
+            loaded[0] = True
+            if search_var.get().strip():
+                search()
+            else:
+                show(df)
+
+        self.loader.submit(lambda: self.data_manager.suggest_customers('', self.PICKER_LIMIT + 1), on_loaded,
+                           on_error=lambda e: messagebox.showerror("错误", f"加载客户数据失败: {str(e)}"))
 
         # 选择按钮
         def confirm_selection():
@@ -1959,23 +2181,42 @@ class ContractManagementSystem:
         search_entry = tk.Entry(search_frame, textvariable=search_var, width=30)
         search_entry.pack(side=tk.LEFT, padx=5)
 
+        # 名称索引在首次加载时建立，之后每次输入只在索引中查找最匹配的 PICKER_LIMIT 条
+        def show(df):
+            if not tree.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for values in df.reindex(columns=columns).head(self.PICKER_LIMIT).itertuples(index=False, name=None):
+                tree.insert('', tk.END, values=display_values(*values))
+            more = len(df) > self.PICKER_LIMIT
+            count_label.config(text=f"仅显示最匹配的前 {self.PICKER_LIMIT} 条，请输入更多文字" if more else "")
+
+        loaded = [False]
+        # 最近一次搜索的序号，较早的搜索结果晚到时丢弃
+        latest = [0]
+
         def search():
-            # 清空表格
-            for item in tree.get_children():
-                tree.delete(item)
-            
-            # 搜索业务员
+            # 首次加载完成前的输入在加载完成后一并搜索
+            if not loaded[0] or not tree.winfo_exists():
+                return
+            latest[0] += 1
+            request = latest[0]
             search_term = search_var.get().strip()
-            if search_term:
-                df = self.data_manager.search_salesmen(search_term, "姓名")
-            else:
-                df = self.data_manager.get_all_salesmen()
-            
-            # 填充表格
-            for index, row in df.iterrows():
-                tree.insert('', tk.END, values=(row['业务员ID'], row['姓名'], row['联系电话'], row['所属部门']))
+
+            def show_latest(df):
+                if request == latest[0]:
+                    show(df)
+
+            # 在后台搜索，结果交回界面线程显示
+            self.loader.submit(lambda: self.data_manager.suggest_salesmen(search_term, self.PICKER_LIMIT + 1), show_latest,
+                               on_error=lambda e: messagebox.showerror("错误", f"搜索业务员失败: {str(e)}"))
 
         tk.Button(search_frame, text="搜索", command=search).pack(side=tk.LEFT, padx=5)
+        count_label = tk.Label(search_frame, font=('SimHei', 9), fg='gray')
+        count_label.pack(side=tk.LEFT, padx=5)
+        self.bind_live_search(select_window, search_var, search)
+        search_entry.bind('<Return>', lambda event: search())
+        search_entry.focus_set()
 
         # 创建业务员表格
         columns = ("业务员ID", "姓名", "联系电话", "所属部门")
@@ -1997,10 +2238,16 @@ class ContractManagementSystem:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        # 加载业务员数据
-        df = self.data_manager.get_all_salesmen()
-        for index, row in df.iterrows():
-            tree.insert('', tk.END, values=(row['业务员ID'], row['姓名'], row['联系电话'], row['所属部门']))
+        # 在后台建立名称索引并显示第一页，完成后按当前输入重新搜索
+        def on_loaded(df):
+            loaded[0] = True
+            if search_var.get().strip():
+                search()
+            else:
+                show(df)
+
+        self.loader.submit(lambda: self.data_manager.suggest_salesmen('', self.PICKER_LIMIT + 1), on_loaded,
+                           on_error=lambda e: messagebox.showerror("错误", f"加载业务员数据失败: {str(e)}"))
 
         # 选择按钮
         def confirm_selection():
@@ -2020,6 +2267,60 @@ class ContractManagementSystem:
         tk.Button(btn_frame, text="确定", command=confirm_selection).pack(side=tk.LEFT, padx=20)
         tk.Button(btn_frame, text="取消", command=select_window.destroy).pack(side=tk.RIGHT, padx=20)
 
+    def import_data(self, table):
+        """从 Excel/CSV 文件批量导入数据"""
+        label = {'contracts': '合同', 'payments': '收款', 'customers': '客户', 'salesmen': '业务员'}[table]
+        importer = {
+            'contracts': self.data_manager.import_contracts,
+            'payments': self.data_manager.import_payments,
+            'customers': self.data_manager.import_customers,
+            'salesmen': self.data_manager.import_salesmen,
+        }[table]
+
+        path = filedialog.askopenfilename(
+            title=f"选择要导入的{label}文件",
+            filetypes=[("Excel 文件", "*.xlsx"), ("CSV 文件", "*.csv"), ("所有文件", "*.*")])
+        if not path:
+            return
+
+        report = importer(path)
+        if report['error']:
+            messagebox.showerror("错误", f"导入{label}失败: {report['error']}")
+            return
+
+        # 当前界面显示的是该表的数据时重新加载
+        self.screens.refresh(table)
+
+        rejected = report['rejected']
+        self.log_operation(f'导入{label}: 成功 {report["imported"]} 条，拒绝 {len(rejected)} 条')
+        message = f"共 {report['total']} 条记录，成功导入 {report['imported']} 条，拒绝 {len(rejected)} 条。"
+        if rejected.empty:
+            messagebox.showinfo("导入完成", message)
+            return
+
+        # 显示部分拒绝原因(行号按文件中的行计算，第 1 行为标题)
+        details = "\n".join(f"第 {index + 2} 行: {reason}" for index, reason in rejected['拒绝原因'].head(10).items())
+        if len(rejected) > 10:
+            details += "\n..."
+        if messagebox.askyesno("导入完成", f"{message}\n\n{details}\n\n是否保存被拒绝的记录?"):
+            save_path = filedialog.asksaveasfilename(
+                title="保存被拒绝的记录", defaultextension=".xlsx",
+                initialfile=f"{label}导入失败记录.xlsx", filetypes=[("Excel 文件", "*.xlsx")])
+            if save_path:
+                try:
+                    write_excel(rejected, save_path)
+                except Exception as e:
+                    messagebox.showerror("错误", f"保存失败: {str(e)}")
+
+    def on_close(self):
+        """退出程序，关闭前保存未写入的修改并将日志写回 Excel 文件"""
+        try:
+            self.loader.shutdown()
+            self.data_manager.close()
+        except Exception as e:
+            print(f"保存数据失败: {str(e)}")
+        self.root.destroy()
+
     def open_data_folder(self):
         """打开数据库文件夹"""
         try:
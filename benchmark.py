@@ -0,0 +1,110 @@
+"""数据文件读写性能测试
+
+用法:
+    python benchmark.py load [行数 ...]    从 xlsx / 快照加载，以及 DataManager 加载(快照 + 类型转换)
+    python benchmark.py write [行数 ...]   df.to_excel / 流式写入
+
+默认测试 10000、100000、1000000 行。1000000 行的 xlsx 生成需要较长时间，
+write 测试建议使用 100000 行: python benchmark.py write 100000
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_manager import DataManager
+from schema import TABLE_SPECS
+from storage import ExcelBackend, write_excel
+
+DEFAULT_ROWS = [10000, 100000, 1000000]
+
+
+def make_contracts(rows):
+    """生成指定行数的模拟合同数据"""
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 730, rows), unit='D')
+    price = rng.integers(10, 1000, rows)
+    quantity = rng.integers(1, 500, rows)
+    return pd.DataFrame({
+        '合同编号': [f'{date:%Y%m%d}{i:06d}' for i, date in enumerate(dates)],
+        '客户名称': [f'客户{i}' for i in rng.integers(0, 2000, rows)],
+        '业务员': [f'业务员{i}' for i in rng.integers(0, 50, rows)],
+        '签订日期': dates.strftime('%Y-%m-%d'),
+        '单价': price,
+        '数量': quantity,
+        '合同金额': price * quantity,
+        '付款方式': rng.choice(['电汇', '支票', '现金', '其他'], rows),
+        '交货日期': (dates + pd.Timedelta(days=30)).strftime('%Y-%m-%d'),
+        '状态': rng.choice(['待执行', '执行中', '已完成', '已取消'], rows),
+        '备注': '',
+    })
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench_load(rows):
+    """对比从 xlsx 读取与从快照读取合同表的耗时
+
+    DataManager 一列为界面实际使用的加载路径: 读取快照后按表结构转换类型。
+    """
+    data_dir = tempfile.mkdtemp()
+    try:
+        backend = ExcelBackend(data_dir, TABLE_SPECS)
+        backend.write('contracts', make_contracts(rows))
+
+        xlsx_time, _ = timed(pd.read_excel, backend.path('contracts'))
+        snapshot_time, df = timed(backend.read, 'contracts')
+        assert len(df) == rows
+        data_manager = DataManager(data_dir)
+        try:
+            manager_time, df = timed(data_manager.get_all_contracts)
+        finally:
+            data_manager.close()
+        assert len(df) == rows
+        print(f'{rows:>9} 行  xlsx: {xlsx_time:8.3f}s  快照: {snapshot_time:8.3f}s  '
+              f'加速: {xlsx_time / snapshot_time:6.1f}x  DataManager: {manager_time:8.3f}s')
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def bench_write(rows):
+    """对比 df.to_excel 与只写模式流式保存的耗时"""
+    data_dir = tempfile.mkdtemp()
+    try:
+        df = make_contracts(rows)
+        path = os.path.join(data_dir, 'contracts.xlsx')
+        to_excel_time, _ = timed(df.to_excel, path, index=False, engine='openpyxl')
+        streaming_time, _ = timed(write_excel, df, path)
+        assert len(pd.read_excel(path, engine='openpyxl')) == rows
+        print(f'{rows:>9} 行  to_excel: {to_excel_time:8.3f}s  流式写入: {streaming_time:8.3f}s  '
+              f'加速: {to_excel_time / streaming_time:6.1f}x')
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+BENCHMARKS = {
+    'load': bench_load,
+    'write': bench_write,
+}
+
+
+def main(argv):
+    if not argv or argv[0] not in BENCHMARKS:
+        print(__doc__)
+        return 1
+    rows_list = [int(arg) for arg in argv[1:]] or DEFAULT_ROWS
+    for rows in rows_list:
+        BENCHMARKS[argv[0]](rows)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
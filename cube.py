@@ -0,0 +1,165 @@
+"""签约与收款的月度汇总
+
+按 月份 × 客户名称 × 业务员 × 付款方式 预先汇总签约金额、合同数和收款金额，
+合同和收款修改时只调整受影响的单元格，趋势图和透视表直接在汇总结果上切片，
+不需要重新汇总原始记录。
+"""
+import pandas as pd
+
+from performance import month_keys, month_label
+from storage import key_to_str, keys_to_str
+
+# 汇总的维度和指标
+CUBE_DIMENSIONS = ['月份', '客户名称', '业务员', '付款方式']
+CUBE_MEASURES = ['签约金额', '合同数', '收款金额']
+
+
+def _dimension_values(values):
+    values = values.astype(object)
+    return keys_to_str(values.where(values.notna(), '未指定')).tolist()
+
+
+def parse_month(value):
+    """把 YYYY-MM、日期或整数月份(年*100+月)转换为整数月份"""
+    if isinstance(value, int):
+        return value
+    value = pd.Timestamp(value)
+    return value.year * 100 + value.month
+
+
+class MonthlyCube:
+    """签约与收款的月度汇总
+
+    签约按合同的签订日期所在月份计入，收款按收款日期所在月份计入；
+    收款的客户、业务员和付款方式取自所属合同，合同的这些信息修改时，
+    它的收款也随之移到新的单元格。没有对应合同的收款不计入汇总。
+    versions 为生成汇总时合同表和收款表的版本号，由 DataManager 判断汇总是否过期。
+    """
+
+    def __init__(self, versions=None):
+        self.versions = versions
+        # 合同编号 -> ((签订月份, 客户名称, 业务员, 付款方式), 合同金额)
+        self.contracts = {}
+        # 合同编号 -> {收款月份: 收款金额}
+        self.collections = {}
+        # (月份, 客户名称, 业务员, 付款方式) -> [签约金额, 合同数, 收款金额]
+        self.cells = {}
+        self._table = None
+
+    @classmethod
+    def build(cls, contracts, payment_chunks, versions=None):
+        """由合同表和分块的收款记录构建汇总"""
+        cube = cls(versions)
+        # 签约部分整列分组汇总，不逐个合同累加
+        frame = cube._contract_frame(contracts)
+        keys = zip(*(frame[column].tolist() for column in CUBE_DIMENSIONS))
+        cube.contracts = dict(zip(frame['合同编号'].tolist(), zip(keys, frame['合同金额'].tolist())))
+        signed = frame.groupby(CUBE_DIMENSIONS)['合同金额'].agg(['sum', 'size'])
+        cube.cells = {key: [amount, count, 0.0]
+                      for key, amount, count in zip(signed.index, signed['sum'].tolist(), signed['size'].tolist())}
+        for chunk in payment_chunks:
+            cube.add_payments(chunk)
+        return cube
+
+    def _add(self, key, signed=0.0, count=0, collected=0.0):
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = [0.0, 0, 0.0]
+        cell[0] += signed
+        cell[1] += count
+        cell[2] += collected
+        if cell[1] == 0 and abs(cell[0]) < 1e-6 and abs(cell[2]) < 1e-6:
+            del self.cells[key]
+        self._table = None
+
+    def _attribute(self, contract_id, sign):
+        """把合同的签约金额及其全部收款计入(sign=1)或移出(sign=-1)所在单元格"""
+        entry = self.contracts.get(contract_id)
+        if entry is None:
+            return
+        (month, customer, salesman, method), amount = entry
+        self._add((month, customer, salesman, method), sign * amount, sign)
+        for paid_month, collected in self.collections.get(contract_id, {}).items():
+            self._add((paid_month, customer, salesman, method), collected=sign * collected)
+
+    def remove_contracts(self, contracts):
+        """移除合同(含 合同编号 列的 DataFrame)，它的收款保留，合同重新加入时一并计入"""
+        for contract_id in keys_to_str(contracts['合同编号']):
+            self._attribute(contract_id, -1)
+            self.contracts.pop(contract_id, None)
+
+    def add_contracts(self, contracts):
+        """加入或更新合同(含 合同编号、签订日期、客户名称、业务员、付款方式、合同金额 列的 DataFrame)"""
+        frame = self._contract_frame(contracts)
+        for contract_id, month, customer, salesman, method, amount in frame.itertuples(index=False, name=None):
+            self._attribute(contract_id, -1)
+            self.contracts[contract_id] = ((month, customer, salesman, method), amount)
+            self._attribute(contract_id, 1)
+
+    @staticmethod
+    def _contract_frame(contracts):
+        """整理合同的编号、各维度取值和合同金额"""
+        return pd.DataFrame({
+            '合同编号': keys_to_str(contracts['合同编号']).tolist(),
+            '月份': month_keys(contracts['签订日期']).tolist(),
+            '客户名称': _dimension_values(contracts['客户名称']),
+            '业务员': _dimension_values(contracts['业务员']),
+            '付款方式': _dimension_values(contracts['付款方式']),
+            '合同金额': pd.to_numeric(contracts['合同金额'], errors='coerce').fillna(0).astype(float).tolist(),
+        })
+
+    def add_payments(self, payments, sign=1):
+        """把收款记录(含 合同编号、收款日期、收款金额 列的 DataFrame)计入汇总，sign 为 -1 时扣除"""
+        if payments.empty:
+            return
+        amounts = pd.to_numeric(payments['收款金额'], errors='coerce').fillna(0)
+        grouped = amounts.groupby([keys_to_str(payments['合同编号']), month_keys(payments['收款日期'])]).sum()
+        for (contract_id, month), amount in zip(grouped.index, grouped.tolist()):
+            month, amount = int(month), sign * amount
+            months = self.collections.setdefault(contract_id, {})
+            months[month] = months.get(month, 0.0) + amount
+            if abs(months[month]) < 1e-6:
+                del months[month]
+                if not months:
+                    del self.collections[contract_id]
+            entry = self.contracts.get(contract_id)
+            if entry is not None:
+                _, customer, salesman, method = entry[0]
+                self._add((month, customer, salesman, method), collected=amount)
+
+    def table(self):
+        """全部单元格组成的 DataFrame(月份为整数)，汇总修改后首次调用时重新生成"""
+        if self._table is None:
+            keys = list(self.cells)
+            table = pd.DataFrame(keys, columns=CUBE_DIMENSIONS) if keys else pd.DataFrame(columns=CUBE_DIMENSIONS)
+            values = pd.DataFrame(list(self.cells.values()), columns=CUBE_MEASURES)
+            for column in CUBE_MEASURES:
+                table[column] = values[column].to_numpy() if keys else []
+            table['月份'] = table['月份'].astype(int)
+            self._table = table
+        return self._table
+
+    def slice(self, by=None, where=None, start=None, end=None):
+        """按 by 中的维度汇总，返回 by 各列加 签约金额、合同数、收款金额 的 DataFrame
+
+        by 默认为 ['月份']；where 为 {维度: 值或值列表} 的过滤条件；
+        start、end 限定月份范围(含两端)，可以是 YYYY-MM 或日期。
+        """
+        by = list(by or ['月份'])
+        invalid = [column for column in by + list(where or {}) if column not in CUBE_DIMENSIONS]
+        if invalid:
+            raise ValueError(f"无效的维度 {invalid}")
+        table = self.table()
+        mask = pd.Series(True, index=table.index)
+        for column, value in (where or {}).items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= table[column].isin([key_to_str(item) for item in values])
+        if start is not None:
+            mask &= table['月份'] >= parse_month(start)
+        if end is not None:
+            mask &= table['月份'] <= parse_month(end)
+        result = table[mask].groupby(by, sort=True)[CUBE_MEASURES].sum().reset_index()
+        result['合同数'] = result['合同数'].astype(int)
+        if '月份' in by:
+            result['月份'] = [month_label(month) for month in result['月份']]
+        return result
@@ -1,144 +1,786 @@
 import pandas as pd
+import functools
+import operator
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 import openpyxl
+from schema import (TABLE_SPECS, apply_schema, columns_of_type, conform_rows, normalize_frame, parse_dates,
+                    set_value)
+from cube import MonthlyCube
+from performance import salesman_performance
+from receivables import (ExposureIndex, ReceivedTotals, aging_summary, compute_aging, compute_receivables,
+                         received_by_contract)
+from search_index import NgramIndex
+from storage import (BACKENDS, JournalExcelBackend, SequenceStore, StorageBackend, key_to_str, keys_to_str, migrate,
+                     parse_order_by, parse_where, query_value)
+
+def migrate_excel_to_sqlite(data_dir, db_path=None):
+    """把 data 目录下现有的 xlsx 数据一次性迁移到 SQLite 数据库"""
+    source = JournalExcelBackend(data_dir, TABLE_SPECS)
+    target = BACKENDS['sqlite'](data_dir, TABLE_SPECS, db_path=db_path)
+    try:
+        migrate(source, target)
+    finally:
+        target.close()
+
+
+def _synchronized(method):
+    """方法执行期间持有 DataManager 的锁"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class DataManager:
-    def __init__(self, data_dir):
+    def __init__(self, data_dir, backend='excel', write_behind=False):
         self.data_dir = data_dir
+        # 界面在后台线程读取数据(见 loader.BackgroundLoader)，访问缓存、索引和存储后端的公开方法
+        # 用 @_synchronized 在这把锁内执行
+        self._lock = threading.RLock()
         
         # 初始化文件路径
         self.contract_file = os.path.join(data_dir, "contracts.xlsx")
         self.payment_file = os.path.join(data_dir, "payments.xlsx")
         self.customer_file = os.path.join(data_dir, "customers.xlsx")
         self.salesman_file = os.path.join(data_dir, "salesmen.xlsx")
+
+        # 初始化存储后端，可以传入后端名称或 StorageBackend 实例
+        if isinstance(backend, StorageBackend):
+            self._backend = backend
+        else:
+            self._backend = BACKENDS[backend](data_dir, TABLE_SPECS)
+
+        # 内存表缓存: 表名 -> (后端签名, DataFrame)
+        self._cache = {}
+        # 逐条新增、尚未合并进缓存数据表的记录: 表名 -> [单行 DataFrame, ...]，
+        # 读取整张表时一次合并(见 _insert_row)
+        self._appended = {}
+        # 哈希索引: 表名 -> {列名: {列值字符串: [行标签, ...]}}，随缓存一起失效
+        self._indexes = {}
+        # 文本列的 N-gram 索引: 表名 -> {列名: NgramIndex}，随缓存一起失效
+        self._text_indexes = {}
+        # 数据表版本号: 表名 -> 整数，表被修改或重新加载时增加
+        self._versions = {}
+        # 派生计算结果的缓存: 名称 -> (依赖的数据版本, 结果)
+        self._derived = {}
+
+        # 编号序列，持久化保存在 data 目录下
+        self._sequences = SequenceStore(os.path.join(data_dir, 'sequences.json'))
+        # 各合同已收款金额的汇总，随收款修改增量维护，关闭时保存
+        self._received = ReceivedTotals(os.path.join(data_dir, 'received.json'))
+        # 随合同和收款修改增量维护的汇总: 名称 -> 客户敞口(ExposureIndex)或月度汇总(MonthlyCube)，
+        # 首次使用时构建
+        self._live = {}
+
+        # 延迟写入: write_behind 为 True 或处于 batch() 中时，修改只作用于内存，
+        # 由 flush() 统一写入后端；_dirty 记录有未保存修改的表
+        self.write_behind = write_behind
+        self._batch_depth = 0
+        self._dirty = set()
         
         # 确保数据文件存在
         self._ensure_files_exist()
 
     def _ensure_files_exist(self):
-        """确保所有数据文件存在，如果不存在则创建"""
-        # 合同表
-        if not os.path.exists(self.contract_file):
-            df = pd.DataFrame({
-                '合同编号': [],
-                '客户名称': [],
-                '业务员': [],
-                '签订日期': [],
-                '单价': [],
-                '数量': [],
-                '合同金额': [],
-                '付款方式': [],
-                '交货日期': [],
-                '状态': [],
-                '备注': []
-            })
-            df.to_excel(self.contract_file, index=False, engine='openpyxl')
-
-        # 收款表
-        if not os.path.exists(self.payment_file):
-            df = pd.DataFrame({
-                '收款ID': [],
-                '合同编号': [],
-                '收款日期': [],
-                '收款金额': [],
-                '收款方式': [],
-                '备注': []
-            })
-            df.to_excel(self.payment_file, index=False, engine='openpyxl')
-
-        # 客户表
-        if not os.path.exists(self.customer_file):
-            df = pd.DataFrame({
-                '客户ID': [],
-                '客户名称': [],
-                '联系人': [],
-                '联系电话': [],
-                '地址': [],
-                '邮箱': [],
-                '备注': []
-            })
-            df.to_excel(self.customer_file, index=False, engine='openpyxl')
-
-        # 业务员表
-        if not os.path.exists(self.salesman_file):
-            df = pd.DataFrame({
-                '业务员ID': [],
-                '姓名': [],
-                '联系电话': [],
-                '邮箱': [],
-                '所属部门': [],
-                '备注': []
-            })
-            df.to_excel(self.salesman_file, index=False, engine='openpyxl')
+        """确保所有数据表存在，如果不存在则创建"""
+        new_database = getattr(self._backend, 'is_new', False)
+        self._backend.ensure_tables()
+
+        # 首次使用数据库后端时，从现有的 xlsx 文件迁移数据
+        if new_database:
+            source = JournalExcelBackend(self.data_dir, TABLE_SPECS)
+            for table in TABLE_SPECS:
+                if os.path.exists(source.path(table)):
+                    self._backend.write(table, source.read(table))
+
+    @_synchronized
+    def close(self):
+        """保存未写入的修改并关闭存储后端"""
+        self.flush()
+        # 日志压缩会改变收款表的签名，压缩后再保存收款汇总
+        received_valid = self._received.is_valid(self._backend.signature('payments'))
+        self._backend.compact()
+        if received_valid:
+            self._received.set_signature(self._backend.signature('payments'))
+            self._received.save()
+        self._backend.close()
+
+    # ------------------------------ 延迟写入 ------------------------------
+    @contextmanager
+    def batch(self):
+        """批量修改，期间的所有修改只作用于内存，退出时每张表只写入一次
+
+        用法:
+            with data_manager.batch():
+                for customer in customers:
+                    data_manager.add_customer(customer)
+
+        batch() 不加锁: 其中的每次修改各自加锁，但 with 块整体不是原子的，
+        进入、修改和退出都必须在同一个线程(界面线程)中进行。
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and not self.write_behind:
+                self.flush()
+
+    def _deferred(self):
+        return self.write_behind or self._batch_depth > 0
+
+    @_synchronized
+    def has_pending_writes(self, table=None):
+        """是否有尚未写入后端的修改"""
+        if table is None:
+            return bool(self._dirty)
+        return table in self._dirty
+
+    @_synchronized
+    def flush(self):
+        """把有未保存修改的表整体写入后端，返回写入的表数量"""
+        flushed = 0
+        for table in list(self._dirty):
+            df = self._frame(table)
+            self._backend.write(table, df)
+            self._store_table(table, df)
+            self._dirty.discard(table)
+            flushed += 1
+        return flushed
+
+    # ------------------------------ 表缓存 ------------------------------
+    def _frame(self, table):
+        """返回缓存中的数据表(不复制)，数据被外部修改时重新加载"""
+        df = self._base_frame(table)
+        pending = self._appended.get(table)
+        if pending:
+            # 合并逐条新增的记录，连续新增多条时只复制一次整张表
+            df = self._concat_rows(table, df, pd.concat(pending))
+            self._cache[table] = (self._cache[table][0], df)
+            del self._appended[table]
+        return df
+
+    def _base_frame(self, table):
+        """缓存中的数据表，不含尚未合并的新增记录，数据被外部修改时重新加载"""
+        # 有未保存修改的表只能使用内存中的数据
+        if table in self._dirty:
+            return self._cache[table][1]
+        signature = self._backend.signature(table)
+        cached = self._cache.get(table)
+        if cached is None or cached[0] != signature:
+            df = normalize_frame(table, self._backend.read(table))
+            self._cache[table] = (signature, df)
+            self._bump_version(table)
+            self._indexes.pop(table, None)
+            self._text_indexes.pop(table, None)
+            # 重新读取的数据已包含写入后端的新增记录
+            self._appended.pop(table, None)
+        return self._cache[table][1]
+
+    def _read_table(self, table):
+        """读取数据表，数据未被外部修改时直接使用内存缓存"""
+        # 返回副本，调用方可以随意修改而不影响缓存
+        return self._frame(table).copy()
+
+    def _column_index(self, table, column):
+        """列值(字符串) -> 行标签列表的哈希索引，首次使用时构建"""
+        # 已建立的索引包含尚未合并的新增记录，不需要合并
+        self._base_frame(table)
+        indexes = self._indexes.setdefault(table, {})
+        index = indexes.get(column)
+        if index is None:
+            df = self._frame(table)
+            index = {}
+            if column in df.columns:
+                # 不用 Series.map，map 会把 None 变成 NaN，空值将无法按 None 查找
+                for label, value in zip(df.index, df[column]):
+                    index.setdefault(key_to_str(value), []).append(label)
+            indexes[column] = index
+        return index
+
+    def _key_index(self, table):
+        """主键 -> 行标签列表的哈希索引"""
+        return self._column_index(table, TABLE_SPECS[table]['key'])
+
+    def _text_index(self, table, column):
+        """文本列的 N-gram 索引，首次使用时构建"""
+        self._base_frame(table)
+        indexes = self._text_indexes.setdefault(table, {})
+        index = indexes.get(column)
+        if index is None:
+            df = self._frame(table)
+            if column in df.columns:
+                index = NgramIndex.build(df.index, df[column])
+            else:
+                index = NgramIndex()
+            indexes[column] = index
+        return index
+
+    def _text_search(self, table, search_term, column):
+        """通过 N-gram 索引查找文本列中包含 search_term 的记录"""
+        labels = self._text_index(table, column).search(search_term)
+        return self._frame(table).loc[labels].copy()
+
+    @staticmethod
+    def _match_column(values, search_term):
+        """搜索非索引列: 数字列按数值精确匹配，其他列(文本、日期、选项)按显示形式模糊匹配
+
+        日期列按 YYYY-MM-DD 匹配，例如 2025-01 可以找到 2025 年 1 月的记录。
+        """
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            try:
+                return values == float(search_term)
+            except ValueError:
+                return pd.Series(False, index=values.index)
+        if pd.api.types.is_datetime64_any_dtype(values):
+            text = values.dt.strftime('%Y-%m-%d')
+        else:
+            text = keys_to_str(values)
+        return text.str.contains(str(search_term), regex=False, na=False).astype(bool)
+
+    def _suggest(self, table, search_term, column, limit):
+        """通过 N-gram 索引取最多 limit 条匹配的记录，按匹配程度排列(见 NgramIndex.rank)"""
+        labels = self._text_index(table, column).rank(search_term, limit)
+        return self._frame(table).loc[labels].copy()
+
+    def _find_labels(self, table, key):
+        """按主键查找记录的行标签，O(1)
+
+        返回索引中列表的副本，修改主键后索引随之变化，调用方手中的行标签不受影响。
+        """
+        return list(self._key_index(table).get(key_to_str(key), []))
+
+    def _get_record(self, table, key):
+        """按主键获取一条记录，找不到时返回 None"""
+        labels = self._find_labels(table, key)
+        if not labels:
+            return None
+        return self._record_at(table, labels[0])
+
+    def _record_at(self, table, label):
+        """按行标签获取一条记录(字典)"""
+        return self._frame(table).loc[label].to_dict()
+
+    @staticmethod
+    def _append_rows(table, df, rows):
+        """在表末尾追加记录，新记录的行标签接在现有最大标签之后，已有行标签保持不变
+
+        新记录先转换为与现有数据一致的列类型。
+        """
+        start = int(df.index.max()) + 1 if len(df) else 0
+        labels = range(start, start + len(rows))
+        if isinstance(rows, pd.DataFrame):
+            new_rows = rows.set_axis(labels)
+        else:
+            new_rows = pd.DataFrame(rows, index=labels)
+        return DataManager._concat_rows(table, df, new_rows)
+
+    @staticmethod
+    def _concat_rows(table, df, rows):
+        """把已分配行标签的记录 rows 转换为与 df 一致的列类型后接在 df 末尾"""
+        df, rows = conform_rows(table, df, rows)
+        return pd.concat([df, rows])
+
+    def _new_row(self, table, row):
+        """把一条新增记录(字典)转换为单行 DataFrame
+
+        行标签接在现有最大标签之后，列类型按表结构转换，列与缓存中的数据表一致。
+        """
+        df = self._base_frame(table)
+        pending = self._appended.get(table)
+        if pending:
+            label = int(pending[-1].index[-1]) + 1
+        else:
+            label = int(df.index.max()) + 1 if len(df) else 0
+        new_row = apply_schema(table, pd.DataFrame([row], index=[label]))
+        return new_row.reindex(columns=list(df.columns) + [column for column in new_row.columns
+                                                           if column not in df.columns])
+
+    def _store_table(self, table, df):
+        """后端写入完成后同步更新缓存"""
+        signature = self._backend.signature(table)
+        # 收款汇总随缓存一起更新到新的签名
+        if self._tracks_received(table):
+            self._received.set_signature(signature)
+        self._cache[table] = (signature, df)
+
+    def _mark_dirty(self, table, df):
+        """延迟写入模式下只更新缓存，等待 flush()"""
+        cached = self._cache.get(table)
+        signature = cached[0] if cached else self._backend.signature(table)
+        self._cache[table] = (signature, df)
+        self._dirty.add(table)
+
+    def _index_add(self, table, df, labels, columns=None):
+        """把 df 中 labels 对应的记录加入已建立的索引"""
+        for column, index in self._indexes.get(table, {}).items():
+            if columns is not None and column not in columns:
+                continue
+            for label in labels:
+                value = key_to_str(df.at[label, column]) if column in df.columns else None
+                index.setdefault(value, []).append(label)
+        for column, index in self._text_indexes.get(table, {}).items():
+            if columns is not None and column not in columns:
+                continue
+            for label in labels:
+                index.add(label, df.at[label, column] if column in df.columns else None)
+
+    def _index_remove(self, table, labels, columns=None, df=None):
+        """从已建立的索引中移除 labels 对应的记录
+
+        df 为包含这些记录修改前内容的 DataFrame，默认为当前缓存(需在缓存更新前调用)。
+        """
+        if df is None:
+            df = self._cache[table][1]
+        for column, index in self._indexes.get(table, {}).items():
+            if columns is not None and column not in columns:
+                continue
+            for label in labels:
+                value = key_to_str(df.at[label, column]) if column in df.columns else None
+                bucket = index.get(value)
+                if bucket and label in bucket:
+                    bucket.remove(label)
+                    if not bucket:
+                        del index[value]
+        for column, index in self._text_indexes.get(table, {}).items():
+            if columns is not None and column not in columns:
+                continue
+            for label in labels:
+                index.remove(label)
+
+    def _commit(self, table, df, write):
+        """写入后端并更新缓存，延迟写入模式下只更新缓存；write 执行实际的后端写入"""
+        if self._deferred():
+            self._mark_dirty(table, df)
+        else:
+            write()
+            self._store_table(table, df)
+        self._bump_version(table)
+
+    # ------------------------------ 数据版本 ------------------------------
+    def _bump_version(self, table):
+        self._versions[table] = self._versions.get(table, 0) + 1
+
+    @_synchronized
+    def table_version(self, table):
+        """数据表的版本号，表被修改或重新加载后增加，可用于判断基于该表的计算结果是否过期"""
+        if not self._is_cached(table):
+            self._frame(table)
+        return self._versions.get(table, 0)
+
+    def _memoize(self, name, tables, params, compute):
+        """缓存派生计算结果，依赖的数据表版本和参数都不变时直接返回上次的结果"""
+        key = (tuple(self.table_version(table) for table in tables), params)
+        cached = self._derived.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        result = compute()
+        self._derived[name] = (key, result)
+        return result
+
+    def _insert_row(self, table, row):
+        """新增一条记录，返回新增的记录(字典)
+
+        后端按记录写入(writes_rows)或延迟写入时，新记录先放入 _appended，
+        下次读取整张表时再合并，新增的代价与表大小无关；否则合并进完整表后整体写入。
+        """
+        new_row = self._new_row(table, row)
+        # 写入转换类型后的记录，例如日期统一为 YYYY-MM-DD
+        values = {column: new_row.at[new_row.index[0], column] for column in row}
+        tracks_received = self._tracks_received(table)
+        live = self._tracking_live(table)
+        if self._backend.writes_rows or self._deferred():
+            df = self._base_frame(table)
+            self._commit(table, df, lambda: self._backend.insert(table, values, None))
+            self._appended.setdefault(table, []).append(new_row)
+        else:
+            df = self._concat_rows(table, self._frame(table), new_row)
+            self._commit(table, df, lambda: self._backend.insert(table, values, df))
+        self._index_add(table, new_row, new_row.index)
+        if tracks_received:
+            self._received.add(new_row)
+        self._sync_live(live, table, None, new_row)
+        return new_row.iloc[0].to_dict()
+
+    def _insert_rows(self, table, rows, df):
+        """批量新增记录，rows 为新增的记录，df 为追加后的完整表"""
+        rows = df.iloc[len(df) - len(rows):]
+        tracks_received = self._tracks_received(table)
+        live = self._tracking_live(table)
+        self._commit(table, df, lambda: self._backend.insert_many(table, rows, df))
+        self._index_add(table, df, df.index[len(df) - len(rows):])
+        if tracks_received:
+            self._received.add(rows)
+        self._sync_live(live, table, None, rows)
+
+    def _update_row(self, table, key, values):
+        """按列类型转换 values 后更新记录，返回记录的行标签
+
+        直接修改缓存中的数据表，不复制整张表；转换或写入失败时恢复原值并抛出异常。
+        """
+        df = self._frame(table)
+        labels = self._find_labels(table, key)[:1]
+        label = labels[0]
+        tracks_received = self._tracks_received(table)
+        live = self._tracking_live(table)
+        old_rows = df.loc[labels]
+        try:
+            for column, value in values.items():
+                set_value(table, df, label, column, value)
+            changes = {column: df.at[label, column] for column in values}
+            self._commit(table, df, lambda: self._backend.update(table, key, changes, df))
+        except Exception:
+            for column in values:
+                df.at[label, column] = old_rows.at[label, column]
+            raise
+        # 写入成功后再更新索引，写入失败时索引与缓存保持一致
+        self._index_remove(table, labels, columns=changes, df=old_rows)
+        self._index_add(table, df, labels, columns=changes)
+        if tracks_received:
+            self._received.add(old_rows, sign=-1)
+            self._received.add(df.loc[labels])
+        self._sync_live(live, table, old_rows, df.loc[labels])
+        return label
+
+    def _delete_row(self, table, key, df):
+        """删除记录，df 为删除后的完整表"""
+        labels = self._find_labels(table, key)
+        tracks_received = self._tracks_received(table)
+        live = self._tracking_live(table)
+        old_rows = self._cache[table][1].loc[labels]
+        self._commit(table, df, lambda: self._backend.delete(table, key, df))
+        self._index_remove(table, labels, df=old_rows)
+        if tracks_received:
+            self._received.add(old_rows, sign=-1)
+        self._sync_live(live, table, old_rows, None)
+
+    # ------------------------------ 收款汇总 ------------------------------
+    def _tracks_received(self, table):
+        """收款汇总与缓存中的收款表一致时，收款表的修改需要同步到汇总"""
+        return table == 'payments' and table in self._cache and self._received.is_valid(self._cache[table][0])
+
+    def _received_totals(self):
+        """各合同的已收款金额 {合同编号: 金额}，汇总与收款表不一致时分块重新汇总"""
+        if 'payments' in self._dirty:
+            signature = self._cache['payments'][0]
+        else:
+            signature = self._backend.signature('payments')
+        if not self._received.is_valid(signature):
+            totals = {}
+            for chunk in self.iter_table('payments', columns=['合同编号', '收款金额']):
+                for contract_id, amount in received_by_contract(chunk).items():
+                    totals[contract_id] = totals.get(contract_id, 0.0) + float(amount)
+            self._received.reset(totals, signature)
+        return self._received.totals
+
+    # ------------------------------ 增量汇总 ------------------------------
+    def _live_versions(self):
+        return (self._versions.get('contracts', 0), self._versions.get('payments', 0))
+
+    def _tracking_live(self, table):
+        """与当前合同表、收款表一致的增量汇总，这两张表的修改需要同步到这些汇总，需在提交修改前调用"""
+        if table not in ('contracts', 'payments'):
+            return []
+        versions = self._live_versions()
+        return [live for live in self._live.values() if live.versions == versions]
+
+    def _sync_live(self, live, table, old_rows, new_rows):
+        """把合同或收款的修改同步到增量汇总，old_rows 为修改前的记录，new_rows 为修改后的记录"""
+        for index in live:
+            if table == 'contracts':
+                if old_rows is not None:
+                    index.remove_contracts(old_rows)
+                if new_rows is not None:
+                    index.add_contracts(new_rows)
+            else:
+                if old_rows is not None:
+                    index.add_payments(old_rows, sign=-1)
+                if new_rows is not None:
+                    index.add_payments(new_rows)
+            index.versions = self._live_versions()
+
+    def _live_index(self, name, build):
+        """取得增量汇总，合同表或收款表被重新加载(例如被外部修改)后调用 build(versions) 重新构建"""
+        versions = (self.table_version('contracts'), self.table_version('payments'))
+        live = self._live.get(name)
+        if live is None or live.versions != versions:
+            live = self._live[name] = build(versions)
+        return live
+
+    def _exposure_index(self):
+        """按客户汇总的未收款敞口"""
+        def build(versions):
+            contracts = self.query('contracts', columns=['合同编号', '客户名称', '合同金额', '状态'])
+            return ExposureIndex.build(contracts, self._received_totals(), versions)
+        return self._live_index('exposure', build)
+
+    def _monthly_cube(self):
+        """签约与收款的月度汇总"""
+        def build(versions):
+            contracts = self.query('contracts', columns=['合同编号', '签订日期', '客户名称', '业务员',
+                                                         '付款方式', '合同金额'])
+            payments = self.iter_table('payments', columns=['合同编号', '收款日期', '收款金额'])
+            return MonthlyCube.build(contracts, payments, versions)
+        return self._live_index('monthly_cube', build)
+
+    def _is_cached(self, table):
+        """内存缓存中的数据表是否为最新"""
+        cached = self._cache.get(table)
+        return cached is not None and (table in self._dirty or cached[0] == self._backend.signature(table))
+
+    def iter_table(self, table, chunksize=10000, columns=None):
+        """分块遍历数据表，每次生成最多 chunksize 行的 DataFrame
+
+        表已在内存缓存中时直接分片返回；否则从后端流式读取，
+        不会把整张表加载进内存，适合处理很大的收款表等。
+        columns 可以只读取需要的列。
+        生成数据块时不持有锁: 缓存中的表在锁内取得快照(浅复制，之后的修改不影响快照)，
+        流式读取时每次只在锁内读取一块，其他线程可以在两块之间读取和修改数据。
+        """
+        with self._lock:
+            cached = self._is_cached(table)
+            if cached:
+                df = self._frame(table)
+                if columns is not None:
+                    df = df[[column for column in columns if column in df.columns]]
+                else:
+                    df = df.copy(deep=False)
+        if cached:
+            for start in range(0, len(df), chunksize):
+                yield df.iloc[start:start + chunksize].copy()
+            return
+
+        chunks = self._backend.iter_chunks(table, chunksize, columns)
+        try:
+            while True:
+                with self._lock:
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                yield apply_schema(table, chunk)
+        finally:
+            with self._lock:
+                chunks.close()
+
+    # ------------------------------ 条件查询 ------------------------------
+    _COMPARE = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+
+    @_synchronized
+    def query(self, table, where=None, order_by=None, limit=None, columns=None, offset=0):
+        """按多个条件查询数据表，返回 DataFrame
+
+        where: {列名: 条件}，条件可以是单个值(等于)、列表/集合(IN)或 {运算符: 值} 字典，
+            运算符包括 ==、!=、>、>=、<、<=、in、contains(子串)，同一列的多个运算符同时生效，例如
+            {'业务员': '张三', '签订日期': {'>=': '2024-01-01', '<': '2025-01-01'}, '合同金额': {'>': 10000}}
+        order_by: 排序列名或列名列表，列名前加 '-' 表示降序
+        limit: 最多返回的行数
+        columns: 只返回这些列
+        offset: 跳过前面的行数，与 limit 一起用于分页读取(见 count)
+
+        表已在内存中时，等值/IN 条件通过哈希索引、文本列的 contains 通过 N-gram 索引
+        得到候选行，其余条件只在候选行上计算；表未加载且后端支持时(SQLite)
+        整个查询转换为 SQL 执行，不加载整张表。日期按 YYYY-MM-DD 字符串比较。
+        """
+        try:
+            predicates = parse_where(where)
+            order = parse_order_by(order_by)
+            if not self._is_cached(table):
+                result = self._backend.query(table, predicates, order, limit, columns, offset)
+                if result is not None:
+                    return apply_schema(table, result)
+            return self._query_frame(table, predicates, order, limit, columns, offset)
+        except Exception as e:
+            print(f"查询数据失败: {str(e)}")
+            return pd.DataFrame()
+
+    @_synchronized
+    def count(self, table, where=None):
+        """统计满足 where 条件(见 query)的行数，出错时返回 0"""
+        try:
+            predicates = parse_where(where)
+            if not self._is_cached(table):
+                result = self._backend.count(table, predicates)
+                if result is not None:
+                    return int(result)
+            if not predicates:
+                return len(self._frame(table))
+            return len(self._query_frame(table, predicates, [], None, [TABLE_SPECS[table]['key']]))
+        except Exception as e:
+            print(f"统计数据失败: {str(e)}")
+            return 0
+
+    def _query_frame(self, table, predicates, order_by, limit, columns, offset=0):
+        """在内存缓存上执行查询"""
+        df = self._frame(table)
+        for column in [column for column, _, _ in predicates] + [column for column, _ in order_by]:
+            if column not in df.columns:
+                raise ValueError(f'无效的列名 {column}')
+
+        # 先用索引缩小候选行
+        candidates = None
+        remaining = []
+        for column, op, value in predicates:
+            if op == '==':
+                labels = self._column_index(table, column).get(key_to_str(query_value(value)), [])
+            elif op == 'in':
+                index = self._column_index(table, column)
+                labels = [label for item in value for label in index.get(key_to_str(query_value(item)), [])]
+            elif op == 'contains' and column in TABLE_SPECS[table]['text_columns']:
+                labels = self._text_index(table, column).search(value)
+            else:
+                remaining.append((column, op, value))
+                continue
+            candidates = set(labels) if candidates is None else candidates & set(labels)
+
+        result = df if candidates is None else df.loc[sorted(candidates)]
+        if remaining and len(result):
+            mask = pd.Series(True, index=result.index)
+            for column, op, value in remaining:
+                mask &= self._predicate_mask(result[column], op, value)
+            result = result[mask]
+
+        if order_by:
+            result = result.sort_values(by=[column for column, _ in order_by],
+                                        ascending=[ascending for _, ascending in order_by],
+                                        key=self._sort_key, na_position='last', kind='stable')
+        if limit is not None or offset:
+            result = result.iloc[int(offset):None if limit is None else int(offset) + int(limit)]
+        if columns is not None:
+            result = result[[column for column in columns if column in result.columns]]
+        return result.reset_index(drop=True)
+
+    @classmethod
+    def _predicate_mask(cls, series, op, value):
+        """计算单个条件的布尔掩码，空值不满足任何条件"""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype(object)
+        if op == 'contains':
+            return series.map(key_to_str).str.contains(str(value), regex=False, na=False)
+        value = query_value(value)
+        if op == '!=':
+            values = series.map(key_to_str)
+            return values.notna() & (values != key_to_str(value))
+
+        # 范围比较: 数值按数值比较，其余按 YYYY-MM-DD 等字符串形式比较
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values = pd.to_numeric(series, errors='coerce')
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            values, value = series, pd.Timestamp(value)
+        else:
+            values, value = series.map(key_to_str), str(value)
+        valid = values.notna()
+        mask = pd.Series(False, index=series.index)
+        mask[valid] = cls._COMPARE[op](values[valid], value)
+        return mask
+
+    @staticmethod
+    def _sort_key(series):
+        """排序键: 数值列按数值，其余列按字符串形式，避免混合类型无法比较"""
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+            return series
+        # 枚举列按取值排序，而不是按类别顺序
+        return series.astype(object).map(key_to_str)
+
+    # ------------------------------ 编号生成 ------------------------------
+    def _max_id_sequence(self, table, prefix):
+        """扫描现有数据，返回以 prefix 开头的编号中最大的序号，仅在序列首次使用时调用"""
+        df = self._frame(table)
+        key = TABLE_SPECS[table]['key']
+        if key not in df.columns or df.empty:
+            return 0
+        keys = df[key].map(key_to_str).dropna().astype(str)
+        suffixes = keys[keys.str.startswith(prefix)].str[len(prefix):]
+        numbers = pd.to_numeric(suffixes[suffixes.str.isdigit()], errors='coerce').dropna()
+        return int(numbers.max()) if not numbers.empty else 0
+
+    def _generate_ids(self, table, count, taken=()):
+        """生成 count 个新编号
+
+        序号从持久化的序列中分配，耗时与表大小无关；序号至少 3 位，超过 999 时自动增加位数。
+        分配出的编号若已被占用(表中已有，或在 taken 中，例如同一批导入中指定的编号)则跳过。
+        """
+        taken = set(taken)
+        spec = TABLE_SPECS[table]
+        prefix = spec['id_prefix']
+        if spec['daily_id']:
+            prefix += datetime.now().strftime('%Y%m%d')
+
+        ids = []
+        while len(ids) < count:
+            needed = count - len(ids)
+            start = self._sequences.reserve(table, prefix, needed,
+                                            seed=lambda: self._max_id_sequence(table, prefix))
+            for seq in range(start, start + needed):
+                new_id = f'{prefix}{seq:03d}'
+                if new_id not in taken and not self._find_labels(table, new_id):
+                    ids.append(new_id)
+        return ids
+
+    @_synchronized
+    def clear_cache(self):
+        """清空内存缓存，下次读取时重新加载数据(未保存的修改会保留)"""
+        for table in list(self._cache):
+            if table not in self._dirty:
+                del self._cache[table]
+                self._appended.pop(table, None)
+                self._indexes.pop(table, None)
+                self._text_indexes.pop(table, None)
 
     # ------------------------------ 合同管理 ------------------------------
+    @_synchronized
     def get_all_contracts(self):
         """获取所有合同数据"""
         try:
-            return pd.read_excel(self.contract_file, engine='openpyxl')
+            return self._read_table('contracts')
         except Exception as e:
             print(f"读取合同数据失败: {str(e)}")
             return pd.DataFrame()
 
+    @_synchronized
     def add_contract(self, contract_data):
-        """添加新合同"""
+        """添加新合同，成功时返回新增的记录(字典)，失败时返回 False"""
         try:
-            # 读取现有数据
-            df = self.get_all_contracts()
-            
             # 生成合同编号
             if '合同编号' not in contract_data or not contract_data['合同编号']:
                 contract_data['合同编号'] = self._generate_contract_id()
             
-            # 添加新数据
-            new_row = pd.DataFrame([contract_data])
-            df = pd.concat([df, new_row], ignore_index=True)
-            
-            # 保存到文件
-            df.to_excel(self.contract_file, index=False, engine='openpyxl')
-            return True
+            # 添加新数据并保存到文件
+            return self._insert_row('contracts', contract_data)
         except Exception as e:
             print(f"添加合同失败: {str(e)}")
             return False
 
+    @_synchronized
+    def get_contract(self, contract_id):
+        """按合同编号获取合同，返回字典，不存在时返回 None"""
+        try:
+            return self._get_record('contracts', contract_id)
+        except Exception as e:
+            print(f"读取合同数据失败: {str(e)}")
+            return None
+
+    @_synchronized
     def update_contract(self, contract_id, update_data):
-        """更新合同信息"""
+        """更新合同信息，成功时返回更新后的记录(字典)，失败时返回 False"""
         try:
-            # 读取现有数据
-            df = self.get_all_contracts()
-            
-            # 确保合同编号是字符串类型
-            contract_id = str(contract_id)
-            df['合同编号'] = df['合同编号'].astype(str)
-            
-            # 查找并更新合同
-            index = df[df['合同编号'] == contract_id].index
-            if not index.empty:
+            # 通过主键索引查找合同
+            labels = self._find_labels('contracts', contract_id)
+            if labels:
+                columns = self._frame('contracts').columns
+
                 # 检查更新数据中的列是否存在
-                invalid_columns = [key for key in update_data.keys() if key not in df.columns]
+                invalid_columns = [key for key in update_data.keys() if key not in columns]
                 if invalid_columns:
                     print(f"更新合同失败: 无效的列名 {invalid_columns}")
                     return False
                 
-                for key, value in update_data.items():
-                    # 尝试转换为适当的数据类型
-                    try:
-                        # 如果列是数字类型，尝试转换值为数字
-                        if pd.api.types.is_numeric_dtype(df[key]):
-                            if '.' in str(value):
-                                df.at[index[0], key] = float(value)
-                            else:
-                                df.at[index[0], key] = int(value)
-                        else:
-                            df.at[index[0], key] = value
-                    except ValueError:
-                        # 如果转换失败，保留原始值
-                        df.at[index[0], key] = value
-                
-                # 保存到文件
-                df.to_excel(self.contract_file, index=False, engine='openpyxl')
-                return True
+                # 按列类型转换后写入并保存到文件，日期、数字格式不对时更新失败
+                label = self._update_row('contracts', contract_id, update_data)
+                return self._record_at('contracts', label)
             else:
                 print(f"更新合同失败: 未找到合同编号 {contract_id}")
                 return False
@@ -146,38 +788,34 @@ class DataManager:
             print(f"更新合同失败: {str(e)}")
             return False
 
+    @_synchronized
     def delete_contract(self, contract_id):
-        """删除合同"""
+        """删除合同，成功时返回被删除的记录(字典)，失败时返回 False"""
         try:
-            # 读取现有数据
-            df = self.get_all_contracts()
-            
-            # 确保合同编号是字符串类型
-            contract_id = str(contract_id)
-            df['合同编号'] = df['合同编号'].astype(str)
-            
-            # 查找并删除合同
-            initial_len = len(df)
-            df = df[df['合同编号'] != contract_id]
+            # 通过主键索引查找合同
+            labels = self._find_labels('contracts', contract_id)
+            if not labels:
+                return False
+            record = self._record_at('contracts', labels[0])
+            df = self._frame('contracts').drop(labels)
             
             # 保存到文件
-            df.to_excel(self.contract_file, index=False, engine='openpyxl')
-            return len(df) < initial_len
+            self._delete_row('contracts', contract_id, df)
+            return record
         except Exception as e:
             print(f"删除合同失败: {str(e)}")
             return False
 
+    @_synchronized
     def search_contracts(self, search_term, search_type):
         """搜索合同"""
         try:
+            # 文本列通过 N-gram 索引查找，不扫描整列
+            if search_type in TABLE_SPECS['contracts']['text_columns']:
+                return self._text_search('contracts', search_term, search_type)
             df = self.get_all_contracts()
             if search_type in df.columns:
-                # 对于字符串类型的列进行模糊搜索
-                if df[search_type].dtype == 'object':
-                    return df[df[search_type].str.contains(search_term, na=False)]
-                # 对于其他类型的列进行精确匹配
-                else:
-                    return df[df[search_type] == search_term]
+                return df[self._match_column(df[search_type], search_term)]
             return pd.DataFrame()
         except Exception as e:
             print(f"搜索合同失败: {str(e)}")
@@ -185,103 +823,210 @@ class DataManager:
 
     def _generate_contract_id(self):
         """生成合同编号"""
-        today = datetime.now().strftime('%Y%m%d')
-        df = self.get_all_contracts()
-        
-        # 确保合同编号是字符串类型
-        df['合同编号'] = df['合同编号'].astype(str)
-        # 筛选今天的合同
-        today_contracts = df[df['合同编号'].str.startswith(today, na=False)]
-        
-        # 生成序号
-        if len(today_contracts) == 0:
-            seq = '001'
-        else:
-            # 提取序号并找到最大值
-            max_seq = max([int(id[-3:]) for id in today_contracts['合同编号'] if id[-3:].isdigit()])
-            seq = f'{max_seq + 1:03d}'
-        
-        return f'{today}{seq}'
+        return self._generate_ids('contracts', 1)[0]
+
+    # ------------------------------ 合同应收 ------------------------------
+    @_synchronized
+    def get_receivables(self, where=None, today=None, columns=None):
+        """合同应收数据: 合同表加上 已收款金额、未收款金额、是否超期 三列
+
+        where 为 query() 的查询条件，只计算满足条件的合同；已收款金额取自增量维护的收款汇总，
+        不读取收款明细。today 为判断超期的日期，默认为今天；columns 为需要的合同列。
+        """
+        try:
+            if columns is not None:
+                columns = list(dict.fromkeys(['合同编号', '合同金额', '交货日期'] + list(columns)))
+            contracts = self.query('contracts', where=where, columns=columns)
+            return compute_receivables(contracts, self._received_totals(), today)
+        except Exception as e:
+            print(f"计算合同应收失败: {str(e)}")
+            return pd.DataFrame()
+
+    @_synchronized
+    def get_aging_report(self, group_by=None, today=None):
+        """账龄报表，只包含未收款金额大于 0 的合同
+
+        group_by 为 None 时按合同列出 逾期天数 和 账龄(未到期、1-30天、31-60天、61-90天、90天以上)；
+        为 '客户名称' 或 '业务员' 时按该列汇总各账龄区间的未收款金额。
+        """
+        try:
+            receivables = self.get_receivables(today=today, columns=['客户名称', '业务员'])
+            aging = compute_aging(receivables, today)
+            if group_by is not None:
+                return aging_summary(aging, group_by)
+            aging = aging[aging['未收款金额'] > 0]
+            return aging.sort_values('逾期天数', ascending=False, kind='stable').reset_index(drop=True)
+        except Exception as e:
+            print(f"计算账龄失败: {str(e)}")
+            return pd.DataFrame()
+
+    # ------------------------------ 业务员业绩 ------------------------------
+    @_synchronized
+    def get_salesman_performance(self, salesman=None, today=None):
+        """业务员按月(签订日期所在月份)的业绩汇总
+
+        返回列: 业务员、月份、合同数、签约金额、已收款金额、未收款金额、超期金额。
+        结果按合同表和收款表的版本缓存，数据未修改时重复调用不会重新计算。
+        salesman 不为空时只返回该业务员的数据。
+        """
+        try:
+            today = pd.Timestamp(today or datetime.now().date())
+            rollup = self._memoize(
+                'salesman_performance', ['contracts', 'payments'], today,
+                lambda: salesman_performance(self.get_receivables(today=today, columns=['业务员', '签订日期'])))
+            if salesman is not None:
+                rollup = rollup[rollup['业务员'] == salesman]
+            return rollup.reset_index(drop=True)
+        except Exception as e:
+            print(f"计算业务员业绩失败: {str(e)}")
+            return pd.DataFrame()
+
+    # ------------------------------ 客户信用 ------------------------------
+    @_synchronized
+    def get_customer_exposure(self, customer_name):
+        """客户当前的未收款敞口: 未完成、未取消合同的未收款金额之和"""
+        try:
+            return self._exposure_index().get(customer_name)
+        except Exception as e:
+            print(f"计算客户敞口失败: {str(e)}")
+            return 0.0
+
+    @_synchronized
+    def get_credit_limit(self, customer_name):
+        """客户的信用额度，未设置时返回 None"""
+        labels = self._column_index('customers', '客户名称').get(key_to_str(customer_name), [])
+        if not labels:
+            return None
+        limit = self._frame('customers').at[labels[0], '信用额度']
+        return None if pd.isna(limit) else float(limit)
+
+    @_synchronized
+    def check_credit(self, customer_name, amount, contract_id=None, status=None):
+        """检查保存合同后客户的敞口是否超过信用额度
+
+        amount 为合同金额；修改已有合同时传入 contract_id，该合同原来的未收款金额不重复计算；
+        status 为保存后的合同状态，已完成、已取消的合同不计入敞口。
+        客户未设置信用额度时返回 None，否则返回
+        {'limit': 信用额度, 'exposure': 当前敞口, 'new_exposure': 保存后的敞口, 'exceeded': 是否超过额度}。
+        敞口和信用额度都从索引中直接取得，不需要重新汇总合同和收款。
+        """
+        try:
+            limit = self.get_credit_limit(customer_name)
+            if limit is None:
+                return None
+            index = self._exposure_index()
+            new_exposure = index.projected(customer_name, float(amount or 0), contract_id, status)
+            return {'limit': limit, 'exposure': index.get(customer_name),
+                    'new_exposure': new_exposure, 'exceeded': new_exposure > limit}
+        except Exception as e:
+            print(f"检查信用额度失败: {str(e)}")
+            return None
+
+    # ------------------------------ 月度汇总 ------------------------------
+    @_synchronized
+    def get_monthly_summary(self, by=None, where=None, start=None, end=None):
+        """签约与收款的月度汇总，返回 by 各列加 签约金额、合同数、收款金额
+
+        by 为汇总的维度，可选 月份、客户名称、业务员、付款方式，默认按 月份；
+        where 为 {维度: 值或值列表} 的过滤条件，start、end 为月份范围(YYYY-MM，含两端)。
+        例如各业务员每月的签约和收款: get_monthly_summary(by=['业务员', '月份'])。
+        汇总随合同和收款的修改增量更新，切片时不读取原始记录。
+        """
+        try:
+            return self._monthly_cube().slice(by, where, start, end)
+        except Exception as e:
+            print(f"计算月度汇总失败: {str(e)}")
+            return pd.DataFrame()
 
     # ------------------------------ 收款管理 ------------------------------
+    @_synchronized
     def get_all_payments(self):
         """获取所有收款数据"""
         try:
-            return pd.read_excel(self.payment_file, engine='openpyxl')
+            return self._read_table('payments')
         except Exception as e:
             print(f"读取收款数据失败: {str(e)}")
             return pd.DataFrame()
 
+    @_synchronized
     def add_payment(self, payment_data):
-        """添加新收款"""
+        """添加新收款，成功时返回新增的记录(字典)，失败时返回 False"""
         try:
-            # 读取现有数据
-            df = self.get_all_payments()
-            
             # 生成收款ID
             if '收款ID' not in payment_data or not payment_data['收款ID']:
                 payment_data['收款ID'] = self._generate_payment_id()
             
-            # 添加新数据
-            new_row = pd.DataFrame([payment_data])
-            df = pd.concat([df, new_row], ignore_index=True)
-            
-            # 保存到文件
-            df.to_excel(self.payment_file, index=False, engine='openpyxl')
-            return True
+            # 添加新数据并保存到文件
+            return self._insert_row('payments', payment_data)
         except Exception as e:
             print(f"添加收款失败: {str(e)}")
             return False
 
+    @_synchronized
+    def get_payment(self, payment_id):
+        """按收款ID获取收款，返回字典，不存在时返回 None"""
+        try:
+            return self._get_record('payments', payment_id)
+        except Exception as e:
+            print(f"读取收款数据失败: {str(e)}")
+            return None
+
+    @_synchronized
+    def get_payments_for_contract(self, contract_id):
+        """获取某个合同的所有收款记录，通过合同编号索引查找，不扫描整张收款表"""
+        try:
+            labels = self._column_index('payments', '合同编号').get(key_to_str(contract_id), [])
+            return self._frame('payments').loc[sorted(labels)].copy()
+        except Exception as e:
+            print(f"读取收款数据失败: {str(e)}")
+            return pd.DataFrame()
+
+    @_synchronized
     def update_payment(self, payment_id, update_data):
-        """更新收款信息"""
+        """更新收款信息，成功时返回更新后的记录(字典)，失败时返回 False"""
         try:
-            # 读取现有数据
-            df = self.get_all_payments()
-            
-            # 查找并更新收款
-            index = df[df['收款ID'] == payment_id].index
-            if not index.empty:
-                for key, value in update_data.items():
-                    if key in df.columns:
-                        df.at[index[0], key] = value
+            # 通过主键索引查找收款
+            labels = self._find_labels('payments', payment_id)
+            if labels:
+                columns = self._frame('payments').columns
+                changes = {key: value for key, value in update_data.items() if key in columns}
                 
-                # 保存到文件
-                df.to_excel(self.payment_file, index=False, engine='openpyxl')
-                return True
+                # 按列类型转换后写入并保存到文件
+                label = self._update_row('payments', payment_id, changes)
+                return self._record_at('payments', label)
             return False
         except Exception as e:
             print(f"更新收款失败: {str(e)}")
             return False
 
+    @_synchronized
     def delete_payment(self, payment_id):
-        """删除收款"""
+        """删除收款，成功时返回被删除的记录(字典)，失败时返回 False"""
         try:
-            # 读取现有数据
-            df = self.get_all_payments()
-            
-            # 查找并删除收款
-            initial_len = len(df)
-            df = df[df['收款ID'] != payment_id]
+            # 通过主键索引查找收款
+            labels = self._find_labels('payments', payment_id)
+            if not labels:
+                return False
+            record = self._record_at('payments', labels[0])
+            df = self._frame('payments').drop(labels)
             
             # 保存到文件
-            df.to_excel(self.payment_file, index=False, engine='openpyxl')
-            return len(df) < initial_len
+            self._delete_row('payments', payment_id, df)
+            return record
         except Exception as e:
             print(f"删除收款失败: {str(e)}")
             return False
 
+    @_synchronized
     def search_payments(self, search_term, search_type):
         """搜索收款"""
         try:
+            # 文本列通过 N-gram 索引查找，不扫描整列
+            if search_type in TABLE_SPECS['payments']['text_columns']:
+                return self._text_search('payments', search_term, search_type)
             df = self.get_all_payments()
             if search_type in df.columns:
-                # 对于字符串类型的列进行模糊搜索
-                if df[search_type].dtype == 'object':
-                    return df[df[search_type].str.contains(search_term, na=False)]
-                # 对于其他类型的列进行精确匹配
-                else:
-                    return df[df[search_type] == search_term]
+                return df[self._match_column(df[search_type], search_term)]
             return pd.DataFrame()
         except Exception as e:
             print(f"搜索收款失败: {str(e)}")
@@ -289,226 +1034,318 @@ class DataManager:
 
     def _generate_payment_id(self):
         """生成收款ID"""
-        today = datetime.now().strftime('%Y%m%d')
-        df = self.get_all_payments()
-        
-        # 筛选今天的收款
-        today_payments = df[df['收款ID'].str.startswith(today, na=False)]
-        
-        # 生成序号
-        if len(today_payments) == 0:
-            seq = '001'
-        else:
-            # 提取序号并找到最大值
-            max_seq = max([int(id[-3:]) for id in today_payments['收款ID'] if id[-3:].isdigit()])
-            seq = f'{max_seq + 1:03d}'
-        
-        return f'P{today}{seq}'
+        return self._generate_ids('payments', 1)[0]
 
     # ------------------------------ 客户管理 ------------------------------
+    @_synchronized
     def get_all_customers(self):
         """获取所有客户数据"""
         try:
-            return pd.read_excel(self.customer_file, engine='openpyxl')
+            return self._read_table('customers')
         except Exception as e:
             print(f"读取客户数据失败: {str(e)}")
             return pd.DataFrame()
 
+    @_synchronized
     def add_customer(self, customer_data):
-        """添加新客户"""
+        """添加新客户，成功时返回新增的记录(字典)，失败时返回 False"""
         try:
-            # 读取现有数据
-            df = self.get_all_customers()
-            
             # 生成客户ID
             if '客户ID' not in customer_data or not customer_data['客户ID']:
                 customer_data['客户ID'] = self._generate_customer_id()
             
-            # 添加新数据
-            new_row = pd.DataFrame([customer_data])
-            df = pd.concat([df, new_row], ignore_index=True)
-            
-            # 保存到文件
-            df.to_excel(self.customer_file, index=False, engine='openpyxl')
-            return True
+            # 添加新数据并保存到文件
+            return self._insert_row('customers', customer_data)
         except Exception as e:
             print(f"添加客户失败: {str(e)}")
             return False
 
+    @_synchronized
+    def get_customer(self, customer_id):
+        """按客户ID获取客户，返回字典，不存在时返回 None"""
+        try:
+            return self._get_record('customers', customer_id)
+        except Exception as e:
+            print(f"读取客户数据失败: {str(e)}")
+            return None
+
+    @_synchronized
     def update_customer(self, customer_id, update_data):
-        """更新客户信息"""
+        """更新客户信息，成功时返回更新后的记录(字典)，失败时返回 False"""
         try:
-            # 读取现有数据
-            df = self.get_all_customers()
-            
-            # 查找并更新客户
-            index = df[df['客户ID'] == customer_id].index
-            if not index.empty:
-                for key, value in update_data.items():
-                    if key in df.columns:
-                        df.at[index[0], key] = value
+            # 通过主键索引查找客户
+            labels = self._find_labels('customers', customer_id)
+            if labels:
+                columns = self._frame('customers').columns
+                changes = {key: value for key, value in update_data.items() if key in columns}
                 
-                # 保存到文件
-                df.to_excel(self.customer_file, index=False, engine='openpyxl')
-                return True
+                # 按列类型转换后写入并保存到文件
+                label = self._update_row('customers', customer_id, changes)
+                return self._record_at('customers', label)
             return False
         except Exception as e:
             print(f"更新客户失败: {str(e)}")
             return False
 
+    @_synchronized
     def delete_customer(self, customer_id):
-        """删除客户"""
+        """删除客户，成功时返回被删除的记录(字典)，失败时返回 False"""
         try:
-            # 读取现有数据
-            df = self.get_all_customers()
-            
-            # 查找并删除客户
-            initial_len = len(df)
-            df = df[df['客户ID'] != customer_id]
+            # 通过主键索引查找客户
+            labels = self._find_labels('customers', customer_id)
+            if not labels:
+                return False
+            record = self._record_at('customers', labels[0])
+            df = self._frame('customers').drop(labels)
             
             # 保存到文件
-            df.to_excel(self.customer_file, index=False, engine='openpyxl')
-            return len(df) < initial_len
+            self._delete_row('customers', customer_id, df)
+            return record
         except Exception as e:
             print(f"删除客户失败: {str(e)}")
             return False
 
+    @_synchronized
     def search_customers(self, search_term, search_type):
         """搜索客户"""
         try:
+            # 文本列通过 N-gram 索引查找，不扫描整列
+            if search_type in TABLE_SPECS['customers']['text_columns']:
+                return self._text_search('customers', search_term, search_type)
             df = self.get_all_customers()
             if search_type in df.columns:
-                # 对于字符串类型的列进行模糊搜索
-                if df[search_type].dtype == 'object':
-                    return df[df[search_type].str.contains(search_term, na=False)]
-                # 对于其他类型的列进行精确匹配
-                else:
-                    return df[df[search_type] == search_term]
+                return df[self._match_column(df[search_type], search_term)]
             return pd.DataFrame()
         except Exception as e:
             print(f"搜索客户失败: {str(e)}")
             return pd.DataFrame()
 
+    @_synchronized
+    def suggest_customers(self, search_term, limit=50):
+        """按客户名称边输入边搜索: 返回最多 limit 个客户，名称相同、以搜索词开头的排在前面"""
+        try:
+            return self._suggest('customers', search_term, '客户名称', limit)
+        except Exception as e:
+            print(f"搜索客户失败: {str(e)}")
+            return pd.DataFrame()
+
     def _generate_customer_id(self):
         """生成客户ID"""
-        df = self.get_all_customers()
-        
-        # 查找最大ID
-        if df.empty or '客户ID' not in df.columns or df['客户ID'].isna().all():
-            return 'C001'
-        
-        # 提取数字部分并找到最大值
-        numeric_ids = []
-        for id in df['客户ID']:
-            if isinstance(id, str) and id.startswith('C') and id[1:].isdigit():
-                numeric_ids.append(int(id[1:]))
-        
-        if not numeric_ids:
-            return 'C001'
-        
-        max_id = max(numeric_ids)
-        return f'C{max_id + 1:03d}'
+        return self._generate_ids('customers', 1)[0]
 
     # ------------------------------ 业务员管理 ------------------------------
+    @_synchronized
     def get_all_salesmen(self):
         """获取所有业务员数据"""
         try:
-            return pd.read_excel(self.salesman_file, engine='openpyxl')
+            return self._read_table('salesmen')
         except Exception as e:
             print(f"读取业务员数据失败: {str(e)}")
             return pd.DataFrame()
 
+    @_synchronized
     def add_salesman(self, salesman_data):
-        """添加新业务员"""
+        """添加新业务员，成功时返回新增的记录(字典)，失败时返回 False"""
         try:
-            # 读取现有数据
-            df = self.get_all_salesmen()
-            
             # 生成业务员ID
             if '业务员ID' not in salesman_data or not salesman_data['业务员ID']:
                 salesman_data['业务员ID'] = self._generate_salesman_id()
             
-            # 添加新数据
-            new_row = pd.DataFrame([salesman_data])
-            df = pd.concat([df, new_row], ignore_index=True)
-            
-            # 保存到文件
-            df.to_excel(self.salesman_file, index=False, engine='openpyxl')
-            return True
+            # 添加新数据并保存到文件
+            return self._insert_row('salesmen', salesman_data)
         except Exception as e:
             print(f"添加业务员失败: {str(e)}")
             return False
 
+    @_synchronized
+    def get_salesman(self, salesman_id):
+        """按业务员ID获取业务员，返回字典，不存在时返回 None"""
+        try:
+            return self._get_record('salesmen', salesman_id)
+        except Exception as e:
+            print(f"读取业务员数据失败: {str(e)}")
+            return None
+
+    @_synchronized
     def update_salesman(self, salesman_id, update_data):
-        """更新业务员信息"""
+        """更新业务员信息，成功时返回更新后的记录(字典)，失败时返回 False"""
         try:
-            # 读取现有数据
-            df = self.get_all_salesmen()
-            
-            # 查找并更新业务员
-            index = df[df['业务员ID'] == salesman_id].index
-            if not index.empty:
-                for key, value in update_data.items():
-                    if key in df.columns:
-                        df.at[index[0], key] = value
+            # 通过主键索引查找业务员
+            labels = self._find_labels('salesmen', salesman_id)
+            if labels:
+                columns = self._frame('salesmen').columns
+                changes = {key: value for key, value in update_data.items() if key in columns}
                 
-                # 保存到文件
-                df.to_excel(self.salesman_file, index=False, engine='openpyxl')
-                return True
+                # 按列类型转换后写入并保存到文件
+                label = self._update_row('salesmen', salesman_id, changes)
+                return self._record_at('salesmen', label)
             return False
         except Exception as e:
             print(f"更新业务员失败: {str(e)}")
             return False
 
+    @_synchronized
     def delete_salesman(self, salesman_id):
-        """删除业务员"""
+        """删除业务员，成功时返回被删除的记录(字典)，失败时返回 False"""
         try:
-            # 读取现有数据
-            df = self.get_all_salesmen()
-            
-            # 查找并删除业务员
-            initial_len = len(df)
-            df = df[df['业务员ID'] != salesman_id]
+            # 通过主键索引查找业务员
+            labels = self._find_labels('salesmen', salesman_id)
+            if not labels:
+                return False
+            record = self._record_at('salesmen', labels[0])
+            df = self._frame('salesmen').drop(labels)
             
             # 保存到文件
-            df.to_excel(self.salesman_file, index=False, engine='openpyxl')
-            return len(df) < initial_len
+            self._delete_row('salesmen', salesman_id, df)
+            return record
         except Exception as e:
             print(f"删除业务员失败: {str(e)}")
             return False
 
+    @_synchronized
     def search_salesmen(self, search_term, search_type):
         """搜索业务员"""
         try:
+            # 文本列通过 N-gram 索引查找，不扫描整列
+            if search_type in TABLE_SPECS['salesmen']['text_columns']:
+                return self._text_search('salesmen', search_term, search_type)
             df = self.get_all_salesmen()
             if search_type in df.columns:
-                # 对于字符串类型的列进行模糊搜索
-                if df[search_type].dtype == 'object':
-                    return df[df[search_type].str.contains(search_term, na=False)]
-                # 对于其他类型的列进行精确匹配
-                else:
-                    return df[df[search_type] == search_term]
+                return df[self._match_column(df[search_type], search_term)]
+            return pd.DataFrame()
+        except Exception as e:
+            print(f"搜索业务员失败: {str(e)}")
             return pd.DataFrame()
+
+    @_synchronized
+    def suggest_salesmen(self, search_term, limit=50):
+        """按姓名边输入边搜索: 返回最多 limit 个业务员，姓名相同、以搜索词开头的排在前面"""
+        try:
+            return self._suggest('salesmen', search_term, '姓名', limit)
         except Exception as e:
             print(f"搜索业务员失败: {str(e)}")
             return pd.DataFrame()
 
     def _generate_salesman_id(self):
         """生成业务员ID"""
-        df = self.get_all_salesmen()
-        
-        # 查找最大ID
-        if df.empty or '业务员ID' not in df.columns or df['业务员ID'].isna().all():
-            return 'S001'
-        
-        # 提取数字部分并找到最大值
-        numeric_ids = []
-        for id in df['业务员ID']:
-            if isinstance(id, str) and id.startswith('S') and id[1:].isdigit():
-                numeric_ids.append(int(id[1:]))
-        
-        if not numeric_ids:
-            return 'S001'
-        
-        max_id = max(numeric_ids)
-        return f'S{max_id + 1:03d}'
\ No newline at end of file
+        return self._generate_ids('salesmen', 1)[0]
+
+    # ------------------------------ 批量导入 ------------------------------
+    @_synchronized
+    def import_contracts(self, source):
+        """从 CSV/XLSX 文件或 DataFrame 批量导入合同"""
+        return self._import_table('contracts', source)
+
+    @_synchronized
+    def import_payments(self, source):
+        """从 CSV/XLSX 文件或 DataFrame 批量导入收款"""
+        return self._import_table('payments', source)
+
+    @_synchronized
+    def import_customers(self, source):
+        """从 CSV/XLSX 文件或 DataFrame 批量导入客户"""
+        return self._import_table('customers', source)
+
+    @_synchronized
+    def import_salesmen(self, source):
+        """从 CSV/XLSX 文件或 DataFrame 批量导入业务员"""
+        return self._import_table('salesmen', source)
+
+    def _read_import_source(self, source):
+        """读取待导入的数据"""
+        if isinstance(source, pd.DataFrame):
+            return source.copy()
+        ext = os.path.splitext(str(source))[1].lower()
+        if ext == '.csv':
+            return pd.read_csv(source, dtype=str, encoding='utf-8-sig')
+        return pd.read_excel(source, dtype=str, engine='openpyxl')
+
+    def _import_table(self, table, source):
+        """批量导入数据
+
+        校验和编号生成都是整列操作，所有合格记录最后一次性写入。
+        返回导入报告: {'total': 总行数, 'imported': 导入行数,
+        'rejected': 被拒绝的记录(含"拒绝原因"列), 'error': 读取失败时的错误信息}
+        """
+        spec = TABLE_SPECS[table]
+        key = spec['key']
+        report = {'total': 0, 'imported': 0, 'rejected': pd.DataFrame(), 'error': None}
+        try:
+            incoming = self._read_import_source(source)
+        except Exception as e:
+            print(f"读取导入文件失败: {str(e)}")
+            report['error'] = str(e)
+            return report
+
+        incoming = incoming.reset_index(drop=True)
+        report['total'] = len(incoming)
+        for column in spec['columns']:
+            if column not in incoming.columns:
+                incoming[column] = None
+        incoming = incoming[spec['columns']]
+        # 被拒绝的记录按文件中的原始内容导出，便于用户找到并修改错误的值
+        original = incoming.copy()
+
+        # 去掉字符串两端的空白，空字符串视为缺失
+        for column in spec['columns']:
+            values = incoming[column].astype(object)
+            if pd.api.types.is_string_dtype(incoming[column]) or values.map(type).eq(str).any():
+                text = values.where(values.isna(), values.astype(str).str.strip())
+                incoming[column] = text.mask(text == '', None)
+
+        reasons = pd.Series('', index=incoming.index, dtype=object)
+
+        def reject(mask, reason):
+            mask = mask & (reasons == '')
+            reasons[mask] = reason
+
+        for column in spec['required']:
+            reject(incoming[column].isna(), f'{column}不能为空')
+        # 转换后的数字只用于合格的记录
+        numbers = {}
+        for column in columns_of_type(table, 'float') + columns_of_type(table, 'int'):
+            values = pd.to_numeric(incoming[column], errors='coerce')
+            reject(incoming[column].notna() & values.isna(), f'{column}必须是数字')
+            numbers[column] = values
+        for column in columns_of_type(table, 'date'):
+            values = parse_dates(incoming[column])
+            reject(incoming[column].notna() & values.isna(), f'{column}不是有效日期')
+
+        existing = self._read_table(table)
+        existing_keys = set(existing[key].map(key_to_str)) if key in existing.columns else set()
+        keys = incoming[key].map(key_to_str)
+        reject(keys.notna() & keys.isin(existing_keys), f'{key}已存在')
+        reject(keys.notna() & keys.duplicated(), f'{key}重复')
+
+        if table == 'payments':
+            contracts = self._read_table('contracts')
+            contract_ids = set(contracts['合同编号'].map(key_to_str)) if '合同编号' in contracts.columns else set()
+            reject(incoming['合同编号'].notna() & ~incoming['合同编号'].map(key_to_str).isin(contract_ids),
+                   '合同编号不存在')
+
+        accepted = incoming[reasons == ''].copy()
+        for column, values in numbers.items():
+            accepted[column] = values[reasons == '']
+        rejected = original[reasons != ''].copy()
+        rejected['拒绝原因'] = reasons[reasons != '']
+        report['rejected'] = rejected
+
+        if accepted.empty:
+            return report
+
+        try:
+            # 为缺少编号的记录批量生成编号
+            missing = accepted[key].isna()
+            if missing.any():
+                accepted[key] = accepted[key].astype(object)
+                # 同一文件中已指定的编号也不能再分配
+                taken = accepted.loc[~missing, key].map(key_to_str)
+                accepted.loc[missing, key] = self._generate_ids(table, int(missing.sum()), taken)
+
+            df = self._append_rows(table, existing, accepted)
+            self._insert_rows(table, accepted, df)
+            report['imported'] = len(accepted)
+        except Exception as e:
+            print(f"导入数据失败: {str(e)}")
+            report['error'] = str(e)
+        return report
@@ -0,0 +1,85 @@
+"""后台数据加载
+
+读取工作簿、计算报表等耗时操作放到线程池中执行，界面线程通过 root.after 定时检查结果，
+完成后在界面线程中调用回调，Tk 控件只在界面线程中访问。切换界面时取消尚未完成的加载，
+过期的结果直接丢弃。
+"""
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk
+
+
+class BackgroundLoader:
+    """在后台线程执行数据读取，结果交回界面线程
+
+    用法:
+        loader.submit(lambda: data_manager.get_receivables(), show_report, on_error=show_error)
+
+    有加载在进行时，窗口右下角显示进度条。DataManager 的公开方法带锁，
+    后台读取与界面线程中的保存操作不会同时修改缓存。
+    """
+
+    # 检查后台结果的间隔(毫秒)
+    POLL_INTERVAL_MS = 30
+
+    def __init__(self, root, max_workers=2):
+        self.root = root
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='loader')
+        # 每次 cancel_all() 加 1，之前提交的加载结果不再交给回调
+        self._generation = 0
+        self._futures = set()
+        self._indicator = None
+
+    def submit(self, func, on_done, on_error=None):
+        """在后台执行 func()，完成后在界面线程中调用 on_done(结果)，出错时调用 on_error(异常)"""
+        generation = self._generation
+        future = self._executor.submit(func)
+        self._futures.add(future)
+        self._update_indicator()
+
+        def poll():
+            if not future.done():
+                self.root.after(self.POLL_INTERVAL_MS, poll)
+                return
+            self._futures.discard(future)
+            self._update_indicator()
+            if generation != self._generation or future.cancelled():
+                return
+            error = future.exception()
+            if error is None:
+                on_done(future.result())
+            elif on_error is not None:
+                on_error(error)
+            else:
+                print(f"后台加载数据失败: {str(error)}")
+
+        self.root.after(self.POLL_INTERVAL_MS, poll)
+        return future
+
+    def cancel_all(self):
+        """取消尚未完成的加载(例如切换界面时)，已在执行的加载完成后结果被丢弃"""
+        self._generation += 1
+        for future in list(self._futures):
+            if future.cancel():
+                self._futures.discard(future)
+        self._update_indicator()
+
+    def is_busy(self):
+        return bool(self._futures)
+
+    def _update_indicator(self):
+        """有加载在进行时显示进度条"""
+        if self._futures:
+            if self._indicator is None:
+                self._indicator = ttk.Progressbar(self.root, mode='indeterminate', length=120)
+                self._indicator.place(relx=1.0, rely=1.0, anchor='se', x=-5, y=-5)
+                self._indicator.start(15)
+            self._indicator.lift()
+        elif self._indicator is not None:
+            self._indicator.stop()
+            self._indicator.destroy()
+            self._indicator = None
+
+    def shutdown(self):
+        """程序退出时调用，等待正在执行的加载结束"""
+        self.cancel_all()
+        self._executor.shutdown(wait=True)
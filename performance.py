@@ -0,0 +1,50 @@
+"""业务员业绩汇总"""
+import pandas as pd
+
+# 汇总结果的指标列
+PERFORMANCE_COLUMNS = ['合同数', '签约金额', '已收款金额', '未收款金额', '超期金额']
+
+
+def month_keys(dates):
+    """整列日期转换为整数月份 年*100+月，没有日期的为 0
+
+    按整数月份分组，只对分组结果格式化月份(见 month_label)，避免逐行 strftime。
+    """
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    return (dates.dt.year * 100 + dates.dt.month).fillna(0).astype(int)
+
+
+def month_label(month):
+    """整数月份显示为 YYYY-MM，0 显示为 未知"""
+    return f'{month // 100}-{month % 100:02d}' if month else '未知'
+
+
+def salesman_performance(receivables):
+    """按 业务员 和 月份(签订日期所在月份，YYYY-MM)汇总业绩
+
+    receivables 为带有 已收款金额、未收款金额、是否超期 列的合同应收数据(见 compute_receivables)，
+    一次 groupby 得到 合同数、签约金额、已收款金额、未收款金额、超期金额(已超期合同的未收款金额)。
+    没有业务员或签订日期的合同分别归入 未指定、未知。
+    """
+    outstanding = receivables['未收款金额'].clip(lower=0)
+    months = month_keys(receivables['签订日期'])
+    frame = pd.DataFrame({
+        '业务员': receivables['业务员'].astype(object).fillna('未指定'),
+        '月份': months,
+        '合同编号': receivables['合同编号'],
+        '签约金额': pd.to_numeric(receivables['合同金额'], errors='coerce').fillna(0),
+        '已收款金额': receivables['已收款金额'],
+        '未收款金额': receivables['未收款金额'],
+        '超期金额': outstanding.where(receivables['是否超期'].astype(bool), 0),
+    })
+    rollup = frame.groupby(['业务员', '月份'], sort=True).agg(
+        合同数=('合同编号', 'size'),
+        签约金额=('签约金额', 'sum'),
+        已收款金额=('已收款金额', 'sum'),
+        未收款金额=('未收款金额', 'sum'),
+        超期金额=('超期金额', 'sum'),
+    )
+    rollup = rollup.reset_index()
+    rollup['月份'] = [month_label(month) for month in rollup['月份']]
+    return rollup[['业务员', '月份'] + PERFORMANCE_COLUMNS]
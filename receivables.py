@@ -0,0 +1,232 @@
+"""合同应收计算
+
+合同应收报表和合同进度查询共用这里的计算，全部是整列运算，
+不逐行解析日期或累加金额。各合同的已收款金额由 ReceivedTotals 增量维护，
+计算报表时不需要汇总全部收款记录。
+"""
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from schema import parse_dates
+from storage import key_to_str, keys_to_str
+
+def received_by_contract(payments):
+    """按合同编号汇总收款金额，返回 合同编号 -> 已收款金额 的 Series"""
+    if payments.empty or '合同编号' not in payments.columns:
+        return pd.Series(dtype=float)
+    amounts = pd.to_numeric(payments['收款金额'], errors='coerce').fillna(0)
+    return amounts.groupby(keys_to_str(payments['合同编号'])).sum()
+
+
+def compute_receivables(contracts, received, today=None):
+    """为合同表追加 已收款金额、未收款金额、是否超期 三列，返回新的 DataFrame
+
+    received 为 合同编号 -> 已收款金额 的字典或 Series(见 ReceivedTotals / received_by_contract)。
+    交货日期一次性解析为日期(已是 datetime64 时直接使用，其他写法按多种格式解析，
+    无法识别的视为没有交货日期)，交货日期早于 today 的合同为超期。
+    """
+    today = pd.Timestamp(today or datetime.now().date())
+    result = contracts.copy()
+    result['已收款金额'] = keys_to_str(result['合同编号']).map(received).fillna(0).astype(float)
+    result['未收款金额'] = pd.to_numeric(result['合同金额'], errors='coerce').fillna(0) - result['已收款金额']
+    due = parse_dates(result['交货日期'])
+    # NaT 与任何日期比较都为 False，没有交货日期的合同不算超期
+    result['是否超期'] = (due < today).to_numpy()
+    return result
+
+
+# 账龄区间及对应的逾期天数范围(左开右闭)，未到期或没有交货日期的合同归入 未到期
+AGING_BUCKETS = ['未到期', '1-30天', '31-60天', '61-90天', '90天以上']
+AGING_BINS = [-np.inf, 0, 30, 60, 90, np.inf]
+
+
+def compute_aging(receivables, today=None):
+    """在合同应收数据上追加 逾期天数、账龄 两列，返回新的 DataFrame
+
+    逾期天数为 today 与交货日期相差的天数，由整列日期相减得到。
+    """
+    today = pd.Timestamp(today or datetime.now().date())
+    result = receivables.copy()
+    days = (today - parse_dates(result['交货日期'])).dt.days.fillna(0)
+    result['逾期天数'] = days.clip(lower=0).astype(int).to_numpy()
+    result['账龄'] = pd.cut(days, bins=AGING_BINS, labels=AGING_BUCKETS).to_numpy()
+    return result
+
+
+def aging_summary(aging, by):
+    """按 by 列(如 客户名称、业务员)汇总各账龄区间的未收款金额，附 合计 列，按合计从大到小排列
+
+    只统计未收款金额大于 0 的合同。
+    """
+    outstanding = aging[aging['未收款金额'] > 0]
+    table = (outstanding.groupby([outstanding[by].astype(object), '账龄'], observed=False)['未收款金额']
+             .sum().unstack('账龄', fill_value=0))
+    table = table.reindex(columns=AGING_BUCKETS, fill_value=0)
+    table.columns = list(table.columns)
+    table['合计'] = table.sum(axis=1)
+    return table.sort_values('合计', ascending=False).rename_axis(by).reset_index()
+
+
+class ReceivedTotals:
+    """按合同汇总的已收款金额(合同编号 -> 金额)
+
+    汇总结果对应生成时收款表的签名，签名一致才有效。DataManager 在收款增删改时增量维护，
+    关闭时保存到 data 目录，下次启动收款表未变化时直接加载，不必重新汇总全部收款。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.totals = {}
+        self.signature = None
+        self.loaded = False
+        self._load()
+
+    @staticmethod
+    def _normalize(signature):
+        # 签名可能是元组，统一成 JSON 往返后的形式再比较
+        return json.loads(json.dumps(signature))
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.totals = {key: float(value) for key, value in data['totals'].items()}
+            self.signature = data['signature']
+            self.loaded = True
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"读取收款汇总失败: {str(e)}")
+
+    def save(self):
+        if not self.loaded:
+            return
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'signature': self.signature, 'totals': self.totals}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"保存收款汇总失败: {str(e)}")
+
+    def is_valid(self, signature):
+        return self.loaded and self.signature == self._normalize(signature)
+
+    def set_signature(self, signature):
+        self.signature = self._normalize(signature)
+
+    def reset(self, totals, signature):
+        """用重新汇总的结果替换当前数据"""
+        self.totals = dict(totals)
+        self.set_signature(signature)
+        self.loaded = True
+
+    def add(self, payments, sign=1):
+        """把收款记录(含 合同编号、收款金额 列的 DataFrame)计入汇总，sign 为 -1 时扣除"""
+        for contract_id, amount in received_by_contract(payments).items():
+            contract_id = key_to_str(contract_id)
+            self.totals[contract_id] = self.totals.get(contract_id, 0.0) + sign * float(amount)
+
+
+# 不再产生应收的合同状态，这些合同不计入客户的未收款敞口
+CLOSED_STATUSES = ('已完成', '已取消')
+
+
+class ExposureIndex:
+    """按客户汇总的未收款敞口(未结合同的未收款金额之和)
+
+    记录每个合同的客户、合同金额、是否未结和已收款金额，合同或收款变化时
+    只调整相关合同对所属客户敞口的贡献，查询某个客户的敞口为 O(1)。
+    versions 为生成索引时合同表和收款表的版本号，由 DataManager 判断索引是否过期。
+    """
+
+    def __init__(self, versions=None):
+        self.versions = versions
+        # 合同编号 -> (客户名称, 合同金额, 是否未结)
+        self.contracts = {}
+        # 合同编号 -> 已收款金额
+        self.received = {}
+        # 客户名称 -> 未收款敞口
+        self.exposure = {}
+
+    @classmethod
+    def build(cls, contracts, received, versions=None):
+        """由合同表(含 合同编号、客户名称、合同金额、状态 列)和各合同已收款金额构建索引"""
+        index = cls(versions)
+        index.received = {key_to_str(key): float(value) for key, value in dict(received).items()}
+        amounts = pd.to_numeric(contracts['合同金额'], errors='coerce').fillna(0)
+        is_open = ~contracts['状态'].astype(object).isin(CLOSED_STATUSES)
+        for contract_id, customer, amount, open_ in zip(keys_to_str(contracts['合同编号']),
+                                                        contracts['客户名称'], amounts, is_open):
+            index._set(contract_id, (key_to_str(customer), float(amount), bool(open_)))
+        return index
+
+    def outstanding(self, contract_id):
+        """合同对客户敞口的贡献: 未结合同的未收款金额，已结合同或已收满的合同为 0"""
+        entry = self.contracts.get(contract_id)
+        if entry is None or not entry[2]:
+            return 0.0
+        return max(entry[1] - self.received.get(contract_id, 0.0), 0.0)
+
+    def _shift(self, contract_id, sign):
+        entry = self.contracts.get(contract_id)
+        if entry is None:
+            return
+        customer = entry[0]
+        self.exposure[customer] = self.exposure.get(customer, 0.0) + sign * self.outstanding(contract_id)
+        if abs(self.exposure[customer]) < 1e-6:
+            del self.exposure[customer]
+
+    def _set(self, contract_id, entry):
+        self._shift(contract_id, -1)
+        if entry is None:
+            self.contracts.pop(contract_id, None)
+        else:
+            self.contracts[contract_id] = entry
+        self._shift(contract_id, 1)
+
+    def remove_contracts(self, contracts):
+        """移除合同(含 合同编号 列的 DataFrame)"""
+        for contract_id in keys_to_str(contracts['合同编号']):
+            self._set(contract_id, None)
+
+    def add_contracts(self, contracts):
+        """加入或更新合同(含 合同编号、客户名称、合同金额、状态 列的 DataFrame)"""
+        amounts = pd.to_numeric(contracts['合同金额'], errors='coerce').fillna(0)
+        for contract_id, customer, amount, status in zip(keys_to_str(contracts['合同编号']),
+                                                         contracts['客户名称'], amounts, contracts['状态']):
+            self._set(contract_id, (key_to_str(customer), float(amount), status not in CLOSED_STATUSES))
+
+    def add_payments(self, payments, sign=1):
+        """把收款记录计入相关合同的已收款金额，sign 为 -1 时扣除"""
+        for contract_id, amount in received_by_contract(payments).items():
+            contract_id = key_to_str(contract_id)
+            self._shift(contract_id, -1)
+            self.received[contract_id] = self.received.get(contract_id, 0.0) + sign * float(amount)
+            self._shift(contract_id, 1)
+
+    def get(self, customer):
+        """客户当前的未收款敞口"""
+        return self.exposure.get(key_to_str(customer), 0.0)
+
+    def projected(self, customer, amount, contract_id=None, status=None):
+        """保存一份金额为 amount、状态为 status 的合同后客户的敞口
+
+        contract_id 为修改中的已有合同时，先去掉它当前的贡献，并扣除它已收到的款项。
+        status 为已完成、已取消时合同不再计入敞口，只去掉它当前的贡献。
+        """
+        customer = key_to_str(customer)
+        exposure = self.get(customer)
+        if contract_id is not None:
+            contract_id = key_to_str(contract_id)
+            entry = self.contracts.get(contract_id)
+            if entry is not None and entry[0] == customer:
+                exposure -= self.outstanding(contract_id)
+            amount -= self.received.get(contract_id, 0.0)
+        if status in CLOSED_STATUSES:
+            return exposure
+        return exposure + max(float(amount), 0.0)
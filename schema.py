@@ -0,0 +1,287 @@
+"""数据表结构定义
+
+所有数据表的列、主键、必填列和各列的数据类型都登记在这里，
+DataManager 和界面共用同一份定义。数据读入时按类型统一转换一次：
+日期列转换为 datetime64，枚举列转换为 category，金额和数量转换为数值，
+之后的过滤、排序和计算都不需要再逐行解析字符串。
+"""
+import pandas as pd
+
+from storage import key_to_str
+
+# 枚举列的可选值
+PAYMENT_TERMS = ['电汇', '支票', '现金', '其他']
+CONTRACT_STATUSES = ['待执行', '执行中', '已完成', '已取消']
+RECEIPT_METHODS = ['银行转账', '信用证', '现金', '其他']
+
+# 数据表定义: 表名 -> Excel 文件名、主键列、列顺序、必填列、各列类型，
+# 枚举列的可选值，编号前缀和编号是否按天重新计数(形如 前缀 + 日期 + 序号)，以及建立全文索引的文本列
+# 列类型: text 文本、date 日期、float 金额、int 数量(出现小数时按 float 保存)、category 枚举
+TABLE_SPECS = {
+    'contracts': {
+        'file': 'contracts.xlsx',
+        'key': '合同编号',
+        'columns': ['合同编号', '客户名称', '业务员', '签订日期', '单价', '数量',
+                    '合同金额', '付款方式', '交货日期', '状态', '备注'],
+        'required': ['客户名称', '业务员', '签订日期', '合同金额', '交货日期'],
+        'dtypes': {
+            '合同编号': 'text', '客户名称': 'text', '业务员': 'text', '签订日期': 'date',
+            '单价': 'float', '数量': 'int', '合同金额': 'float', '付款方式': 'category',
+            '交货日期': 'date', '状态': 'category', '备注': 'text',
+        },
+        'categories': {'付款方式': PAYMENT_TERMS, '状态': CONTRACT_STATUSES},
+        'id_prefix': '',
+        'daily_id': True,
+        'text_columns': ['客户名称', '业务员', '备注'],
+    },
+    'payments': {
+        'file': 'payments.xlsx',
+        'key': '收款ID',
+        'columns': ['收款ID', '合同编号', '收款日期', '收款金额', '收款方式', '备注'],
+        'required': ['合同编号', '收款金额'],
+        'dtypes': {
+            '收款ID': 'text', '合同编号': 'text', '收款日期': 'date', '收款金额': 'float',
+            '收款方式': 'category', '备注': 'text',
+        },
+        'categories': {'收款方式': RECEIPT_METHODS},
+        'id_prefix': 'P',
+        'daily_id': True,
+        'text_columns': ['备注'],
+    },
+    'customers': {
+        'file': 'customers.xlsx',
+        'key': '客户ID',
+        'columns': ['客户ID', '客户名称', '联系人', '联系电话', '地址', '邮箱', '信用额度', '备注'],
+        'required': ['客户名称', '联系人', '联系电话'],
+        'dtypes': {**{column: 'text' for column in ['客户ID', '客户名称', '联系人', '联系电话', '地址', '邮箱', '备注']},
+                   '信用额度': 'float'},
+        'categories': {},
+        'id_prefix': 'C',
+        'daily_id': False,
+        'text_columns': ['客户名称', '联系人', '地址', '备注'],
+    },
+    'salesmen': {
+        'file': 'salesmen.xlsx',
+        'key': '业务员ID',
+        'columns': ['业务员ID', '姓名', '联系电话', '邮箱', '所属部门', '备注'],
+        'required': ['姓名', '联系电话', '所属部门'],
+        'dtypes': {column: 'text' for column in ['业务员ID', '姓名', '联系电话', '邮箱', '所属部门', '备注']},
+        'categories': {},
+        'id_prefix': 'S',
+        'daily_id': False,
+        'text_columns': ['姓名', '备注'],
+    },
+}
+
+# 各列类型的中文名称，用于提示信息
+TYPE_NAMES = {'text': '文本', 'date': '日期', 'float': '数字', 'int': '数字', 'category': '选项'}
+
+# 日期列常见的书写格式，依次尝试
+DATE_FORMATS = ['%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%d/%m/%Y']
+
+
+def columns_of_type(table, dtype):
+    """返回数据表中指定类型的列"""
+    return [column for column, column_type in TABLE_SPECS[table]['dtypes'].items() if column_type == dtype]
+
+
+def empty_frame(table):
+    """按表结构生成空表"""
+    return apply_schema(table, pd.DataFrame({column: [] for column in TABLE_SPECS[table]['columns']}))
+
+
+def _blank_to_none(values):
+    return [None if value is None or value == '' else value for value in values]
+
+
+def parse_dates(values):
+    """把一列值解析为 datetime64，支持 DATE_FORMATS 中的格式和日期对象，无法识别的值为 NaT"""
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('datetime64[ns]')
+    values = pd.Series(_blank_to_none(values.map(to_date_input).tolist()), index=values.index, dtype=object)
+    result = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    pending = values.notna()
+    for fmt in DATE_FORMATS:
+        if not pending.any():
+            break
+        parsed = pd.to_datetime(values[pending], format=fmt, errors='coerce')
+        result[pending] = parsed
+        pending &= result.isna()
+    if pending.any():
+        # 其余写法(如带时间的字符串)逐个解析
+        result[pending] = pd.to_datetime(values[pending], format='mixed', errors='coerce')
+    return result
+
+
+def to_date_input(value):
+    """日期对象转换为 YYYY-MM-DD 字符串，其余值保持不变，便于按格式统一解析"""
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d') if value == value else None
+    return value
+
+
+def parse_date(value):
+    """解析单个日期，无法识别时返回 NaT"""
+    return parse_dates([value]).iloc[0]
+
+
+def _strings(values):
+    """全是字符串(可含空值)的列整列转换为 object 列，空值统一为 None；含其他类型的值时返回 None
+
+    pandas 的 str 类型列(例如从快照或 xlsx 读取)不需要逐个调用 key_to_str。
+    """
+    if not isinstance(values.dtype, pd.StringDtype) and not (
+            values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty')):
+        return None
+    values = values.astype(object)
+    return values.where(values.notna(), None)
+
+
+def _to_text(values):
+    strings = _strings(values)
+    if strings is not None:
+        return strings
+    # 逐个转换而不用 Series.map，map 会把 None 变成 NaN
+    return pd.Series([key_to_str(value) for value in values], index=values.index, dtype=object)
+
+
+def _to_int(values):
+    numbers = pd.to_numeric(values, errors='coerce')
+    valid = numbers.dropna()
+    if (valid == valid.round()).all():
+        return numbers.astype('Int64')
+    return numbers.astype(float)
+
+
+def _to_category(values, categories):
+    strings = _strings(values)
+    if strings is not None:
+        values = strings.where(strings.ne(''), None)
+    else:
+        values = pd.Series(_blank_to_none([key_to_str(value) for value in values]), index=values.index, dtype=object)
+    extra = sorted(set(values.dropna()) - set(categories))
+    return values.astype(pd.CategoricalDtype(list(categories) + extra))
+
+
+def _has_type(values, dtype, categories=None):
+    """列是否已经是目标类型，已转换过的列(例如从快照加载)不再重复转换"""
+    if dtype == 'date':
+        return str(values.dtype) == 'datetime64[ns]'
+    if dtype == 'float':
+        return values.dtype == float
+    if dtype == 'int':
+        if values.dtype == float:
+            # 含小数的数量列保持 float
+            valid = values.dropna()
+            return not (valid == valid.round()).all()
+        return str(values.dtype) == 'Int64'
+    if dtype == 'category':
+        return isinstance(values.dtype, pd.CategoricalDtype) and set(categories) <= set(values.cat.categories)
+    return values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty')
+
+
+def convert_column(table, column, values):
+    """按表结构把一列转换为声明的类型，未登记的列原样返回"""
+    spec = TABLE_SPECS[table]
+    dtype = spec['dtypes'].get(column)
+    categories = spec['categories'].get(column, [])
+    if dtype is None or _has_type(values, dtype, categories):
+        return values
+    if dtype == 'date':
+        return parse_dates(values)
+    if dtype == 'float':
+        return pd.to_numeric(values, errors='coerce').astype(float)
+    if dtype == 'int':
+        return _to_int(values)
+    if dtype == 'category':
+        return _to_category(values, categories)
+    return _to_text(values)
+
+
+def apply_schema(table, df):
+    """按表结构转换 df 中各列的类型，返回新的 DataFrame
+
+    无法转换的值(例如写错的日期)会变为空值，并打印提示。
+    """
+    df = df.copy()
+    for column in df.columns:
+        values = df[column]
+        converted = convert_column(table, column, values)
+        if converted is values:
+            continue
+        lost = int((values.notna() & values.astype(object).ne('') & converted.isna()).sum())
+        if lost:
+            print(f"{table} 表 {column} 列有 {lost} 个值无法识别为{TYPE_NAMES[TABLE_SPECS[table]['dtypes'][column]]}，已置为空")
+        df[column] = converted
+    return df
+
+
+def normalize_frame(table, df):
+    """读入数据表后统一处理: 补齐表结构中缺少的列，按登记的列顺序排列并转换类型"""
+    columns = TABLE_SPECS[table]['columns']
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        df = df.assign(**{column: None for column in missing})
+    df = df[columns + [column for column in df.columns if column not in columns]]
+    return apply_schema(table, df)
+
+
+def conform_rows(table, df, rows):
+    """把待追加的记录转换为与 df 一致的列类型，返回 (df, rows)
+
+    枚举列出现新取值时先为 df 增加对应的类别，保证合并后仍是 category 类型。
+    """
+    rows = apply_schema(table, rows)
+    for column in rows.columns:
+        if column not in df.columns:
+            continue
+        target, values = df[column], rows[column]
+        if isinstance(target.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+            new = [value for value in values.dropna().unique() if value not in target.cat.categories]
+            if new:
+                df[column] = target = target.cat.add_categories(new)
+            rows[column] = values.astype(target.dtype)
+        elif str(target.dtype) == 'Int64' and values.dtype == float:
+            df[column] = target.astype(float)
+    return df, rows
+
+
+def set_value(table, df, label, column, value):
+    """按列类型转换后写入单元格，无法转换时抛出 ValueError"""
+    dtype = TABLE_SPECS[table]['dtypes'].get(column)
+    values = df[column]
+    if value is None or value == '' or (isinstance(value, float) and value != value):
+        value = None
+    elif dtype == 'date' or pd.api.types.is_datetime64_any_dtype(values):
+        parsed = parse_date(value)
+        if pd.isna(parsed):
+            raise ValueError(f"{column} 不是有效日期: {value}")
+        value = parsed
+    elif dtype in ('float', 'int') or pd.api.types.is_numeric_dtype(values):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{column} 必须是数字: {value}")
+        if str(values.dtype) == 'Int64' and not value.is_integer():
+            df[column] = values = values.astype(float)
+    elif isinstance(values.dtype, pd.CategoricalDtype):
+        value = key_to_str(value)
+        if value not in values.cat.categories:
+            df[column] = values.cat.add_categories([value])
+    elif dtype == 'text':
+        value = key_to_str(value)
+    elif values.dtype != object:
+        df[column] = values.astype(object)
+    df.at[label, column] = value
+
+
+def display_value(value):
+    """界面显示用: 空值显示为空，日期显示为 YYYY-MM-DD，整数金额去掉小数部分"""
+    value = key_to_str(value)
+    return '' if value is None else value
+
+
+def display_values(*values):
+    return tuple(display_value(value) for value in values)
@@ -0,0 +1,101 @@
+"""界面切换
+
+各功能界面只在第一次打开时创建，切换时隐藏当前界面、重新显示目标界面，
+不再销毁后重建控件。界面记录它依赖的数据表，重新显示时只有这些表的版本号
+变化了才重新读取数据，搜索条件、滚动位置等界面状态都保持不变。
+"""
+
+
+class Screen:
+    """一个已创建的界面"""
+
+    def __init__(self, frame, refresh=None, tables=()):
+        self.frame = frame
+        # 第一次显示时的布局参数，重新显示时按原样放回
+        self.pack_options = frame.pack_info()
+        # 重新读取数据的函数
+        self.refresh = refresh
+        # 依赖的数据表
+        self.tables = tuple(tables)
+        # 界面当前显示的数据对应的各表版本号，None 表示需要重新读取
+        self.versions = None
+
+
+class ScreenManager:
+    """按名称缓存界面，负责界面的隐藏、显示和按需刷新
+
+    用法(界面创建函数开头):
+        if self.screens.show('contracts'):
+            return
+        ... 创建并 pack 界面框架 ...
+        self.screens.add('contracts', contract_frame, refresh=load_contracts, tables=['contracts'])
+    """
+
+    def __init__(self, data_manager, loader):
+        self.data_manager = data_manager
+        self.loader = loader
+        self._screens = {}
+        self.current = None
+
+    def show(self, name):
+        """隐藏当前界面并显示 name 界面
+
+        界面已创建时返回 True，依赖的数据有变化时在后台检查后刷新；
+        尚未创建时返回 False，由调用方创建后调用 add()。
+        """
+        self._hide_current()
+        screen = self._screens.get(name)
+        if screen is None:
+            return False
+        screen.frame.pack(screen.pack_options)
+        self.current = name
+        self._refresh_if_changed(screen)
+        return True
+
+    def add(self, name, frame, refresh=None, tables=()):
+        """登记新创建的界面(frame 已经 pack)并作为当前界面"""
+        self._screens[name] = Screen(frame, refresh, tables)
+        self.current = name
+
+    def _hide_current(self):
+        screen = self._screens.get(self.current)
+        # 当前界面的加载被取消时，它显示的数据不完整，下次显示时需要重新读取
+        stale = self.loader.is_busy()
+        self.loader.cancel_all()
+        if screen is None:
+            return
+        screen.frame.pack_forget()
+        screen.versions = None
+        if stale or not screen.tables:
+            return
+
+        # 在界面中修改数据时表格已经同步更新，按隐藏时的版本号记录。
+        # 取版本号在表被外部修改时会重新读取整张表，放到后台执行；
+        # 记录完成前再次显示这个界面时，这次记录被取消，界面重新读取数据
+        def record(versions):
+            screen.versions = versions
+
+        self.loader.submit(lambda: self._versions(screen.tables), record)
+
+    def _versions(self, tables):
+        return tuple(self.data_manager.table_version(table) for table in tables)
+
+    def _refresh_if_changed(self, screen):
+        if screen.refresh is None or not screen.tables:
+            return
+        if screen.versions is None:
+            screen.refresh()
+            return
+
+        # 取版本号可能需要等后台读取释放锁，也放到后台执行
+        def check(versions):
+            if versions != screen.versions:
+                screen.refresh()
+
+        self.loader.submit(lambda: self._versions(screen.tables), check)
+
+    def refresh(self, table=None):
+        """数据在界面之外被修改(例如导入)后，刷新依赖 table 的当前界面"""
+        screen = self._screens.get(self.current)
+        if screen is not None and screen.refresh is not None and (table is None or table in screen.tables):
+            screen.refresh()
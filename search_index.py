@@ -0,0 +1,146 @@
+import bisect
+import heapq
+
+
+class NgramIndex:
+    """文本列的 N-gram 倒排索引，用于子串搜索
+
+    按字符切分，中文同样适用。同时索引单字和 n 字片段：
+    单字查询直接查单字倒排表，较长的查询取各片段倒排表的交集得到候选行，
+    再逐个确认候选行确实包含查询串，只需检查少量候选而不必扫描整列。
+    rank() 另外用按文本排序的列表查找前缀匹配，供边输入边搜索使用。
+    """
+
+    # rank() 中候选行超过这个数量时不再对全部子串匹配排序，只取够需要的条数
+    RANK_SCAN_LIMIT = 5000
+
+    def __init__(self, n=2):
+        self.n = n
+        # 行标签 -> 文本
+        self._texts = {}
+        # 片段 -> 行标签集合
+        self._postings = {}
+        # 按文本排序的 (文本, 行标签) 列表，首次调用 rank() 时生成，之后随增删维护
+        self._sorted = None
+
+    @classmethod
+    def build(cls, labels, values, n=2):
+        """根据一列数据构建索引"""
+        index = cls(n)
+        for label, value in zip(labels, values):
+            index.add(label, value)
+        return index
+
+    def _grams(self, text):
+        grams = set(text)
+        if self.n > 1:
+            grams.update(text[i:i + self.n] for i in range(len(text) - self.n + 1))
+        return grams
+
+    def add(self, label, value):
+        """加入一行数据，空值不建索引"""
+        if value is None or value != value:
+            return
+        text = str(value)
+        if not text:
+            return
+        self._texts[label] = text
+        if self._sorted is not None:
+            bisect.insort(self._sorted, (text, label))
+        for gram in self._grams(text):
+            self._postings.setdefault(gram, set()).add(label)
+
+    def remove(self, label):
+        """移除一行数据"""
+        text = self._texts.pop(label, None)
+        if text is None:
+            return
+        if self._sorted is not None:
+            position = bisect.bisect_left(self._sorted, (text, label))
+            del self._sorted[position]
+        for gram in self._grams(text):
+            labels = self._postings.get(gram)
+            if labels is not None:
+                labels.discard(label)
+                if not labels:
+                    del self._postings[gram]
+
+    def update(self, label, value):
+        self.remove(label)
+        self.add(label, value)
+
+    def search(self, term):
+        """返回文本中包含 term 的所有行标签(按标签排序)"""
+        term = str(term)
+        if not term:
+            return sorted(self._texts)
+        return sorted(label for label in self._candidates(term) if term in self._texts[label])
+
+    def _postings_of(self, term):
+        """term 各片段的倒排表，按行数从少到多排列；有片段不在索引中时返回空列表"""
+        if len(term) < self.n:
+            grams = set(term)
+        else:
+            grams = {term[i:i + self.n] for i in range(len(term) - self.n + 1)}
+
+        postings = []
+        for gram in grams:
+            labels = self._postings.get(gram)
+            if not labels:
+                return []
+            postings.append(labels)
+        postings.sort(key=len)
+        return postings
+
+    def _candidates(self, term):
+        """包含 term 全部片段的行标签集合"""
+        postings = self._postings_of(term)
+        if not postings:
+            return set()
+        if len(postings) == 1:
+            return postings[0]
+        candidates = postings[0] & postings[1]
+        for labels in postings[2:]:
+            if not candidates:
+                break
+            candidates &= labels
+        return candidates
+
+    def rank(self, term, limit=50):
+        """返回最多 limit 个文本包含 term 的行标签，按匹配程度排列
+
+        完全相同的排在最前，其次是以 term 开头的(按文本排序)，再次是其他位置包含 term 的
+        (匹配位置靠前、文本较短的在前)。前缀匹配通过二分查找得到，只取需要的条数；
+        子串匹配的候选行很多时(例如只输入一个常用字)不对全部候选排序，以保证响应速度。
+        """
+        term = str(term)
+        if self._sorted is None:
+            self._sorted = sorted((text, label) for label, text in self._texts.items())
+        # 以 term 开头的文本在排序列表中是连续的一段，完全相同的文本排在这一段的最前面
+        result = []
+        position = bisect.bisect_left(self._sorted, (term,))
+        while len(result) < limit and position < len(self._sorted):
+            text, label = self._sorted[position]
+            if not text.startswith(term):
+                break
+            result.append(label)
+            position += 1
+        if len(result) >= limit or not term:
+            return result
+
+        needed = limit - len(result)
+        matches = []
+        # 只取最短的倒排表作为候选，直接确认文本是否包含 term，不再求各倒排表的交集
+        postings = self._postings_of(term)
+        candidates = postings[0] if postings else ()
+        for label in candidates:
+            text = self._texts[label]
+            at = text.find(term)
+            if at > 0:
+                matches.append((at, len(text), text, label))
+                if len(candidates) > self.RANK_SCAN_LIMIT and len(matches) >= needed:
+                    break
+        return result + [match[3] for match in heapq.nsmallest(needed, matches)]
+
+    def __len__(self):
+        return len(self._texts)
@@ -0,0 +1,799 @@
+import json
+import os
+import pickle
+import sqlite3
+from datetime import date
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+
+def to_python_value(value):
+    """把 pandas/numpy 的值转换为普通 Python 值，缺失值转换为 None"""
+    if value is None:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def key_to_str(value):
+    """主键统一转换为字符串，整数形式的浮点数去掉小数部分"""
+    value = to_python_value(value)
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+# query() 支持的条件运算符
+QUERY_OPERATORS = ('==', '!=', '>', '>=', '<', '<=', 'in', 'contains')
+
+
+def query_value(value):
+    """查询条件中的值转换为与存储一致的形式，日期统一为 YYYY-MM-DD 字符串"""
+    value = to_python_value(value)
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def parse_where(where):
+    """把查询条件整理为 [(列名, 运算符, 值), ...]
+
+    where 为 {列名: 条件}，条件可以是单个值(等于)、列表/集合(IN)
+    或 {运算符: 值} 字典，例如:
+        {'状态': ['待执行', '执行中'], '合同金额': {'>=': 10000},
+         '签订日期': {'>=': '2024-01-01', '<': '2025-01-01'}, '客户名称': {'contains': '科技'}}
+    """
+    predicates = []
+    for column, condition in (where or {}).items():
+        if isinstance(condition, dict):
+            items = condition.items()
+        elif isinstance(condition, (list, tuple, set, frozenset)):
+            items = [('in', condition)]
+        else:
+            items = [('==', condition)]
+        for op, value in items:
+            if op not in QUERY_OPERATORS:
+                raise ValueError(f'不支持的查询运算符 {op}')
+            if op == 'in':
+                value = list(value)
+            predicates.append((column, op, value))
+    return predicates
+
+
+def parse_order_by(order_by):
+    """把排序参数整理为 [(列名, 是否升序), ...]，列名前加 '-' 表示降序"""
+    if order_by is None:
+        return []
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    return [(column[1:], False) if column.startswith('-') else (column, True) for column in order_by]
+
+
+def keys_to_str(values):
+    """整列主键转换为字符串(见 key_to_str)，已经全是字符串的列直接返回"""
+    if values.dtype == object and pd.api.types.infer_dtype(values, skipna=False) == 'string':
+        return values
+    return pd.Series([key_to_str(value) for value in values], index=values.index, dtype=object)
+
+
+def _excel_value(value):
+    """转换为 openpyxl 可以写入的单元格值，日期写为 YYYY-MM-DD 文本，与录入格式一致"""
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def write_excel(df, path, sheet_name='Sheet1'):
+    """以 openpyxl 只写模式流式保存 DataFrame
+
+    与 df.to_excel 相比不需要先构建整张表的单元格对象，速度更快、内存更省。
+    先写入临时文件再替换，保存中断时不会损坏原文件。
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append([str(column) for column in df.columns])
+    for record in df.itertuples(index=False, name=None):
+        sheet.append([_excel_value(value) for value in record])
+    tmp_path = path + '.tmp'
+    try:
+        workbook.save(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class StorageBackend:
+    """存储后端基类
+
+    DataManager 负责内存缓存和业务逻辑，后端只负责持久化。
+    行级操作(insert/update/delete)会同时传入变更后的完整表 df，
+    整表型后端(Excel)据此整体落盘，行级后端(SQLite)只处理受影响的记录。
+    """
+
+    name = None
+    # 单条 insert 是否只写入新增的记录而不使用 df。为 True 时 DataManager
+    # 新增记录前不必把记录合并进完整表，传入的 df 为 None
+    writes_rows = False
+
+    def __init__(self, data_dir, specs):
+        self.data_dir = data_dir
+        self.specs = specs
+
+    def ensure_tables(self):
+        """确保所有数据表存在"""
+        raise NotImplementedError
+
+    def signature(self, table):
+        """返回数据表当前的版本签名，签名变化说明数据被外部修改"""
+        raise NotImplementedError
+
+    def read(self, table):
+        """读取整张表"""
+        raise NotImplementedError
+
+    def write(self, table, df):
+        """整表覆盖写入"""
+        raise NotImplementedError
+
+    def iter_chunks(self, table, chunksize, columns=None):
+        """分块读取数据表，每次生成最多 chunksize 行的 DataFrame"""
+        df = self.read(table)
+        if columns is not None:
+            df = df[[column for column in columns if column in df.columns]]
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+    def query(self, table, predicates, order_by, limit=None, columns=None, offset=0):
+        """在后端执行条件查询，返回 None 表示不支持，由 DataManager 在内存中计算
+
+        predicates 和 order_by 为 parse_where / parse_order_by 整理后的结果，
+        offset 为跳过的行数，与 limit 一起用于分页读取。
+        """
+        return None
+
+    def count(self, table, predicates):
+        """在后端统计满足条件的行数，返回 None 表示不支持"""
+        return None
+
+    def insert(self, table, row, df):
+        """新增一条记录"""
+        self.write(table, df)
+
+    def insert_many(self, table, rows, df):
+        """批量新增记录，rows 为新增记录组成的 DataFrame"""
+        self.write(table, df)
+
+    def update(self, table, key, changes, df):
+        """按主键更新一条记录"""
+        self.write(table, df)
+
+    def delete(self, table, key, df):
+        """按主键删除记录"""
+        self.write(table, df)
+
+    def compact(self, table=None):
+        """把尚未合并的修改写回主数据文件，table 为空时处理所有表"""
+        pass
+
+    def close(self):
+        """释放后端占用的资源"""
+        pass
+
+
+class ExcelBackend(StorageBackend):
+    """Excel 存储后端，每张表对应 data 目录下的一个 xlsx 文件
+
+    读取 xlsx 很慢，因此每张表旁边还保存一份二进制快照(*.snapshot.pkl)，
+    快照中记录了生成时工作簿的签名，工作簿未变化时直接从快照加载。
+    """
+
+    name = 'excel'
+    snapshot_protocol = 5
+
+    def __init__(self, data_dir, specs, use_snapshot=True):
+        super().__init__(data_dir, specs)
+        self.use_snapshot = use_snapshot
+
+    def path(self, table):
+        return os.path.join(self.data_dir, self.specs[table]['file'])
+
+    def snapshot_path(self, table):
+        base, _ = os.path.splitext(self.path(table))
+        return base + '.snapshot.pkl'
+
+    def ensure_tables(self):
+        for table, spec in self.specs.items():
+            path = self.path(table)
+            if not os.path.exists(path):
+                write_excel(pd.DataFrame({column: [] for column in spec['columns']}), path)
+
+    def _file_signature(self, path):
+        """文件签名(修改时间, 大小)"""
+        try:
+            stat = os.stat(path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _workbook_signature(self, table):
+        return self._file_signature(self.path(table))
+
+    def signature(self, table):
+        return self._workbook_signature(table)
+
+    def _load_snapshot(self, table, signature):
+        """工作簿签名与快照记录一致时返回快照数据，否则返回 None"""
+        try:
+            with open(self.snapshot_path(table), 'rb') as f:
+                snapshot = pickle.load(f)
+            if snapshot['signature'] == signature:
+                return snapshot['df']
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"读取快照失败: {str(e)}")
+        return None
+
+    def _save_snapshot(self, table, df, signature):
+        """保存快照，先写临时文件再替换，避免留下不完整的快照"""
+        path = self.snapshot_path(table)
+        try:
+            with open(path + '.tmp', 'wb') as f:
+                pickle.dump({'signature': signature, 'df': df}, f, protocol=self.snapshot_protocol)
+            os.replace(path + '.tmp', path)
+        except Exception as e:
+            print(f"保存快照失败: {str(e)}")
+
+    def read(self, table):
+        if not self.use_snapshot:
+            return pd.read_excel(self.path(table), engine='openpyxl')
+        signature = self._workbook_signature(table)
+        df = self._load_snapshot(table, signature)
+        if df is None:
+            df = pd.read_excel(self.path(table), engine='openpyxl')
+            self._save_snapshot(table, df, signature)
+        return df
+
+    def iter_chunks(self, table, chunksize, columns=None):
+        """以 openpyxl 只读模式逐行读取工作簿，内存占用与表大小无关"""
+        workbook = openpyxl.load_workbook(self.path(table), read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            header = [str(name) if name is not None else f'Unnamed: {i}' for i, name in enumerate(header)]
+            if columns is None:
+                positions = list(range(len(header)))
+            else:
+                positions = [header.index(column) for column in columns if column in header]
+            names = [header[i] for i in positions]
+
+            chunk = []
+            for row in rows:
+                if all(value is None for value in row):
+                    continue
+                chunk.append([row[i] if i < len(row) else None for i in positions])
+                if len(chunk) >= chunksize:
+                    yield pd.DataFrame(chunk, columns=names)
+                    chunk = []
+            if chunk:
+                yield pd.DataFrame(chunk, columns=names)
+        finally:
+            workbook.close()
+
+    def write(self, table, df):
+        write_excel(df, self.path(table))
+        if self.use_snapshot:
+            self._save_snapshot(table, df, self._workbook_signature(table))
+
+
+class JournalExcelBackend(ExcelBackend):
+    """带追加日志的 Excel 存储后端
+
+    新增、修改、删除只追加一行 JSON 到 xlsx 旁边的 *.journal.jsonl 文件，
+    写入代价与表大小无关；读取时把日志合并到工作簿数据上。日志达到
+    compact_threshold 条或关闭时压缩回 xlsx，Excel 文件仍是最终的数据文件。
+
+    压缩前先写入 *.journal.compacting 标记，记录压缩前工作簿的签名，删除日志后再删除标记。
+    压缩中途退出时，下次读取发现标记还在：工作簿已被替换说明日志已经合并进工作簿，
+    丢弃日志；工作簿未变则日志仍然有效。这样不会把已合并的新增记录重复加入。
+    """
+
+    name = 'journal'
+    compact_threshold = 500
+    writes_rows = True
+
+    def __init__(self, data_dir, specs, compact_threshold=None, use_snapshot=True):
+        super().__init__(data_dir, specs, use_snapshot=use_snapshot)
+        if compact_threshold is not None:
+            self.compact_threshold = compact_threshold
+        # 各表日志中的记录条数
+        self._journal_lengths = {}
+        for table in self.specs:
+            self._recover(table)
+
+    def journal_path(self, table):
+        base, _ = os.path.splitext(self.path(table))
+        return base + '.journal.jsonl'
+
+    def compacting_path(self, table):
+        base, _ = os.path.splitext(self.path(table))
+        return base + '.journal.compacting'
+
+    def _recover(self, table):
+        """处理上次未完成的压缩，工作簿已被替换时删除已合并的日志"""
+        path = self.compacting_path(table)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                marker = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            # 标记本身没有写完，说明工作簿还未被替换
+            marker = None
+        if marker is not None:
+            # JSON 读回的签名是列表
+            signature = marker.get('workbook')
+            signature = tuple(signature) if signature is not None else None
+        if marker is not None and self._workbook_signature(table) != signature:
+            try:
+                os.remove(self.journal_path(table))
+            except FileNotFoundError:
+                pass
+        os.remove(path)
+        self._journal_lengths.pop(table, None)
+
+    def _journal_length(self, table):
+        if table not in self._journal_lengths:
+            try:
+                with open(self.journal_path(table), 'r', encoding='utf-8') as f:
+                    self._journal_lengths[table] = sum(1 for line in f if line.strip())
+            except FileNotFoundError:
+                self._journal_lengths[table] = 0
+        return self._journal_lengths[table]
+
+    def _append(self, table, entry):
+        """追加一条日志，日志过长时压缩回 xlsx
+
+        压缩时重新读取(工作簿加日志)后写回，不依赖调用方传入的完整表。
+        """
+        length = self._journal_length(table) + 1
+        with self._open_journal(table) as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+        self._journal_lengths[table] = length
+        if length >= self.compact_threshold:
+            self.compact(table)
+
+    def _open_journal(self, table):
+        """以追加方式打开日志
+
+        写入中断可能在末尾留下没有换行的不完整行，先补上换行，
+        新的记录从新的一行开始，不会与不完整的行连在一起而在读取时被一并丢弃。
+        """
+        path = self.journal_path(table)
+        try:
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                complete = f.read(1) == b'\n'
+        except (FileNotFoundError, OSError):
+            # 文件不存在或为空
+            complete = True
+        f = open(path, 'a', encoding='utf-8')
+        if not complete:
+            f.write('\n')
+        return f
+
+    def _read_journal(self, table):
+        entries = []
+        try:
+            with open(self.journal_path(table), 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        # 写入中断留下的不完整行，忽略
+                        continue
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def signature(self, table):
+        return (self._workbook_signature(table), self._file_signature(self.journal_path(table)))
+
+    def read(self, table):
+        self._recover(table)
+        df = super().read(table)
+        entries = self._read_journal(table)
+        self._journal_lengths[table] = len(entries)
+        if not entries:
+            return df
+
+        key = self.specs[table]['key']
+        keys = df[key].map(key_to_str) if key in df.columns else pd.Series(index=df.index, dtype=object)
+        # 主键 -> 第一条匹配记录的行标签
+        positions = {}
+        for label, value in zip(df.index, keys):
+            positions.setdefault(value, label)
+        inserted = []
+        updates = {}
+        deleted = set()
+
+        for entry in entries:
+            op = entry.get('op')
+            if op == 'insert':
+                inserted.append(dict(entry['row']))
+            elif op == 'update':
+                # 与 DataManager 一致，只更新第一条匹配的记录
+                entry_key = key_to_str(entry['key'])
+                if entry_key in positions and entry_key not in deleted:
+                    updates.setdefault(positions[entry_key], {}).update(entry['changes'])
+                    continue
+                for row in inserted:
+                    if row is not None and key_to_str(row.get(key)) == entry_key:
+                        row.update(entry['changes'])
+                        break
+            elif op == 'delete':
+                # 删除所有匹配的记录
+                entry_key = key_to_str(entry['key'])
+                if entry_key in positions:
+                    deleted.add(entry_key)
+                inserted = [row if row is None or key_to_str(row.get(key)) != entry_key else None
+                            for row in inserted]
+        inserted = [row for row in inserted if row is not None]
+
+        for label, changes in updates.items():
+            for column, value in changes.items():
+                if column not in df.columns:
+                    df[column] = None
+                elif df[column].dtype != object:
+                    df[column] = df[column].astype(object)
+                df.at[label, column] = value
+        if deleted:
+            df = df[~keys.isin(deleted)]
+        if inserted:
+            df = pd.concat([df, pd.DataFrame(inserted)], ignore_index=True)
+        return df
+
+    def iter_chunks(self, table, chunksize, columns=None):
+        # 日志中的修改需要与整表合并，只有日志为空时才能直接流式读取工作簿
+        if self._journal_length(table):
+            yield from StorageBackend.iter_chunks(self, table, chunksize, columns)
+        else:
+            yield from super().iter_chunks(table, chunksize, columns)
+
+    def write(self, table, df):
+        journal = self.journal_path(table)
+        marker = self.compacting_path(table)
+        if os.path.exists(journal):
+            # 先记录压缩前的工作簿签名，标记写完整后再替换工作簿
+            tmp_path = marker + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'workbook': self._workbook_signature(table)}, f)
+            os.replace(tmp_path, marker)
+        super().write(table, df)
+        try:
+            os.remove(journal)
+        except FileNotFoundError:
+            pass
+        if os.path.exists(marker):
+            os.remove(marker)
+        self._journal_lengths[table] = 0
+
+    def insert(self, table, row, df):
+        row = {column: to_python_value(value) for column, value in row.items()}
+        self._append(table, {'op': 'insert', 'row': row})
+
+    def insert_many(self, table, rows, df):
+        # 大批量导入直接压缩进 xlsx，比逐条写日志更合适
+        if self._journal_length(table) + len(rows) >= self.compact_threshold:
+            self.write(table, df)
+            return
+        with self._open_journal(table) as f:
+            for record in rows.to_dict('records'):
+                row = {column: to_python_value(value) for column, value in record.items()}
+                f.write(json.dumps({'op': 'insert', 'row': row}, ensure_ascii=False, default=str) + '\n')
+        self._journal_lengths[table] += len(rows)
+
+    def update(self, table, key, changes, df):
+        changes = {column: to_python_value(value) for column, value in changes.items()}
+        self._append(table, {'op': 'update', 'key': key_to_str(key), 'changes': changes})
+
+    def delete(self, table, key, df):
+        self._append(table, {'op': 'delete', 'key': key_to_str(key)})
+
+    def compact(self, table=None):
+        """把日志合并回 xlsx，table 为空时压缩所有表"""
+        tables = [table] if table else list(self.specs)
+        for name in tables:
+            if self._journal_length(name):
+                self.write(name, self.read(name))
+
+    def close(self):
+        self.compact()
+
+
+class SQLiteBackend(StorageBackend):
+    """SQLite 存储后端
+
+    所有表保存在 data 目录下的 data.db 中，新增、修改、删除都是行级操作，
+    写入代价与表大小无关。主键及收款表的合同编号列建有索引。
+    """
+
+    name = 'sqlite'
+    db_name = 'data.db'
+    writes_rows = True
+    # 除主键外需要额外建立索引的列
+    extra_indexes = {'payments': ['合同编号']}
+
+    def __init__(self, data_dir, specs, db_path=None):
+        super().__init__(data_dir, specs)
+        self.db_path = db_path or os.path.join(data_dir, self.db_name)
+        self.is_new = not os.path.exists(self.db_path)
+        # 界面会在后台线程读取数据，DataManager 的锁保证同一时间只有一个线程使用连接
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+
+    @staticmethod
+    def _quote(name):
+        return '"' + str(name).replace('"', '""') + '"'
+
+    _to_sql_value = staticmethod(to_python_value)
+    _to_sql_key = staticmethod(key_to_str)
+
+    def _columns(self, table):
+        rows = self.conn.execute(f'PRAGMA table_info({self._quote(table)})').fetchall()
+        return [row[1] for row in rows]
+
+    def _ensure_columns(self, table, columns):
+        """为表补充缺少的列(例如导入数据中出现的新字段)"""
+        existing = set(self._columns(table))
+        for column in columns:
+            if column not in existing:
+                self.conn.execute(f'ALTER TABLE {self._quote(table)} ADD COLUMN {self._quote(column)}')
+                existing.add(column)
+
+    def _insert_frame(self, table, df):
+        """把 DataFrame 中的记录全部插入表中(不提交事务)"""
+        key = self.specs[table]['key']
+        columns = list(df.columns)
+        converters = [self._to_sql_key if column == key else self._to_sql_value for column in columns]
+        rows = [
+            tuple(convert(value) for convert, value in zip(converters, record))
+            for record in df.itertuples(index=False, name=None)
+        ]
+        column_list = ', '.join(self._quote(column) for column in columns)
+        placeholders = ', '.join('?' for _ in columns)
+        self._ensure_columns(table, columns)
+        self.conn.executemany(f'INSERT INTO {self._quote(table)} ({column_list}) VALUES ({placeholders})', rows)
+
+    def _bump_version(self, table):
+        self.conn.execute('UPDATE _table_versions SET version = version + 1 WHERE name = ?', (table,))
+
+    def ensure_tables(self):
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS _table_versions '
+                              '(name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)')
+            for table, spec in self.specs.items():
+                key = spec['key']
+                # 主键列声明为 TEXT，其余列不声明类型，保留写入时的原始类型
+                column_defs = [f'{self._quote(key)} TEXT'] + [
+                    self._quote(column) for column in spec['columns'] if column != key
+                ]
+                self.conn.execute(f'CREATE TABLE IF NOT EXISTS {self._quote(table)} ({", ".join(column_defs)})')
+                for column in [key] + self.extra_indexes.get(table, []):
+                    index_name = self._quote(f'idx_{table}_{column}')
+                    self.conn.execute(f'CREATE INDEX IF NOT EXISTS {index_name} '
+                                      f'ON {self._quote(table)} ({self._quote(column)})')
+                self.conn.execute('INSERT OR IGNORE INTO _table_versions (name, version) VALUES (?, 0)', (table,))
+
+    def signature(self, table):
+        row = self.conn.execute('SELECT version FROM _table_versions WHERE name = ?', (table,)).fetchone()
+        return row[0] if row else None
+
+    def read(self, table):
+        columns = ', '.join(self._quote(column) for column in self._columns(table))
+        return pd.read_sql_query(f'SELECT {columns} FROM {self._quote(table)} ORDER BY rowid', self.conn)
+
+    def iter_chunks(self, table, chunksize, columns=None):
+        existing = self._columns(table)
+        names = existing if columns is None else [column for column in columns if column in existing]
+        cursor = self.conn.execute(f'SELECT {", ".join(self._quote(column) for column in names)} '
+                                   f'FROM {self._quote(table)} ORDER BY rowid')
+        try:
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                yield pd.DataFrame(rows, columns=names)
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _match_values(value):
+        """等值比较时可能匹配的存储值
+
+        主键列保存为文本，其余列保留原始类型，编号等值可能以数字形式保存，
+        因此同时匹配字符串形式和等值的数字形式。
+        """
+        text = key_to_str(value)
+        values = [text]
+        try:
+            number = float(text)
+        except ValueError:
+            return values
+        if key_to_str(number) == text:
+            values.append(int(number) if number.is_integer() else number)
+        return values
+
+    def _where_clause(self, table, predicates, order_by=()):
+        """把查询条件转换为 SQL 的 WHERE 子句，返回 (子句, 参数)，没有条件时子句为空字符串"""
+        existing = self._columns(table)
+        for column in [column for column, _, _ in predicates] + [column for column, _ in order_by]:
+            if column not in existing:
+                raise ValueError(f'无效的列名 {column}')
+
+        clauses = []
+        params = []
+        for column, op, value in predicates:
+            name = self._quote(column)
+            if op in ('==', '!=', 'in'):
+                values = value if op == 'in' else [value]
+                values = [query_value(item) for item in values]
+                matches = [match for item in values if item is not None for match in self._match_values(item)]
+                placeholders = ', '.join('?' for _ in matches)
+                params.extend(matches)
+                if op == '!=':
+                    clauses.append(f'{name} IS NOT NULL' if values[0] is None
+                                   else f'{name} IS NOT NULL AND {name} NOT IN ({placeholders})')
+                    continue
+                parts = [f'{name} IN ({placeholders})'] if matches else []
+                if None in values:
+                    parts.append(f'{name} IS NULL')
+                clauses.append('(' + ' OR '.join(parts) + ')' if parts else '0')
+            elif op == 'contains':
+                clauses.append(f'instr(CAST({name} AS TEXT), ?) > 0')
+                params.append(str(value))
+            else:
+                clauses.append(f'{name} {op} ?')
+                params.append(query_value(value))
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def query(self, table, predicates, order_by, limit=None, columns=None, offset=0):
+        """把条件、排序和分页转换为 SQL 执行，只读取需要的列"""
+        where, params = self._where_clause(table, predicates, order_by)
+        existing = self._columns(table)
+        names = existing if columns is None else [column for column in columns if column in existing]
+        sql = f'SELECT {", ".join(self._quote(column) for column in names)} FROM {self._quote(table)}' + where
+        # 空值排在最后，与内存中排序一致
+        orders = [f'{self._quote(column)} IS NULL, {self._quote(column)} {"ASC" if ascending else "DESC"}'
+                  for column, ascending in order_by]
+        sql += ' ORDER BY ' + ', '.join(orders + ['rowid'])
+        if limit is not None or offset:
+            sql += ' LIMIT ? OFFSET ?'
+            params.extend([-1 if limit is None else int(limit), int(offset)])
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def count(self, table, predicates):
+        where, params = self._where_clause(table, predicates)
+        return self.conn.execute(f'SELECT COUNT(*) FROM {self._quote(table)}' + where, params).fetchone()[0]
+
+    def write(self, table, df):
+        with self.conn:
+            self.conn.execute(f'DELETE FROM {self._quote(table)}')
+            self._insert_frame(table, df)
+            self._bump_version(table)
+
+    def insert(self, table, row, df):
+        key = self.specs[table]['key']
+        columns = list(row.keys())
+        values = [self._to_sql_key(row[column]) if column == key else self._to_sql_value(row[column])
+                  for column in columns]
+        column_list = ', '.join(self._quote(column) for column in columns)
+        placeholders = ', '.join('?' for _ in columns)
+        with self.conn:
+            self._ensure_columns(table, columns)
+            self.conn.execute(f'INSERT INTO {self._quote(table)} ({column_list}) VALUES ({placeholders})', values)
+            self._bump_version(table)
+
+    def insert_many(self, table, rows, df):
+        with self.conn:
+            self._insert_frame(table, rows)
+            self._bump_version(table)
+
+    def update(self, table, key, changes, df):
+        key_column = self.specs[table]['key']
+        columns = list(changes.keys())
+        assignments = ', '.join(f'{self._quote(column)} = ?' for column in columns)
+        values = [self._to_sql_value(changes[column]) for column in columns]
+        with self.conn:
+            self._ensure_columns(table, columns)
+            self.conn.execute(f'UPDATE {self._quote(table)} SET {assignments} WHERE {self._quote(key_column)} = ?',
+                              values + [self._to_sql_key(key)])
+            self._bump_version(table)
+
+    def delete(self, table, key, df):
+        key_column = self.specs[table]['key']
+        with self.conn:
+            self.conn.execute(f'DELETE FROM {self._quote(table)} WHERE {self._quote(key_column)} = ?', (self._to_sql_key(key),))
+            self._bump_version(table)
+
+    def close(self):
+        self.conn.close()
+
+
+class SequenceStore:
+    """持久化的编号序列
+
+    每张表保存当前的编号前缀(按天计数的表前缀中含日期)和最后分配的序号，
+    分配编号不需要扫描数据表。前缀变化(例如跨天)时序号从 1 重新开始。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._data = json.load(f)
+        except FileNotFoundError:
+            self._data = {}
+        except ValueError as e:
+            print(f"读取编号序列失败: {str(e)}")
+            self._data = {}
+
+    def reserve(self, table, prefix, count=1, seed=None):
+        """预留 count 个连续序号，返回第一个序号
+
+        seed 为可选的回调，序列首次使用时调用它获取现有数据中的最大序号。
+        """
+        entry = self._data.get(table)
+        if entry is None:
+            last = seed() if seed else 0
+        elif entry['prefix'] != prefix:
+            last = 0
+        else:
+            last = entry['last']
+        self._data[table] = {'prefix': prefix, 'last': last + count}
+        self._save()
+        return last + 1
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+BACKENDS = {
+    'excel': ExcelBackend,
+    'journal': JournalExcelBackend,
+    'sqlite': SQLiteBackend,
+}
+
+
+def migrate(source, target):
+    """把 source 后端中的所有表复制到 target 后端"""
+    target.ensure_tables()
+    for table in source.specs:
+        target.write(table, source.read(table))
@@ -0,0 +1,164 @@
+"""DataManager 与存储后端的回归测试
+
+运行: python -m pytest -q test_data_manager.py
+"""
+import threading
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from data_manager import DataManager
+from schema import apply_schema
+
+
+@pytest.fixture(params=['excel', 'journal', 'sqlite'])
+def dm(tmp_path, request):
+    manager = DataManager(str(tmp_path), backend=request.param)
+    yield manager
+    manager.close()
+
+
+def test_import_generated_ids_skip_keys_in_same_file(dm):
+    # 文件中指定的编号恰好是下一个要生成的编号，生成的编号不能与它重复
+    explicit = f"{datetime.now():%Y%m%d}002"
+    report = dm.import_contracts(pd.DataFrame({
+        '合同编号': [None, explicit, None],
+        '客户名称': ['甲', '乙', '丙'],
+        '业务员': '张三',
+        '签订日期': '2025-01-01',
+        '合同金额': [100, 200, 300],
+        '交货日期': '2025-02-01',
+    }))
+    assert report['imported'] == 3
+    keys = dm.query('contracts')['合同编号'].tolist()
+    assert len(keys) == len(set(keys)) == 3
+    assert explicit in keys
+
+
+def test_journal_append_after_truncated_tail(tmp_path):
+    manager = DataManager(str(tmp_path), backend='journal')
+    manager.add_salesman({'姓名': '张三', '联系电话': '1', '所属部门': '销售'})
+    journal = manager._backend.journal_path('salesmen')
+    # 模拟写入中断: 日志末尾留下没有换行的半行
+    with open(journal, 'a', encoding='utf-8') as f:
+        f.write('{"op": "insert", "row": {"业务员ID": "S9')
+    manager = DataManager(str(tmp_path), backend='journal')
+    manager.add_salesman({'业务员ID': 'S100', '姓名': '李四', '联系电话': '2', '所属部门': '销售'})
+
+    reopened = DataManager(str(tmp_path), backend='journal')
+    names = reopened.query('salesmen')['姓名'].tolist()
+    assert names == ['张三', '李四']
+    reopened.close()
+
+
+def test_search_matches_date_and_category_columns_by_substring(dm):
+    contract = dm.add_contract({'客户名称': '甲', '业务员': '张三', '签订日期': '2025-01-15', '合同金额': 100,
+                                '交货日期': '2025-02-01', '状态': '执行中'})
+    dm.add_payment({'合同编号': contract['合同编号'], '收款日期': '2025-01-20', '收款金额': 50})
+    assert len(dm.search_payments('2025-01', '收款日期')) == 1
+    assert len(dm.search_contracts('执行', '状态')) == 1
+    assert len(dm.search_contracts('2025-02', '交货日期')) == 1
+    assert len(dm.search_payments('50', '收款金额')) == 1
+    assert dm.search_contracts('2024', '签订日期').empty
+
+
+def test_update_can_change_primary_key(dm):
+    contract = dm.add_contract({'客户名称': '甲', '业务员': '张三', '签订日期': '2025-01-15', '合同金额': 100,
+                                '交货日期': '2025-02-01'})
+    record = dm.update_contract(contract['合同编号'], {'合同编号': 'HT-NEW', '合同金额': 200})
+    assert record and record['合同编号'] == 'HT-NEW' and record['合同金额'] == 200
+    assert dm.get_contract(contract['合同编号']) is None
+    assert dm.get_contract('HT-NEW')['合同金额'] == 200
+
+
+def test_failed_write_leaves_indexes_consistent(dm, monkeypatch):
+    contract = dm.add_contract({'客户名称': '甲公司', '业务员': '张三', '签订日期': '2025-01-15', '合同金额': 100,
+                                '交货日期': '2025-02-01'})
+    contract_id = contract['合同编号']
+    assert len(dm.search_contracts('甲公司', '客户名称')) == 1
+
+    def fail(*args, **kwargs):
+        raise OSError('磁盘已满')
+
+    monkeypatch.setattr(dm._backend, 'update', fail)
+    monkeypatch.setattr(dm._backend, 'delete', fail)
+    assert dm.update_contract(contract_id, {'合同编号': 'HT-NEW', '客户名称': '乙公司'}) is False
+    assert dm.delete_contract(contract_id) is False
+    assert dm.get_contract(contract_id)['客户名称'] == '甲公司'
+    assert dm.get_contract('HT-NEW') is None
+    assert len(dm.search_contracts('甲公司', '客户名称')) == 1
+    assert dm.search_contracts('乙公司', '客户名称').empty
+
+
+def test_apply_schema_converts_str_columns_like_object_columns():
+    # pandas 的 str 类型列整列转换，结果应与逐个转换 object 列一致
+    columns = {
+        '合同编号': ['HT1', None, 'HT3'],
+        '客户名称': ['甲', '', None],
+        '付款方式': ['电汇', '', '转账'],
+        '状态': ['执行中', None, '已完成'],
+    }
+    strings = apply_schema('contracts', pd.DataFrame({k: pd.Series(v, dtype='str') for k, v in columns.items()}))
+    objects = apply_schema('contracts', pd.DataFrame({k: pd.Series(v, dtype=object) for k, v in columns.items()}))
+    pd.testing.assert_frame_equal(strings, objects)
+    assert strings['合同编号'].tolist() == ['HT1', None, 'HT3']
+    assert strings['付款方式'].isna().tolist() == [False, True, False]
+    assert strings['付款方式'].cat.categories[-1] == '转账'
+
+
+def test_added_records_are_merged_on_read(dm):
+    dm.add_contract({'客户名称': '甲', '业务员': '张三', '签订日期': '2025-01-15', '合同金额': 100,
+                     '交货日期': '2025-02-01', '付款方式': '电汇'})
+    cached = dm._cache['contracts'][1]
+    records = [dm.add_contract({'客户名称': name, '业务员': '张三', '签订日期': '2025-01-16', '合同金额': 200,
+                                '交货日期': '2025-02-01', '付款方式': method})
+               for name, method in [('乙', '支票'), ('丙', '承兑')]]
+    if dm._backend.writes_rows:
+        # 逐条新增不复制整张表
+        assert dm._cache['contracts'][1] is cached
+    assert [record['客户名称'] for record in records] == ['乙', '丙']
+    assert dm.get_contract(records[1]['合同编号'])['付款方式'] == '承兑'
+
+    df = dm.get_all_contracts()
+    assert df['客户名称'].tolist() == ['甲', '乙', '丙']
+    assert df.index.is_unique
+    assert isinstance(df['付款方式'].dtype, pd.CategoricalDtype)
+    assert str(df['签订日期'].dtype) == 'datetime64[ns]'
+
+
+def test_invalid_update_leaves_record_unchanged(dm):
+    contract = dm.add_contract({'客户名称': '甲', '业务员': '张三', '签订日期': '2025-01-15', '合同金额': 100,
+                                '交货日期': '2025-02-01'})
+    assert dm.update_contract(contract['合同编号'], {'合同金额': 300, '交货日期': '不是日期'}) is False
+    record = dm.get_contract(contract['合同编号'])
+    assert record['合同金额'] == 100
+    assert record['交货日期'] == pd.Timestamp('2025-02-01')
+
+
+@pytest.mark.parametrize('cached', [True, False])
+def test_iter_table_releases_lock_between_chunks(dm, cached):
+    for name in ['张三', '李四', '王五']:
+        dm.add_salesman({'姓名': name, '联系电话': '1', '所属部门': '销售'})
+    if cached:
+        dm.get_all_salesmen()
+    else:
+        dm.clear_cache()
+    chunks = dm.iter_table('salesmen', chunksize=1)
+    first = next(chunks)
+
+    # 遍历尚未结束时，其他线程的修改不需要等待
+    worker = threading.Thread(target=dm.add_salesman, args=({'姓名': '赵六', '联系电话': '2', '所属部门': '销售'},))
+    worker.start()
+    worker.join(timeout=10)
+    blocked = worker.is_alive()
+    rest = list(chunks)
+    worker.join()
+    assert not blocked
+
+    names = first['姓名'].tolist() + [name for chunk in rest for name in chunk['姓名']]
+    assert names[:3] == ['张三', '李四', '王五']
+    if cached:
+        # 缓存中的表按开始遍历时的快照生成
+        assert len(names) == 3
+    assert dm.count('salesmen') == 4
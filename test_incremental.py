@@ -0,0 +1,141 @@
+"""增量维护的汇总与完整重算的一致性测试
+
+随机增删改合同和收款，比较 DataManager 增量维护的已收款汇总(ReceivedTotals)、
+客户敞口(ExposureIndex)和月度汇总(MonthlyCube)与完整重算的结果。重算使用复制出来的
+data 目录重新打开的 DataManager(删除 received.json，强制重新汇总)，追加日志后端同时检验日志回放。
+
+运行: python -m pytest -q test_incremental.py
+"""
+import os
+import random
+import shutil
+
+import pandas as pd
+import pytest
+
+from cube import CUBE_DIMENSIONS
+from data_manager import DataManager
+from receivables import CLOSED_STATUSES, received_by_contract
+from schema import CONTRACT_STATUSES, PAYMENT_TERMS, TABLE_SPECS
+from storage import JournalExcelBackend, key_to_str
+
+CUSTOMERS = ['甲公司', '乙公司', '丙公司']
+SALESMEN = ['张三', '李四']
+
+
+def _random_contract(rng):
+    return {
+        '客户名称': rng.choice(CUSTOMERS),
+        '业务员': rng.choice(SALESMEN),
+        '签订日期': f'2025-{rng.randint(1, 6):02d}-{rng.randint(1, 28):02d}',
+        '合同金额': rng.randint(1, 100) * 100,
+        '付款方式': rng.choice(PAYMENT_TERMS),
+        '交货日期': '2025-08-01',
+        '状态': rng.choice(CONTRACT_STATUSES),
+    }
+
+
+def _random_payment(rng, contract_id):
+    return {
+        '合同编号': contract_id,
+        '收款日期': f'2025-{rng.randint(1, 8):02d}-{rng.randint(1, 28):02d}',
+        '收款金额': rng.randint(1, 50) * 10,
+    }
+
+
+def _mutate(dm, rng, steps):
+    """随机执行 steps 次合同、收款的增删改"""
+    for _ in range(steps):
+        contracts = dm.query('contracts', columns=['合同编号'])['合同编号'].tolist()
+        payments = dm.query('payments', columns=['收款ID'])['收款ID'].tolist()
+        action = rng.random()
+        if action < 0.25 or not contracts:
+            dm.add_contract(_random_contract(rng))
+        elif action < 0.4:
+            changes = _random_contract(rng)
+            dm.update_contract(rng.choice(contracts), dict(rng.sample(sorted(changes.items()), 3)))
+        elif action < 0.45:
+            dm.delete_contract(rng.choice(contracts))
+        elif action < 0.75 or not payments:
+            dm.add_payment(_random_payment(rng, rng.choice(contracts)))
+        elif action < 0.9:
+            changes = _random_payment(rng, rng.choice(contracts))
+            dm.update_payment(rng.choice(payments), dict(rng.sample(sorted(changes.items()), 2)))
+        else:
+            dm.delete_payment(rng.choice(payments))
+
+
+def _expected_exposure(dm):
+    """由合同表和收款表直接计算各客户的未收款敞口"""
+    contracts = dm.query('contracts')
+    received = received_by_contract(dm.query('payments'))
+    exposure = {}
+    for contract_id, customer, amount, status in zip(contracts['合同编号'], contracts['客户名称'],
+                                                     contracts['合同金额'], contracts['状态']):
+        if status in CLOSED_STATUSES:
+            continue
+        outstanding = max(float(amount) - float(received.get(key_to_str(contract_id), 0.0)), 0.0)
+        exposure[customer] = exposure.get(customer, 0.0) + outstanding
+    return exposure
+
+
+def _nonzero(totals):
+    """去掉金额为 0 的合同(收款全部删除后增量汇总中会留下 0)"""
+    return {key: float(value) for key, value in dict(totals).items() if abs(value) > 1e-6}
+
+
+def _summary(dm):
+    return (dm.get_monthly_summary(by=CUBE_DIMENSIONS)
+            .sort_values(CUBE_DIMENSIONS).reset_index(drop=True))
+
+
+def _make_manager(data_dir, backend):
+    if backend == 'journal':
+        # 阈值较小，测试过程中也会压缩日志
+        backend = JournalExcelBackend(data_dir, TABLE_SPECS, compact_threshold=40)
+    return DataManager(data_dir, backend=backend)
+
+
+@pytest.mark.parametrize('backend', ['excel', 'journal', 'sqlite'])
+@pytest.mark.parametrize('seed', [1, 2])
+def test_incremental_matches_rebuild(tmp_path, backend, seed):
+    rng = random.Random(seed)
+    data_dir = str(tmp_path / 'live')
+    os.makedirs(data_dir)
+    dm = _make_manager(data_dir, backend)
+    for _ in range(5):
+        dm.add_contract(_random_contract(rng))
+
+    # 先建立增量汇总，之后的修改都通过增量维护
+    dm.get_customer_exposure(CUSTOMERS[0])
+    dm.get_monthly_summary()
+    dm.get_receivables()
+    _mutate(dm, rng, 150)
+
+    live_received = _nonzero(dm._received_totals())
+    live_exposure = {customer: dm.get_customer_exposure(customer) for customer in CUSTOMERS}
+    live_summary = _summary(dm)
+
+    # 与直接由记录计算的结果比较
+    assert live_received == pytest.approx(_nonzero(received_by_contract(dm.query('payments'))))
+    expected_exposure = _expected_exposure(dm)
+    for customer in CUSTOMERS:
+        assert live_exposure[customer] == pytest.approx(expected_exposure.get(customer, 0.0))
+
+    # 复制未关闭的 data 目录(含追加日志)重新打开，所有汇总从头构建
+    rebuilt_dir = str(tmp_path / 'rebuilt')
+    shutil.copytree(data_dir, rebuilt_dir)
+    received_path = os.path.join(rebuilt_dir, 'received.json')
+    if os.path.exists(received_path):
+        os.remove(received_path)
+    rebuilt = _make_manager(rebuilt_dir, backend)
+    try:
+        assert rebuilt.count('contracts') == dm.count('contracts')
+        assert rebuilt.count('payments') == dm.count('payments')
+        assert _nonzero(rebuilt._received_totals()) == pytest.approx(live_received)
+        for customer in CUSTOMERS:
+            assert rebuilt.get_customer_exposure(customer) == pytest.approx(live_exposure[customer])
+        pd.testing.assert_frame_equal(_summary(rebuilt), live_summary, check_dtype=False)
+    finally:
+        rebuilt.close()
+        dm.close()
@@ -0,0 +1,351 @@
+"""界面通用控件"""
+import tkinter as tk
+from tkinter import ttk
+
+from schema import display_value, display_values
+from storage import key_to_str, keys_to_str
+
+
+class TableSource:
+    """按页从 DataManager 读取数据表，作为 VirtualTreeview 的数据源
+
+    where、order_by 与 DataManager.query 相同。SQLite 后端直接用 LIMIT/OFFSET 读取一页，
+    其他后端在内存缓存上切片，都不会一次读出整张表的所有行。
+    """
+
+    def __init__(self, data_manager, table, columns, where=None, order_by=None):
+        self.data_manager = data_manager
+        self.table = table
+        self.columns = list(columns)
+        self.where = where
+        self.order_by = order_by
+
+    def count(self):
+        return self.data_manager.count(self.table, self.where)
+
+    def fetch(self, offset, limit):
+        return self.data_manager.query(self.table, where=self.where, order_by=self.order_by,
+                                       limit=limit, columns=self.columns, offset=offset)
+
+
+class FrameSource:
+    """以已经得到的 DataFrame(例如搜索结果)作为 VirtualTreeview 的数据源"""
+
+    def __init__(self, df, columns):
+        self.df = df.reset_index(drop=True)
+        self.columns = list(columns)
+
+    def count(self):
+        return len(self.df)
+
+    def fetch(self, offset, limit):
+        return self.df.iloc[offset:offset + limit].reindex(columns=self.columns)
+
+    # 数据修改后同步更新这份结果，第一列为主键
+    def _positions(self, key):
+        return self.df.index[keys_to_str(self.df[self.columns[0]]) == key_to_str(key)]
+
+    def update(self, key, record):
+        for position in self._positions(key):
+            for column in self.df.columns:
+                if column in record:
+                    self.df.at[position, column] = record[column]
+
+    def delete(self, key):
+        self.df = self.df.drop(self._positions(key)).reset_index(drop=True)
+
+
+class SearchSource(FrameSource):
+    """以搜索结果作为数据源，search() 在第一次统计行数时执行
+
+    交给 VirtualTreeview.set_source 并传入 loader 时，搜索在后台线程中进行。
+    """
+
+    def __init__(self, search, columns):
+        self.search = search
+        self.columns = list(columns)
+        self.df = None
+
+    def count(self):
+        if self.df is None:
+            self.df = self.search().reset_index(drop=True)
+        return len(self.df)
+
+
+class VirtualTreeview(tk.Frame):
+    """只显示可见行的表格
+
+    内部的 ttk.Treeview 只保留一屏的行，滚动时改写这些行的内容，而不是为每条记录
+    插入一个条目；数据按块从数据源(TableSource / FrameSource)读取，块比一屏多出 buffer 行，
+    在块内滚动不需要重新读取。百万行的表也只占用一屏的界面资源。
+    set_source 传入 loader 后，TableSource 的数据块在后台读取，读取完成前这些行暂时显示为空。
+
+    selection()、item()、heading()、column()、bind() 转发给内部的 Treeview，
+    现有的"取选中行的值"等代码可以照常使用。
+    """
+
+    def __init__(self, master, columns, source=None, buffer=50, **kwargs):
+        super().__init__(master, **kwargs)
+        self.columns = list(columns)
+        self.buffer = buffer
+        self.source = None
+        # 后台读取数据用的 BackgroundLoader，由 set_source 传入
+        self.loader = None
+        # 每次 set_source 加 1，之前尚未完成的读取结果不再显示
+        self._request = 0
+        # 正在后台读取的数据块: ((起始位置, 行数), Future)
+        self._fetching = None
+        self.total = 0
+        # 当前显示的第一行在数据源中的位置
+        self.offset = 0
+        # 已读取的数据块: 起始位置和各行显示值
+        self._block_start = 0
+        self._block = []
+        # 选中的行(数据源中的位置)，滚动后仍保持选中
+        self._selected = set()
+        self._rendering = False
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show='headings', selectmode='browse')
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.tree.bind('<Configure>', lambda event: self._render())
+        self.tree.bind('<<TreeviewSelect>>', self._on_select, add='+')
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll(3))
+        self.tree.bind('<Up>', lambda event: self._on_arrow(-1))
+        self.tree.bind('<Down>', lambda event: self._on_arrow(1))
+        self.tree.bind('<Prior>', lambda event: self.scroll(-self._visible_rows()) or 'break')
+        self.tree.bind('<Next>', lambda event: self.scroll(self._visible_rows()) or 'break')
+
+        if source is not None:
+            self.set_source(source)
+
+    # ------------------------------ 数据源 ------------------------------
+    def set_source(self, source, loader=None, on_error=None, on_done=None):
+        """更换数据源并回到第一行
+
+        传入 loader(BackgroundLoader)时在后台统计行数并读取第一块数据，完成后再显示，
+        之后滚动时也在后台读取数据块；读取出错时调用 on_error(异常)，显示后调用 on_done()。
+        显示之前又更换了数据源(例如搜索后马上点击刷新)时，这次的结果被丢弃。
+        """
+        rows = self._visible_rows() + self.buffer
+        if loader is not None:
+            self.loader = loader
+        self._request += 1
+        request = self._request
+
+        def load():
+            return source.count(), self._display_rows(source.fetch(0, rows))
+
+        def show(result):
+            if request != self._request:
+                return
+            self.source = source
+            self.total, self._block = result
+            self._block_start = 0
+            self._fetching = None
+            self.offset = 0
+            self._selected.clear()
+            self._render()
+            if on_done is not None:
+                on_done()
+
+        if loader is None:
+            show(load())
+        else:
+            loader.submit(load, show, on_error)
+
+    def _ensure_block(self, start, rows):
+        """保证 [start, start + rows) 的行已经读取
+
+        TableSource 在后台读取(见 set_source)，读取完成后重新显示；其他数据源已在内存中，直接读取。
+        """
+        end = min(start + rows, self.total)
+        if self._block_start <= start and end <= self._block_start + len(self._block):
+            return
+        block_start = max(0, start - self.buffer)
+        limit = end - block_start + self.buffer
+        source = self.source
+        if self.loader is None or not isinstance(source, TableSource):
+            self._block_start = block_start
+            self._block = self._display_rows(source.fetch(block_start, limit))
+            return
+
+        if self._fetching is not None:
+            (fetch_start, fetch_limit), future = self._fetching
+            # 已经在读取包含这些行的数据块(被取消的读取需要重新提交)
+            if not future.done() and fetch_start <= start and end <= fetch_start + fetch_limit:
+                return
+
+        def show(block):
+            if self.source is not source or self._fetching is None or self._fetching[1] is not future:
+                return
+            self._fetching = None
+            self._block_start = block_start
+            self._block = block
+            self._render()
+
+        future = self.loader.submit(lambda: self._display_rows(source.fetch(block_start, limit)), show)
+        self._fetching = ((block_start, limit), future)
+
+    @staticmethod
+    def _display_rows(df):
+        return [display_values(*values) for values in df.itertuples(index=False, name=None)]
+
+    # ------------------------------ 显示 ------------------------------
+    def _visible_rows(self):
+        """一屏能显示的行数"""
+        style = ttk.Style(self)
+        row_height = int(style.lookup('Treeview', 'rowheight') or 20)
+        height = self.tree.winfo_height()
+        if height <= 1:
+            # 尚未布局时按 Treeview 的默认高度计算
+            return int(self.tree.cget('height'))
+        return max(1, (height - row_height) // row_height)
+
+    def _render(self):
+        """按当前位置改写可见的行"""
+        rows = min(self._visible_rows(), max(self.total - self.offset, 0))
+        if rows:
+            self._ensure_block(self.offset, rows)
+        items = self.tree.get_children()
+        # 条目数量随窗口高度增减，已有条目直接改写内容
+        if len(items) > rows:
+            self.tree.delete(*items[rows:])
+            items = items[:rows]
+        for _ in range(rows - len(items)):
+            self.tree.insert('', tk.END)
+        items = self.tree.get_children()
+
+        self._rendering = True
+        try:
+            selected = []
+            for i, item in enumerate(items):
+                position = self.offset + i
+                index = position - self._block_start
+                # 读取后数据被删除时，块中的行可能少于预期；后台读取完成前不在块中的行显示为空
+                self.tree.item(item, values=self._block[index] if 0 <= index < len(self._block) else ())
+                if position in self._selected:
+                    selected.append(item)
+            self.tree.selection_set(selected)
+        finally:
+            self._rendering = False
+
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, (self.offset + rows) / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    # ------------------------------ 滚动 ------------------------------
+    def scroll_to(self, offset):
+        """滚动到数据源中的第 offset 行"""
+        offset = max(0, min(int(offset), self.total - self._visible_rows()))
+        if offset != self.offset:
+            self.offset = offset
+            self._render()
+
+    def scroll(self, rows):
+        self.scroll_to(self.offset + rows)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == 'moveto':
+            self.scroll_to(float(value) * self.total)
+        elif action == 'scroll':
+            step = self._visible_rows() if unit == 'pages' else 1
+            self.scroll(int(value) * step)
+
+    def _on_mousewheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+        return 'break'
+
+    def _on_arrow(self, step):
+        """方向键移动到可见范围之外时滚动一行"""
+        items = self.tree.get_children()
+        selection = self.tree.selection()
+        if not items or not selection:
+            return None
+        index = items.index(selection[0])
+        if 0 <= index + step < len(items):
+            return None
+        position = self.offset + index + step
+        if 0 <= position < self.total:
+            self._selected = {position}
+            self.scroll(step)
+        return 'break'
+
+    # ------------------------------ 局部更新 ------------------------------
+    # 保存后只改写对应的一行，不重新读取整张表，滚动位置和选中行保持不变。
+    # record 为 DataManager 增删改方法返回的记录，第一列为主键。
+    def _find(self, key):
+        """主键对应的行在已读取的块中的下标，不在块中时返回 None"""
+        key = display_value(key)
+        for index, values in enumerate(self._block):
+            if values and values[0] == key:
+                return index
+        return None
+
+    def insert_record(self, record):
+        """在表格末尾加入一条记录
+
+        显示的是搜索结果(FrameSource)时不加入，新记录不一定符合搜索条件，
+        点击刷新后显示全部记录时可以看到。
+        """
+        if not isinstance(self.source, TableSource):
+            return
+        # 已读取的块包含最后一行时直接追加，否则等滚动到末尾时再读取
+        if self._block_start + len(self._block) == self.total:
+            self._block.append(display_values(*(record.get(column) for column in self.columns)))
+        self.total += 1
+        self._render()
+
+    def update_record(self, key, record):
+        """改写主键为 key 的记录"""
+        if hasattr(self.source, 'update'):
+            self.source.update(key, record)
+        index = self._find(key)
+        if index is not None:
+            old = self._block[index]
+            self._block[index] = tuple(display_value(record[column]) if column in record else value
+                                       for column, value in zip(self.columns, old))
+            self._render()
+
+    def delete_record(self, key):
+        """删除主键为 key 的记录，后面的行依次上移"""
+        if hasattr(self.source, 'delete'):
+            self.source.delete(key)
+        index = self._find(key)
+        if index is None:
+            # 不在已读取的块中，无法确定位置，下次显示时重新读取
+            self._block = []
+        else:
+            del self._block[index]
+            position = self._block_start + index
+            self._selected = {row if row < position else row - 1 for row in self._selected if row != position}
+        self.total -= 1
+        self.offset = max(0, min(self.offset, self.total - self._visible_rows()))
+        self._render()
+
+    def _on_select(self, event):
+        if self._rendering:
+            return
+        items = self.tree.get_children()
+        self._selected = {self.offset + items.index(item) for item in self.tree.selection()}
+
+    # ------------------------------ 转发给 Treeview ------------------------------
+    def selection(self):
+        return self.tree.selection()
+
+    def item(self, item, option=None, **kwargs):
+        return self.tree.item(item, option, **kwargs)
+
+    def heading(self, column, option=None, **kwargs):
+        return self.tree.heading(column, option, **kwargs)
+
+    def column(self, column, option=None, **kwargs):
+        return self.tree.column(column, option, **kwargs)
+
+    def bind(self, sequence=None, func=None, add=None):
+        return self.tree.bind(sequence, func, add)